@@ -1,23 +1,32 @@
 import asyncio
 import os
 import logging
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
-from pyairtable import Api # Ensure: pip install pyairtable
-
-from livekit import agents
-from livekit.agents import AgentSession, Agent, RoomInputOptions, JobContext
-from livekit.plugins import (
-    openai,
-    cartesia,
-    deepgram,
-    noise_cancellation,
-    silero, 
-)
-from livekit.plugins.turn_detector.multilingual import MultilingualModel 
 
-from datetime import datetime
+# Sets PROMETHEUS_MULTIPROC_DIR, which has to happen before livekit imports prometheus_client.
+from latency_metrics import METRICS_MULTIPROC_DIR, METRICS_PORT, StartupTimeline, TurnLatencyRecorder, reopen_metrics_files
+from livekit import agents, rtc
+from livekit.agents import AgentSession, Agent, RoomInputOptions, JobContext, JobProcess
+
+from datetime import datetime, timezone
 import json
-from typing import Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from airtable_client import AIRTABLE_MAX_RECORDS_PER_REQUEST, airtable_request, get_airtable_table, is_permanent_airtable_error
+from jd_cache import JDCache
+from greeting import SpeculativeGreeting
+from persistence_spool import PersistenceSpool, SpoolBatchResult, SpoolDrainer, SpoolEntry
+from provider_router import ProviderRouter, ProviderStatsStore
+from providers import LOCAL_MODEL_PLUGINS, ProviderChoice, create_provider, load_plugins, parse_provider_chain, required_api_key_env_vars
+from prompts import (GREETING_TURN_INSTRUCTIONS, SCRIPTED_PHRASES, STATIC_INSTRUCTIONS_PREFIX, CompactedJD, build_interview_instructions,
+                     compact_job_description, compacted_jd_key, warm_token_encoding)
+from tts_cache import TTSAudioCache, cached_phrase_tts_node
+from transcript_backup import backup_file_suffix, iter_history_items, resolve_backup_compression, write_transcript_backup_async
+from transcript_journal import TranscriptJournal
+from worker_load import JobLoadReporter, WorkerLoadMonitor
 
 load_dotenv()
 
@@ -32,6 +41,71 @@ FIELD_IS_LIVEKIT_ROOM_SID_NAME = "LiveKitRoomSID"
 FIELD_IS_TRANSCRIPT_NAME = "Transcript"
 FIELD_IS_INTERVIEW_END_TIME_NAME = "InterviewEndTime"
 AIRTABLE_API_TIMEOUT = 30
+# Where transcript checkpoints go. "field" (default) rewrites the session's whole Transcript
+# field on every checkpoint, which gets slower (read + write of the full text) as the interview
+# grows. "segments" creates one record per segment in the Transcript Segments table, so each
+# checkpoint is a single append; it needs that table, which the worker checks for at startup.
+# The segments table (name or ID below) needs these fields: "Interview Session" (link to the
+# Interview Sessions table), "LiveKitRoomSID" (single line text), "SegmentIndex" (single line
+# text), "SegmentText" (long text) and "AppendedAt" (date/time). Segments are upserted on
+# LiveKitRoomSID + SegmentIndex, so a retried or redelivered write never adds a duplicate row.
+TRANSCRIPT_STORAGE = os.getenv("TRANSCRIPT_STORAGE", "field").strip().lower()
+TRANSCRIPT_SEGMENTS_TABLE_ID = os.getenv("AIRTABLE_TRANSCRIPT_SEGMENTS_TABLE_ID", "Transcript Segments")
+FIELD_TS_SESSION_LINK_NAME = "Interview Session"
+FIELD_TS_LIVEKIT_ROOM_SID_NAME = "LiveKitRoomSID"
+FIELD_TS_SEGMENT_INDEX_NAME = "SegmentIndex"
+FIELD_TS_SEGMENT_TEXT_NAME = "SegmentText"
+FIELD_TS_APPENDED_AT_NAME = "AppendedAt"
+# Key the backend writes into the LiveKit room metadata after creating the session record.
+ROOM_METADATA_SESSION_RECORD_ID_KEY = "airtableSessionRecordId"
+
+# --- JD Cache Configuration ---
+# On disk so every job process on the host shares it; each job runs in its own process.
+JD_CACHE_DIR = os.getenv("JD_CACHE_DIR", "/tmp/ai_interviewer_jd_cache")
+JD_CACHE_MAX_ENTRIES = int(os.getenv("JD_CACHE_MAX_ENTRIES", "5000"))
+JD_CACHE_TTL_SECONDS = float(os.getenv("JD_CACHE_TTL_SECONDS", "3600"))
+JD_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("JD_CACHE_NEGATIVE_TTL_SECONDS", "60"))
+# When enabled, the main worker process loads every JD into the cache at startup and then
+# refreshes it every half TTL, one rate-limited Airtable page at a time.
+JD_CACHE_PREFETCH = os.getenv("JD_CACHE_PREFETCH", "false").lower() in ("1", "true", "yes")
+JD_PREFETCH_PAGE_SIZE = 100
+
+# --- Prompt Configuration ---
+JD_TOKEN_BUDGET = int(os.getenv("JD_TOKEN_BUDGET", "1500"))
+
+# --- TTS Cache Configuration ---
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "/tmp/ai_interviewer_tts_cache")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# --- Transcript Configuration ---
+TRANSCRIPT_BACKUP_DIR = "/tmp/ai_interviewer_transcripts"
+# "zstd" (needs the zstandard package, falls back to gzip), "gzip" or "none" for plain NDJSON.
+TRANSCRIPT_BACKUP_COMPRESSION = resolve_backup_compression(os.getenv("TRANSCRIPT_BACKUP_COMPRESSION", "zstd"))
+TRANSCRIPT_CHECKPOINT_INTERVAL_SECONDS = float(os.getenv("TRANSCRIPT_CHECKPOINT_INTERVAL_SECONDS", "30"))
+TRANSCRIPT_CHECKPOINT_BATCH_ITEMS = int(os.getenv("TRANSCRIPT_CHECKPOINT_BATCH_ITEMS", "20"))
+
+# --- Persistence Spool Configuration ---
+# Session updates are spooled to disk by the job and written to Airtable by the worker's drainer.
+PERSISTENCE_SPOOL_DIR = os.getenv("PERSISTENCE_SPOOL_DIR", "/tmp/ai_interviewer_spool")
+PERSISTENCE_BATCH_MAX_ENTRIES = int(os.getenv("PERSISTENCE_BATCH_MAX_ENTRIES", "50"))
+PERSISTENCE_DRAIN_INTERVAL_SECONDS = float(os.getenv("PERSISTENCE_DRAIN_INTERVAL_SECONDS", "1"))
+PERSISTENCE_MAX_ATTEMPTS = int(os.getenv("PERSISTENCE_MAX_ATTEMPTS", "20"))
+# Keeps OR(...) lookup formulas well under Airtable's URL length limit.
+AIRTABLE_LOOKUP_FORMULA_MAX_TERMS = 50
+
+# --- Startup Configuration ---
+# How long the pre-generated greeting waits for the candidate's microphone before playing anyway.
+GREETING_AUDIO_TRACK_WAIT_SECONDS = float(os.getenv("GREETING_AUDIO_TRACK_WAIT_SECONDS", "10"))
+
+# --- Worker Load Configuration ---
+# Each interview runs VAD, turn detection and noise cancellation locally; about two per core.
+WORKER_MAX_CONCURRENT_INTERVIEWS = int(os.getenv("WORKER_MAX_CONCURRENT_INTERVIEWS", str(max(1, (os.cpu_count() or 1) * 2))))
+# Reported load at which LiveKit stops dispatching to this worker. Must be below 1.
+WORKER_LOAD_THRESHOLD = float(os.getenv("WORKER_LOAD_THRESHOLD", "0.75"))
+WORKER_CPU_THRESHOLD = float(os.getenv("WORKER_CPU_THRESHOLD", "0.8"))
+WORKER_LOOP_LAG_THRESHOLD_MS = float(os.getenv("WORKER_LOOP_LAG_THRESHOLD_MS", "100"))
+WORKER_LOAD_STATE_DIR = os.getenv("WORKER_LOAD_STATE_DIR", "/tmp/ai_interviewer_load")
 
 # --- Other Environment Variables ---
 OPENAI_MODEL_NAME = os.getenv("OPENAI_MODEL_NAME", "gpt-4o")
@@ -44,6 +118,29 @@ LIVEKIT_API_KEY = os.getenv("LIVEKIT_API_KEY")
 LIVEKIT_API_SECRET = os.getenv("LIVEKIT_API_SECRET")
 LIVEKIT_URL = os.getenv("LIVEKIT_URL")
 
+# --- Provider Configuration ---
+# Comma-separated fallback chains, first choice first; "name:model" pins a model
+# (e.g. "openai:gpt-4o,openai:gpt-4o-mini"). Plugins are imported only for the providers listed.
+STT_PROVIDERS = parse_provider_chain("stt", os.getenv("STT_PROVIDERS", "deepgram,openai"))
+LLM_PROVIDERS = parse_provider_chain("llm", os.getenv("LLM_PROVIDERS", "openai"))
+TTS_PROVIDERS = parse_provider_chain("tts", os.getenv("TTS_PROVIDERS", "cartesia,openai"))
+PROVIDER_OPTIONS = {
+    ("llm", "openai"): {"model": OPENAI_MODEL_NAME},
+    ("tts", "openai"): {"model": OPENAI_TTS_MODEL, "voice": OPENAI_TTS_VOICE},
+}
+# A session moves to the next provider in its chain after this many consecutive SLO breaches or
+# errors (or one unrecoverable error). STT is measured by the final transcript delay, the LLM by
+# time to first token and TTS by time to first audio.
+STT_FINAL_DELAY_SLO_MS = float(os.getenv("STT_FINAL_DELAY_SLO_MS", "1500"))
+LLM_TTFT_SLO_MS = float(os.getenv("LLM_TTFT_SLO_MS", "1500"))
+TTS_TTFB_SLO_MS = float(os.getenv("TTS_TTFB_SLO_MS", "1000"))
+PROVIDER_SLO_BREACHES_BEFORE_FAILOVER = int(os.getenv("PROVIDER_SLO_BREACHES_BEFORE_FAILOVER", "2"))
+# How long a provider that was failed away from is skipped by new sessions on this host.
+PROVIDER_FAILOVER_COOLDOWN_SECONDS = float(os.getenv("PROVIDER_FAILOVER_COOLDOWN_SECONDS", "300"))
+# Cooldowns and rolling provider stats shared by every job process on the host.
+PROVIDER_STATS_STATE_PATH = os.getenv("PROVIDER_STATS_STATE_PATH", "/tmp/ai_interviewer_provider_stats.json")
+PROVIDER_CHAINS = {"stt": STT_PROVIDERS, "llm": LLM_PROVIDERS, "tts": TTS_PROVIDERS}
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(
     level=logging.INFO,
@@ -51,6 +148,18 @@ logging.basicConfig(
     handlers=[logging.StreamHandler()]
 )
 
+jd_cache = JDCache(
+    JD_CACHE_DIR,
+    max_entries=JD_CACHE_MAX_ENTRIES,
+    ttl_seconds=JD_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=JD_CACHE_NEGATIVE_TTL_SECONDS,
+)
+tts_audio_cache: Optional[TTSAudioCache] = TTSAudioCache(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES) if TTS_CACHE_ENABLED else None
+persistence_spool = PersistenceSpool(PERSISTENCE_SPOOL_DIR)
+_session_record_id_by_sid: Dict[str, str] = {}
+_segment_count_by_sid: Dict[str, int] = {}
+_segment_run_prefix_by_sid: Dict[str, str] = {}
+
 def parse_candidate_id_from_room_name(room_name_str: Optional[str]) -> Tuple[str, Optional[str]]:
     default_candidate_id = "unknown_candidate_id_for_jd"
     if not room_name_str or not room_name_str.strip():
@@ -69,142 +178,512 @@ def parse_candidate_id_from_room_name(room_name_str: Optional[str]) -> Tuple[str
         logger.error(f"Exception parsing room name '{room_name_str}' for JD: {e}. Using default for JD.", exc_info=True)
         return default_candidate_id, None
 
-async def fetch_jd_from_airtable(candidate_id_for_jd: str) -> str:
+def extract_jd_from_candidate_fields(candidate_id_for_jd: str, candidate_fields: dict) -> Optional[str]:
+    raw_jd_lookup_value = candidate_fields.get(FIELD_SC_JD_LOOKUP_NAME)
+    if raw_jd_lookup_value and isinstance(raw_jd_lookup_value, list) and len(raw_jd_lookup_value) > 0:
+        extracted_jd = raw_jd_lookup_value[0]
+        if isinstance(extracted_jd, str) and extracted_jd.strip():
+            return extracted_jd.strip()
+        logger.warning(f"JD lookup field for Candidate ID '{candidate_id_for_jd}' empty/invalid. Type: {type(extracted_jd)}")
+    else:
+        logger.warning(f"JD lookup field '{FIELD_SC_JD_LOOKUP_NAME}' empty/not found for Candidate ID '{candidate_id_for_jd}'. Value: {raw_jd_lookup_value}")
+    return None
+
+def compacted_jd_forms(jd_text: str, cached_forms: Dict[str, dict]) -> Dict[str, dict]:
+    """The JD cache forms for jd_text, adding this worker's (JD_TOKEN_BUDGET, OPENAI_MODEL_NAME) form if missing."""
+    key = compacted_jd_key(JD_TOKEN_BUDGET, OPENAI_MODEL_NAME)
+    if key in cached_forms:
+        return cached_forms
+    return {**cached_forms, key: compact_job_description(jd_text, JD_TOKEN_BUDGET, OPENAI_MODEL_NAME).to_dict()}
+
+def cached_compacted_jd(jd_forms: Dict[str, dict]) -> Optional[CompactedJD]:
+    try:
+        return CompactedJD.from_dict(jd_forms[compacted_jd_key(JD_TOKEN_BUDGET, OPENAI_MODEL_NAME)])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+async def fetch_jd_from_airtable(candidate_id_for_jd: str) -> Tuple[str, CompactedJD]:
+    """Returns the candidate's JD and its compacted prompt form, both from the JD cache when possible.
+
+    Tokenizing is CPU work, so a form missing from the cache is computed off the event loop
+    and stored with the JD for every later interview.
+    """
     default_jd_text = "Job Description not available for this session. Please proceed with general technical questions about relevant software development topics."
+    loop = asyncio.get_running_loop()
+    default_jd = lambda: loop.run_in_executor(None, compact_job_description, default_jd_text, JD_TOKEN_BUDGET, OPENAI_MODEL_NAME)
     if candidate_id_for_jd == "unknown_candidate_id_for_jd":
         logger.warning("Cannot fetch JD for 'unknown_candidate_id_for_jd'. Returning default JD text.")
-        return default_jd_text
+        return default_jd_text, await default_jd()
+
+    found_in_cache, cached_jd, cached_forms = jd_cache.lookup(candidate_id_for_jd)
+    if found_in_cache:
+        if cached_jd:
+            compacted_jd = cached_compacted_jd(cached_forms)
+            logger.info(f"JD cache hit for Candidate ID '{candidate_id_for_jd}'{'' if compacted_jd else ' (compacting it for this token budget)'}.")
+            if compacted_jd is None:
+                jd_forms = await loop.run_in_executor(None, compacted_jd_forms, cached_jd, cached_forms)
+                jd_cache.put(candidate_id_for_jd, cached_jd, jd_forms)
+                compacted_jd = cached_compacted_jd(jd_forms)
+            return cached_jd, compacted_jd
+        logger.info(f"JD cache hit (cached miss) for Candidate ID '{candidate_id_for_jd}'. Returning DEFAULT JD TEXT.")
+        return default_jd_text, await default_jd()
+
     if not AIRTABLE_PAT:
         logger.error("CRITICAL: Agent's AIRTABLE_PAT environment variable is not set. Cannot fetch JD.")
-        return default_jd_text
+        return default_jd_text, await default_jd()
 
     logger.info(f"Attempting to fetch JD from 'Successful Candidates' table (ID: {SUCCESSFUL_CANDIDATES_TABLE_ID}) for Candidate ID: {candidate_id_for_jd}")
-    api = Api(AIRTABLE_PAT, timeout=AIRTABLE_API_TIMEOUT)
     jd_to_return = default_jd_text
+    compacted_jd = None
     try:
-        sc_table = api.table(AIRTABLE_BASE_ID, SUCCESSFUL_CANDIDATES_TABLE_ID)
+        sc_table = get_airtable_table(AIRTABLE_PAT, AIRTABLE_API_TIMEOUT, AIRTABLE_BASE_ID, SUCCESSFUL_CANDIDATES_TABLE_ID)
         formula = f"{{{FIELD_SC_UNIQUE_ID_NAME}}} = '{candidate_id_for_jd}'"
         logger.info(f"Using Airtable formula for JD fetch: {formula}")
-        candidate_records = await asyncio.get_event_loop().run_in_executor(
-            None, lambda: sc_table.all(formula=formula, max_records=1)
+        candidate_records = await airtable_request(
+            lambda: sc_table.all(formula=formula, max_records=1), "fetch JD"
         )
         if candidate_records:
-            candidate_record = candidate_records[0]
-            candidate_fields = candidate_record.get('fields', {})
-            raw_jd_lookup_value = candidate_fields.get(FIELD_SC_JD_LOOKUP_NAME)
-            if raw_jd_lookup_value and isinstance(raw_jd_lookup_value, list) and len(raw_jd_lookup_value) > 0:
-                extracted_jd = raw_jd_lookup_value[0]
-                if isinstance(extracted_jd, str) and extracted_jd.strip():
-                    jd_to_return = extracted_jd.strip()
-                    logger.info(f"Successfully fetched JD for Candidate ID '{candidate_id_for_jd}'.")
-                else:
-                    logger.warning(f"JD lookup field for Candidate ID '{candidate_id_for_jd}' empty/invalid. Type: {type(extracted_jd)}")
+            candidate_fields = candidate_records[0].get('fields', {})
+            extracted_jd = extract_jd_from_candidate_fields(candidate_id_for_jd, candidate_fields)
+            if extracted_jd:
+                jd_to_return = extracted_jd
+                jd_forms = await loop.run_in_executor(None, compacted_jd_forms, extracted_jd, {})
+                jd_cache.put(candidate_id_for_jd, extracted_jd, jd_forms)
+                compacted_jd = cached_compacted_jd(jd_forms)
+                logger.info(f"Successfully fetched JD for Candidate ID '{candidate_id_for_jd}'.")
             else:
-                logger.warning(f"JD lookup field '{FIELD_SC_JD_LOOKUP_NAME}' empty/not found for Candidate ID '{candidate_id_for_jd}'. Value: {raw_jd_lookup_value}")
+                jd_cache.put_miss(candidate_id_for_jd)
         else:
             logger.warning(f"No candidate record found in 'Successful Candidates' for Candidate ID: '{candidate_id_for_jd}'.")
+            jd_cache.put_miss(candidate_id_for_jd)
     except Exception as e:
         logger.error(f"Error fetching JD for Candidate ID '{candidate_id_for_jd}': {e}", exc_info=True)
     if jd_to_return == default_jd_text:
         logger.info(f"Returning DEFAULT JD TEXT for Candidate ID '{candidate_id_for_jd}'.")
-    return jd_to_return
+    return jd_to_return, compacted_jd or await default_jd()
+
+async def prefetch_jds_from_airtable() -> int:
+    """Loads the JD for every candidate in 'Successful Candidates' into jd_cache with one paginated scan.
 
-async def update_interview_session_on_shutdown(livekit_room_sid: str, new_transcript_segment: str, interview_end_time_iso: str) -> bool:
-    logger.info(f"Attempting to update Airtable 'Interview Session' (ID: {INTERVIEW_SESSIONS_TABLE_ID}) for LiveKitRoomSID: {livekit_room_sid}")
+    Each JD is stored with its compacted prompt form; a JD already cached unchanged keeps the
+    forms it has instead of being tokenized again. Each page is its own airtable_request, so the scan goes through the rate limiter page by
+    page and a retry repeats only the failed page.
+    """
     if not AIRTABLE_PAT:
-        logger.error("CRITICAL: Agent's AIRTABLE_PAT not set. Cannot update 'Interview Session'.")
-        return False
-    api = Api(AIRTABLE_PAT, timeout=AIRTABLE_API_TIMEOUT)
+        logger.error("CRITICAL: Agent's AIRTABLE_PAT environment variable is not set. Cannot prefetch JDs.")
+        return 0
+    logger.info(f"Prefetching JDs from 'Successful Candidates' table (ID: {SUCCESSFUL_CANDIDATES_TABLE_ID}).")
+    started_at = asyncio.get_event_loop().time()
+    candidate_records = []
+    try:
+        sc_table = get_airtable_table(AIRTABLE_PAT, AIRTABLE_API_TIMEOUT, AIRTABLE_BASE_ID, SUCCESSFUL_CANDIDATES_TABLE_ID)
+        options = {"fields": [FIELD_SC_UNIQUE_ID_NAME, FIELD_SC_JD_LOOKUP_NAME], "page_size": JD_PREFETCH_PAGE_SIZE}
+        while True:
+            page_options = dict(options)
+            page = await airtable_request(
+                lambda: sc_table.api.request("get", sc_table.urls.records, fallback=("post", sc_table.urls.records_post), options=page_options),
+                "prefetch JDs page",
+            )
+            candidate_records.extend(page.get("records", []))
+            if not page.get("offset"):
+                break
+            options["offset"] = page["offset"]
+    except Exception as e:
+        logger.error(f"Error prefetching JDs from 'Successful Candidates' after {len(candidate_records)} records: {e}", exc_info=True)
+        if not candidate_records:
+            return 0
+
+    jd_by_candidate_id: Dict[str, Tuple[str, Dict[str, dict]]] = {}
+    for candidate_record in candidate_records:
+        candidate_fields = candidate_record.get('fields', {})
+        candidate_id = candidate_fields.get(FIELD_SC_UNIQUE_ID_NAME)
+        if not isinstance(candidate_id, str) or not candidate_id.strip():
+            continue
+        if not candidate_fields.get(FIELD_SC_JD_LOOKUP_NAME):
+            continue
+        extracted_jd = extract_jd_from_candidate_fields(candidate_id.strip(), candidate_fields)
+        if extracted_jd:
+            _, cached_jd, cached_forms = jd_cache.lookup(candidate_id.strip())
+            jd_by_candidate_id[candidate_id.strip()] = (extracted_jd, compacted_jd_forms(extracted_jd, cached_forms if cached_jd == extracted_jd else {}))
+    jd_cache.put_many(jd_by_candidate_id)
+    elapsed = asyncio.get_event_loop().time() - started_at
+    logger.info(f"Prefetched {len(jd_by_candidate_id)} JDs from {len(candidate_records)} candidate records in {elapsed:.2f}s. JD cache size: {len(jd_cache)}.")
+    return len(jd_by_candidate_id)
+
+def start_jd_prefetch_thread() -> None:
+    """Prefetches JDs into the shared cache from the main worker process, refreshing every half TTL.
+
+    Call once from `__main__`; job processes only read the cache.
+    """
+    if not JD_CACHE_PREFETCH:
+        return
+
+    async def prefetch_forever() -> None:
+        while True:
+            prefetched = await prefetch_jds_from_airtable()
+            await asyncio.sleep(max(60.0, JD_CACHE_TTL_SECONDS / 2) if prefetched else 60.0)
+
+    threading.Thread(target=lambda: asyncio.run(prefetch_forever()), name="jd-prefetch", daemon=True).start()
+
+def register_interview_session_record(livekit_room_sid: str, session_record_airtable_id: str) -> None:
+    if _session_record_id_by_sid.get(livekit_room_sid) != session_record_airtable_id:
+        _session_record_id_by_sid[livekit_room_sid] = session_record_airtable_id
+        logger.info(f"Indexed 'Interview Session' record (Airtable ID: {session_record_airtable_id}) for LiveKitRoomSID '{livekit_room_sid}'.")
+
+def register_interview_session_record_from_metadata(livekit_room_sid: Optional[str], room_metadata: Optional[str]) -> None:
+    if not livekit_room_sid or not room_metadata:
+        return
     try:
-        interview_sessions_table = api.table(AIRTABLE_BASE_ID, INTERVIEW_SESSIONS_TABLE_ID)
-        session_filter_formula = f"{{{FIELD_IS_LIVEKIT_ROOM_SID_NAME}}} = '{livekit_room_sid}'"
-        logger.info(f"Fetching 'Interview Session' record using formula: {session_filter_formula}")
-        session_records = await asyncio.get_event_loop().run_in_executor(None,
-            lambda: interview_sessions_table.all(formula=session_filter_formula, max_records=1)
+        session_record_airtable_id = json.loads(room_metadata).get(ROOM_METADATA_SESSION_RECORD_ID_KEY)
+    except (ValueError, AttributeError) as e:
+        logger.warning(f"Room metadata for LiveKitRoomSID '{livekit_room_sid}' is not the expected JSON object: {e}")
+        return
+    if isinstance(session_record_airtable_id, str) and session_record_airtable_id:
+        register_interview_session_record(livekit_room_sid, session_record_airtable_id)
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def is_valid_transcript_segment(transcript_segment: Optional[str]) -> bool:
+    return bool(transcript_segment and transcript_segment.strip()) and \
+           "not as expected" not in transcript_segment and \
+           "No conversational items" not in transcript_segment and \
+           "No conversational dialogue" not in transcript_segment
+
+async def resolve_interview_session_record_ids(livekit_room_sids: Iterable[str]) -> None:
+    """Indexes the 'Interview Session' records of the given SIDs, one lookup per 50 unknown SIDs."""
+    unknown_sids = sorted({sid for sid in livekit_room_sids if sid not in _session_record_id_by_sid})
+    if not unknown_sids:
+        return
+    interview_sessions_table = get_airtable_table(AIRTABLE_PAT, AIRTABLE_API_TIMEOUT, AIRTABLE_BASE_ID, INTERVIEW_SESSIONS_TABLE_ID)
+    for sid_chunk in _chunks(unknown_sids, AIRTABLE_LOOKUP_FORMULA_MAX_TERMS):
+        session_filter_formula = "OR(" + ", ".join(f"{{{FIELD_IS_LIVEKIT_ROOM_SID_NAME}}} = '{sid}'" for sid in sid_chunk) + ")"
+        logger.info(f"Looking up {len(sid_chunk)} unindexed 'Interview Session' record(s) by LiveKitRoomSID.")
+        session_records = await airtable_request(
+            lambda: interview_sessions_table.all(formula=session_filter_formula, fields=[FIELD_IS_LIVEKIT_ROOM_SID_NAME]),
+            "find Interview Session"
         )
-        if not session_records:
-            logger.warning(f"No 'Interview Session' record found for LiveKitRoomSID: '{livekit_room_sid}'. Cannot update Airtable.")
-            return False
-
-        session_record_airtable_id = session_records[0]['id']
-        logger.info(f"Found 'Interview Session' record (Airtable ID: {session_record_airtable_id}) for LiveKitRoomSID '{livekit_room_sid}'.")
-        current_transcript = session_records[0].get('fields', {}).get(FIELD_IS_TRANSCRIPT_NAME, "")
-        updated_transcript_content = current_transcript
-        made_transcript_change = False
-
-        is_valid_segment = new_transcript_segment and \
-                           new_transcript_segment.strip() and \
-                           "not as expected" not in new_transcript_segment and \
-                           "No conversational items" not in new_transcript_segment and \
-                           "No conversational dialogue" not in new_transcript_segment
-        
-        if is_valid_segment:
-            time_now_formatted = datetime.now().strftime("%Y-%m-%d %H:%M:%S UTC")
-            segment_header = f"\n\n--- (Segment Appended by Agent at {time_now_formatted}) ---\n"
-            if updated_transcript_content and updated_transcript_content.strip():
-                updated_transcript_content += segment_header + new_transcript_segment
-            else: 
-                updated_transcript_content = new_transcript_segment
-            made_transcript_change = True
-            logger.info(f"Transcript segment will be appended/set for LiveKitRoomSID '{livekit_room_sid}'.")
-        else:
-            logger.info(f"No valid new transcript segment to append for LiveKitRoomSID '{livekit_room_sid}'.")
+        for session_record in session_records:
+            record_sid = session_record.get('fields', {}).get(FIELD_IS_LIVEKIT_ROOM_SID_NAME)
+            if record_sid and record_sid not in _session_record_id_by_sid:
+                register_interview_session_record(record_sid, session_record['id'])
+
+def transcript_segment_key(run_prefix: str, segment_number: int) -> str:
+    return f"{run_prefix}-{segment_number:04d}"
+
+def new_segment_run_prefix() -> str:
+    """SegmentIndex prefix for one job's segments of a session.
+
+    A re-dispatched job or a reconnect for the same SID starts its own run, so its keys never
+    collide with rows already stored; the UTC start time first keeps keys in conversation order.
+    """
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:8]}"
+
+def build_interview_session_updates(livekit_room_sid: str, new_transcript_segment: str, interview_end_time_iso: Optional[str],
+                                    continues_previous_segment: bool = False) -> List[dict]:
+    """Spool payloads for one transcript segment and/or the interview end time."""
+    base_payload = {
+        "livekit_room_sid": livekit_room_sid,
+        "session_record_id": _session_record_id_by_sid.get(livekit_room_sid),
+        "enqueued_at": datetime.now().isoformat(),
+    }
+    payloads = []
+    if is_valid_transcript_segment(new_transcript_segment) and TRANSCRIPT_STORAGE == "segments":
+        segment_number = _segment_count_by_sid.get(livekit_room_sid, 0) + 1
+        _segment_count_by_sid[livekit_room_sid] = segment_number
+        run_prefix = _segment_run_prefix_by_sid.setdefault(livekit_room_sid, new_segment_run_prefix())
+        payloads.append({**base_payload, "kind": "segment", "segment_index": transcript_segment_key(run_prefix, segment_number), "text": new_transcript_segment})
+    elif is_valid_transcript_segment(new_transcript_segment):
+        payloads.append({**base_payload, "kind": "transcript_append", "text": new_transcript_segment,
+                         "continues_previous_segment": continues_previous_segment})
+    else:
+        logger.info(f"No valid new transcript segment to append for LiveKitRoomSID '{livekit_room_sid}'.")
+    if interview_end_time_iso:
+        payloads.append({**base_payload, "kind": "session_fields", "fields": {FIELD_IS_INTERVIEW_END_TIME_NAME: interview_end_time_iso}})
+    return payloads
+
+async def update_interview_session_on_shutdown(livekit_room_sid: str, new_transcript_segment: str, interview_end_time_iso: Optional[str],
+                                               continues_previous_segment: bool = False) -> bool:
+    """Queues a transcript segment for the 'Interview Session' record.
+
+    Mid-interview checkpoints pass interview_end_time_iso=None. Once an earlier checkpoint has
+    opened the segment, continues_previous_segment=True appends without a new segment header.
+    Returns as soon as the update is fsync'd to the persistence spool; the worker's SpoolDrainer
+    writes it to Airtable (see write_interview_session_updates), so a slow or unavailable
+    Airtable never holds up the job.
+    """
+    payloads = build_interview_session_updates(livekit_room_sid, new_transcript_segment, interview_end_time_iso, continues_previous_segment)
+    if not payloads:
+        return True
+    spooled = await persistence_spool.enqueue(payloads)
+    if spooled:
+        logger.info(f"Spooled {len(payloads)} 'Interview Session' update(s) for LiveKitRoomSID: '{livekit_room_sid}'.")
+    return spooled
+
+async def write_interview_session_updates(entries: List[SpoolEntry]) -> SpoolBatchResult:
+    """SpoolDrainer callback: writes a batch of spooled updates and reports which were delivered.
+
+    Segments become linked records via batch upserts keyed on LiveKitRoomSID + SegmentIndex,
+    so writing one twice (an HTTP retry after a lost response, or a spool redelivery) is
+    harmless. Transcript appends and field updates for
+    the same session are merged into one record update, and updates go out 10 records per
+    PATCH. Each Airtable batch request is atomic, so an entry is delivered exactly when the
+    request holding it succeeded. Entries are rejected (counted towards the drainer's
+    max_attempts) only when Airtable answered 4xx other than 429 or the SID lookup completed
+    without finding their session; a failed SID lookup raises and the whole batch is retried.
+    """
+    result = SpoolBatchResult()
+    if not AIRTABLE_PAT:
+        logger.error("CRITICAL: Agent's AIRTABLE_PAT not set. Cannot write spooled 'Interview Session' updates.")
+        return result
+    await resolve_interview_session_record_ids(
+        entry.payload["livekit_room_sid"] for entry in entries if not entry.payload.get("session_record_id")
+    )
 
-        fields_to_update = { FIELD_IS_INTERVIEW_END_TIME_NAME: interview_end_time_iso }
-        if made_transcript_change:
+    segment_creates: List[Tuple[str, dict]] = []
+    session_updates: Dict[str, dict] = {}
+    for entry in entries:
+        payload = entry.payload
+        session_record_airtable_id = payload.get("session_record_id") or _session_record_id_by_sid.get(payload["livekit_room_sid"])
+        if not session_record_airtable_id:
+            logger.warning(f"No 'Interview Session' record found for LiveKitRoomSID: '{payload['livekit_room_sid']}'. Update '{entry.name}' stays spooled until the record appears or max attempts are reached.")
+            result.rejected.add(entry.name)
+            continue
+        if payload["kind"] == "segment":
+            segment_creates.append((entry.name, {
+                FIELD_TS_SESSION_LINK_NAME: [session_record_airtable_id],
+                FIELD_TS_LIVEKIT_ROOM_SID_NAME: payload["livekit_room_sid"],
+                FIELD_TS_SEGMENT_INDEX_NAME: str(payload["segment_index"]),
+                FIELD_TS_SEGMENT_TEXT_NAME: payload["text"],
+                FIELD_TS_APPENDED_AT_NAME: payload["enqueued_at"],
+            }))
+            continue
+        session_update = session_updates.setdefault(session_record_airtable_id, {"entry_names": [], "appends": [], "fields": {}})
+        session_update["entry_names"].append(entry.name)
+        if payload["kind"] == "transcript_append":
+            session_update["appends"].append(payload)
+        else:
+            session_update["fields"].update(payload["fields"])
+
+    if segment_creates:
+        segments_table = get_airtable_table(AIRTABLE_PAT, AIRTABLE_API_TIMEOUT, AIRTABLE_BASE_ID, TRANSCRIPT_SEGMENTS_TABLE_ID)
+        for create_chunk in _chunks(segment_creates, AIRTABLE_MAX_RECORDS_PER_REQUEST):
+            try:
+                await airtable_request(
+                    lambda: segments_table.batch_upsert(
+                        [{"fields": fields} for _, fields in create_chunk],
+                        key_fields=[FIELD_TS_LIVEKIT_ROOM_SID_NAME, FIELD_TS_SEGMENT_INDEX_NAME], typecast=True,
+                    ),
+                    "upsert transcript segments"
+                )
+                result.delivered.update(name for name, _ in create_chunk)
+            except Exception as e:
+                logger.error(f"Failed to upsert {len(create_chunk)} transcript segment record(s): {e}", exc_info=True)
+                if is_permanent_airtable_error(e):
+                    result.rejected.update(name for name, _ in create_chunk)
+
+    if not session_updates:
+        return result
+    interview_sessions_table = get_airtable_table(AIRTABLE_PAT, AIRTABLE_API_TIMEOUT, AIRTABLE_BASE_ID, INTERVIEW_SESSIONS_TABLE_ID)
+    # TRANSCRIPT_STORAGE=field: the whole Transcript field has to be rewritten, so read the
+    # current values of every session with appends in as few requests as possible.
+    current_transcripts: Dict[str, str] = {}
+    record_ids_to_read = [record_id for record_id, update in session_updates.items() if update["appends"]]
+    for record_id_chunk in _chunks(record_ids_to_read, AIRTABLE_LOOKUP_FORMULA_MAX_TERMS):
+        records_filter_formula = "OR(" + ", ".join(f"RECORD_ID() = '{record_id}'" for record_id in record_id_chunk) + ")"
+        try:
+            session_records = await airtable_request(
+                lambda: interview_sessions_table.all(formula=records_filter_formula, fields=[FIELD_IS_TRANSCRIPT_NAME]),
+                "read Interview Session transcripts"
+            )
+        except Exception as e:
+            logger.error(f"Failed to read {len(record_id_chunk)} 'Interview Session' transcript(s): {e}", exc_info=True)
+            for record_id in record_id_chunk:
+                entry_names = session_updates.pop(record_id)["entry_names"]
+                if is_permanent_airtable_error(e):
+                    result.rejected.update(entry_names)
+            continue
+        for session_record in session_records:
+            current_transcripts[session_record['id']] = session_record.get('fields', {}).get(FIELD_IS_TRANSCRIPT_NAME, "")
+
+    record_updates = []
+    for record_id, session_update in session_updates.items():
+        fields_to_update = dict(session_update["fields"])
+        if session_update["appends"]:
+            updated_transcript_content = current_transcripts.get(record_id, "")
+            for append in session_update["appends"]:
+                time_appended_formatted = datetime.fromisoformat(append["enqueued_at"]).strftime("%Y-%m-%d %H:%M:%S UTC")
+                segment_header = "\n" if append["continues_previous_segment"] else f"\n\n--- (Segment Appended by Agent at {time_appended_formatted}) ---\n"
+                if updated_transcript_content and updated_transcript_content.strip():
+                    updated_transcript_content += segment_header + append["text"]
+                else:
+                    updated_transcript_content = append["text"]
             fields_to_update[FIELD_IS_TRANSCRIPT_NAME] = updated_transcript_content
+        record_updates.append((session_update["entry_names"], {"id": record_id, "fields": fields_to_update}))
 
-        await asyncio.get_event_loop().run_in_executor(None,
-            lambda: interview_sessions_table.update(session_record_airtable_id, fields_to_update, typecast=True)
-        )
-        logger.info(f"Successfully updated Airtable 'Interview Session' for LiveKitRoomSID: '{livekit_room_sid}'.")
-        return True
+    for update_chunk in _chunks(record_updates, AIRTABLE_MAX_RECORDS_PER_REQUEST):
+        try:
+            await airtable_request(
+                lambda: interview_sessions_table.batch_update([record for _, record in update_chunk], typecast=True),
+                "update Interview Sessions"
+            )
+            for entry_names, _ in update_chunk:
+                result.delivered.update(entry_names)
+        except Exception as e:
+            logger.error(f"Failed to update {len(update_chunk)} 'Interview Session' record(s): {e}", exc_info=True)
+            if is_permanent_airtable_error(e):
+                for entry_names, _ in update_chunk:
+                    result.rejected.update(entry_names)
+    return result
+
+async def check_transcript_segments_table() -> Optional[str]:
+    """Reads one record of the Transcript Segments table with every field the agent writes.
+
+    Returns why the table can't be used (missing table or field), or None. Errors retrying can
+    fix are only logged, so an Airtable outage doesn't keep the worker from starting.
+    """
+    segments_table = get_airtable_table(AIRTABLE_PAT, AIRTABLE_API_TIMEOUT, AIRTABLE_BASE_ID, TRANSCRIPT_SEGMENTS_TABLE_ID)
+    segment_fields = [FIELD_TS_SESSION_LINK_NAME, FIELD_TS_LIVEKIT_ROOM_SID_NAME, FIELD_TS_SEGMENT_INDEX_NAME,
+                      FIELD_TS_SEGMENT_TEXT_NAME, FIELD_TS_APPENDED_AT_NAME]
+    try:
+        await airtable_request(lambda: segments_table.first(fields=segment_fields), "check Transcript Segments table")
     except Exception as e:
-        logger.error(f"Error updating Airtable 'Interview Session' for LiveKitRoomSID '{livekit_room_sid}': {e}", exc_info=True)
-        return False
+        if is_permanent_airtable_error(e):
+            return f"table '{TRANSCRIPT_SEGMENTS_TABLE_ID}' or one of its fields ({', '.join(segment_fields)}) is missing or not accessible: {e}"
+        logger.warning(f"Could not check the '{TRANSCRIPT_SEGMENTS_TABLE_ID}' table ({e}). Starting anyway.")
+    return None
+
+def format_transcript_line(item: dict) -> Optional[str]:
+    if not isinstance(item, dict) or item.get('type') != 'message':
+        return None
+    role = item.get('role')
+    content_list = item.get('content', [])
+    if not isinstance(content_list, list):
+        logger.debug(f"Content for role '{role}' is not a list, skipping: {content_list}")
+        return None
+    text_content = " ".join(str(c_part) for c_part in content_list if isinstance(c_part, (str, int, float))).strip()
+    if not text_content:
+        return None
+    speaker = "Alex (AI Interviewer)" if role == 'assistant' else "Candidate" if role == 'user' else None
+    if not speaker:
+        logger.debug(f"Unhandled role in history formatting: {role} - Content: {text_content}")
+        return None
+    return f"{speaker}: {text_content}"
+
+def iter_formatted_transcript_lines(conversation_items: Iterable[dict]) -> Iterator[str]:
+    for item in conversation_items:
+        formatted_line = format_transcript_line(item)
+        if formatted_line:
+            yield formatted_line
 
-def format_transcript_from_history(history_dict: dict) -> str:
-    formatted_lines = []
-    if not history_dict or not isinstance(history_dict.get('items'), list):
-        logger.warning(f"Session history format unexpected or 'items' key missing. History: {history_dict}")
-        return "Session history format is not as expected or items are missing."
-    conversation_items = history_dict.get('items', [])
-    if not conversation_items:
+def join_transcript_lines(formatted_lines: List[str], item_count: int) -> str:
+    if not item_count:
         logger.info("No items in session history to format for transcript.")
         return "No conversational items found in session history."
-    for item in conversation_items:
-        if not isinstance(item, dict) or item.get('type') != 'message':
-            continue
-        role = item.get('role')
-        content_list = item.get('content', [])
-        if not isinstance(content_list, list):
-            logger.debug(f"Content for role '{role}' is not a list, skipping: {content_list}")
-            continue
-        text_content = " ".join(str(c_part) for c_part in content_list if isinstance(c_part, (str, int, float))).strip()
-        if not text_content: 
-            continue
-        speaker = "Alex (AI Interviewer)" if role == 'assistant' else "Candidate" if role == 'user' else None
-        if speaker:
-            formatted_lines.append(f"{speaker}: {text_content}")
-        else:
-            logger.debug(f"Unhandled role in history formatting: {role} - Content: {text_content}")
     if not formatted_lines:
         logger.info("No user/assistant messages found in history to format for transcript.")
         return "No conversational dialogue found in session history."
     return "\n".join(formatted_lines)
 
+def format_transcript_from_history(history_dict: dict) -> str:
+    if not history_dict or not isinstance(history_dict.get('items'), list):
+        logger.warning(f"Session history format unexpected or 'items' key missing. History: {history_dict}")
+        return "Session history format is not as expected or items are missing."
+    conversation_items = history_dict['items']
+    return join_transcript_lines(list(iter_formatted_transcript_lines(conversation_items)), len(conversation_items))
+
+def transcript_filename_base(livekit_room_sid: Optional[str], requested_room_name: str) -> str:
+    if livekit_room_sid and isinstance(livekit_room_sid, str):
+        return f"SID_{livekit_room_sid.replace(':', '_').replace('/', '_')}"
+    return f"RoomName_{requested_room_name.replace(' ', '_').replace('/', '_')}_NoSID_Error"
+
+async def wait_for_candidate_audio_track(room: rtc.Room) -> str:
+    """Returns the identity of the first remote participant whose audio track is subscribed."""
+    subscribed = asyncio.get_running_loop().create_future()
+
+    def on_track_subscribed(track: rtc.Track, publication: rtc.RemoteTrackPublication, participant: rtc.RemoteParticipant):
+        if track.kind == rtc.TrackKind.KIND_AUDIO and not subscribed.done():
+            subscribed.set_result(participant.identity)
+
+    room.on("track_subscribed", on_track_subscribed)
+    try:
+        for participant in room.remote_participants.values():
+            if any(publication.kind == rtc.TrackKind.KIND_AUDIO and publication.subscribed
+                   for publication in participant.track_publications.values()):
+                return participant.identity
+        return await subscribed
+    finally:
+        room.off("track_subscribed", on_track_subscribed)
+
+def configured_plugin_modules() -> List[str]:
+    return [*LOCAL_MODEL_PLUGINS, *(choice.spec.plugin_module for chain in PROVIDER_CHAINS.values() for choice in chain)]
+
+def create_configured_provider(choice: ProviderChoice):
+    options = dict(PROVIDER_OPTIONS.get((choice.spec.kind, choice.spec.name), {}))
+    if choice.model:
+        options["model"] = choice.model
+    return create_provider(choice.spec, options)
+
+def prewarm(proc: JobProcess):
+    """Loads VAD, turn-detection and noise-cancellation models and the token encoding once per worker process."""
+    load_plugins(configured_plugin_modules())
+    from livekit.plugins import noise_cancellation, silero
+    from livekit.plugins.turn_detector.multilingual import MultilingualModel
+
+    prewarm_started_at = time.perf_counter()
+    proc.userdata["vad"] = silero.VAD.load()
+    vad_loaded_at = time.perf_counter()
+    proc.userdata["turn_detection"] = MultilingualModel()
+    turn_detection_loaded_at = time.perf_counter()
+    proc.userdata["noise_cancellation"] = noise_cancellation.BVC()
+    noise_cancellation_loaded_at = time.perf_counter()
+    warm_token_encoding(OPENAI_MODEL_NAME)
+    prewarm_done_at = time.perf_counter()
+    proc.userdata["prewarmed"] = True
+    logger.info(
+        f"Prewarm complete in {(prewarm_done_at - prewarm_started_at) * 1000:.0f} ms "
+        f"(VAD: {(vad_loaded_at - prewarm_started_at) * 1000:.0f} ms, "
+        f"turn detector: {(turn_detection_loaded_at - vad_loaded_at) * 1000:.0f} ms, "
+        f"BVC: {(noise_cancellation_loaded_at - turn_detection_loaded_at) * 1000:.0f} ms, "
+        f"token encoding: {(prewarm_done_at - noise_cancellation_loaded_at) * 1000:.0f} ms)."
+    )
+
 class Assistant(Agent):
-    def __init__(self) -> None:
-        super().__init__(instructions="This default instruction is overridden at runtime by dynamic_llm_instructions.")
+    def __init__(self, instructions: str) -> None:
+        super().__init__(instructions=instructions)
+
+    async def tts_node(self, text, model_settings):
+        if tts_audio_cache is None:
+            async for frame in Agent.default.tts_node(self, text, model_settings):
+                yield frame
+            return
+        async for frame in cached_phrase_tts_node(self, text, model_settings, tts_audio_cache, SCRIPTED_PHRASES):
+            yield frame
 
 async def entrypoint(ctx: JobContext):
+    job_started_at = time.perf_counter()
     agent_session_instance: Optional[AgentSession] = None
+    transcript_journal: Optional[TranscriptJournal] = None
+    turn_latency_recorder: Optional[TurnLatencyRecorder] = None
+    interview_prompt = None
+    speculative_greeting: Optional[SpeculativeGreeting] = None
+    job_load_reporter: Optional[JobLoadReporter] = None
+    provider_router: Optional[ProviderRouter] = None
+    assistant: Optional[Assistant] = None
+    startup_timeline = StartupTimeline(job_started_at)
     livekit_sid_for_airtable_update: Optional[str] = None
     requested_room_name_for_jd_parsing: str = "unknown_room_name_at_connect_time"
 
     async def shutdown_operations_callback():
-        nonlocal livekit_sid_for_airtable_update, agent_session_instance, requested_room_name_for_jd_parsing
+        nonlocal livekit_sid_for_airtable_update, agent_session_instance, requested_room_name_for_jd_parsing, transcript_journal, turn_latency_recorder, interview_prompt, speculative_greeting, job_load_reporter, provider_router
         logger.info("Agent shutdown callback initiated.")
+        if job_load_reporter:
+            await job_load_reporter.aclose()
+        if speculative_greeting:
+            await speculative_greeting.aclose()
+        if provider_router:
+            await provider_router.stats_store.flush()
         if not agent_session_instance:
             logger.error("AgentSession (agent_session_instance) not available during shutdown. Cannot process transcript.")
             return
@@ -213,29 +692,42 @@ async def entrypoint(ctx: JobContext):
         interview_end_time_iso_str = current_time_obj.isoformat()
         timestamp_for_filename = current_time_obj.strftime("%Y%m%d_%H%M%S")
 
-        sid_for_filename = "UnknownSID"
-        if livekit_sid_for_airtable_update and isinstance(livekit_sid_for_airtable_update, str):
-             sid_for_filename = livekit_sid_for_airtable_update.replace(':', '_').replace('/', '_')
-        
-        filename_base_part = f"SID_{sid_for_filename}" if livekit_sid_for_airtable_update else \
-                             f"RoomName_{requested_room_name_for_jd_parsing.replace(' ', '_').replace('/', '_')}_NoSID_Error"
-        
-        transcript_backup_dir = "/tmp/ai_interviewer_transcripts"
+        filename_base_part = transcript_filename_base(livekit_sid_for_airtable_update, requested_room_name_for_jd_parsing)
+        transcript_backup_dir = TRANSCRIPT_BACKUP_DIR
         try:
             if not os.path.exists(transcript_backup_dir):
                 os.makedirs(transcript_backup_dir, exist_ok=True)
         except OSError as e:
             logger.error(f"Could not create transcript backup directory '{transcript_backup_dir}': {e}.", exc_info=True)
 
-        local_json_transcript_filename = os.path.join(transcript_backup_dir, f"transcript_{filename_base_part}_{timestamp_for_filename}.json")
-        history_dict = None
+        local_transcript_filename = os.path.join(
+            transcript_backup_dir, f"transcript_{filename_base_part}_{timestamp_for_filename}{backup_file_suffix(TRANSCRIPT_BACKUP_COMPRESSION)}"
+        )
+        backup_metadata = {"livekit_room_sid": livekit_sid_for_airtable_update, "room_name": requested_room_name_for_jd_parsing,
+                           "startup_timeline": startup_timeline.to_dict()}
+        if turn_latency_recorder:
+            # Its airtable_requests cover only the JD fetch; writes are timed by the spool drainer's histogram.
+            backup_metadata["latency_metrics"] = turn_latency_recorder.to_dict()
+        if provider_router:
+            backup_metadata["providers"] = provider_router.to_dict()
+        if interview_prompt:
+            backup_metadata["prompt_token_counts"] = {
+                "total": interview_prompt.total_tokens, "static_prefix": interview_prompt.static_prefix_tokens,
+                "jd": interview_prompt.jd_tokens, "jd_raw": interview_prompt.jd_raw_tokens, "jd_truncated": interview_prompt.jd_truncated,
+            }
+        # Only the shallow copy happens on the event loop; converting, serializing, compressing and
+        # formatting the history run in one pass on a worker thread.
+        history_snapshot = agent_session_instance.history.copy()
+        formatted_transcript_segment = None
         try:
-            history_dict = agent_session_instance.history.to_dict()
-            with open(local_json_transcript_filename, 'w') as f:
-                json.dump(history_dict, f, indent=2)
-            logger.info(f"Local JSON transcript backup saved to: {local_json_transcript_filename}")
+            formatted_lines, item_count = await write_transcript_backup_async(
+                local_transcript_filename, lambda: iter_history_items(history_snapshot), backup_metadata,
+                format_transcript_line, TRANSCRIPT_BACKUP_COMPRESSION,
+            )
+            formatted_transcript_segment = join_transcript_lines(formatted_lines, item_count)
+            logger.info(f"Local transcript backup ({item_count} items, {TRANSCRIPT_BACKUP_COMPRESSION}) saved to: {local_transcript_filename}")
         except Exception as e:
-            logger.error(f"Failed to write local JSON transcript to {local_json_transcript_filename}: {e}", exc_info=True)
+            logger.error(f"Failed to write local transcript backup to {local_transcript_filename}: {e}", exc_info=True)
 
         if not livekit_sid_for_airtable_update: 
             logger.error("LiveKit Room SID was not available (None or not a string) at shutdown. Cannot update Airtable 'Interview Session'.")
@@ -244,139 +736,178 @@ async def entrypoint(ctx: JobContext):
         # Ensure SID is a string before passing to Airtable update function
         sid_to_update = str(livekit_sid_for_airtable_update)
 
-        if history_dict:
-            formatted_transcript_segment = format_transcript_from_history(history_dict)
+        if transcript_journal:
+            remaining_delta, continues_previous_segment = await transcript_journal.aclose()
+            logger.info(f"Spooling final transcript delta ({len(remaining_delta)} chars) and end time for LiveKit SID: {sid_to_update}.")
+            await update_interview_session_on_shutdown(sid_to_update, remaining_delta, interview_end_time_iso_str,
+                                                       continues_previous_segment=continues_previous_segment)
+        else:
+            if formatted_transcript_segment is None:
+                logger.warning(f"Transcript backup failed for SID '{sid_to_update}'. Formatting the transcript on the event loop.")
+                formatted_transcript_segment = format_transcript_from_history(history_snapshot.to_dict())
             logger.info(f"Formatted transcript segment obtained for Airtable 'Interview Session' (LiveKit SID: {sid_to_update}).")
             await update_interview_session_on_shutdown(sid_to_update, formatted_transcript_segment, interview_end_time_iso_str)
-        else:
-            logger.warning(f"Session history_dict not available for SID '{sid_to_update}'. Updating end time only.")
-            await update_interview_session_on_shutdown(sid_to_update, "", interview_end_time_iso_str)
 
     ctx.add_shutdown_callback(shutdown_operations_callback)
-    await ctx.connect()
-    logger.info("Agent successfully connected to LiveKit room.")
 
-    if ctx.room:
+    # Startup steps overlap: the room name and SID are known from the job before connecting,
+    # so the JD fetch (and in-job model loading, if needed) runs alongside connect and session
+    # start, and the greeting is generated as soon as the JD arrives.
+    requested_room_name_for_jd_parsing = ctx.job.room.name.strip() if ctx.job.room.name else "unknown_room_name_from_livekit_ctx"
+    livekit_sid_for_airtable_update = ctx.job.room.sid or None
+    turn_latency_recorder = TurnLatencyRecorder(livekit_sid_for_airtable_update)
+    turn_latency_recorder.activate()
+    job_load_reporter = JobLoadReporter(WORKER_LOAD_STATE_DIR, requested_room_name_for_jd_parsing)
+    job_load_reporter.start()
+
+    base_candidate_id_for_jd, _ = parse_candidate_id_from_room_name(requested_room_name_for_jd_parsing)
+    jd_fetch_task = asyncio.create_task(startup_timeline.track("jd_fetch", fetch_jd_from_airtable(base_candidate_id_for_jd)))
+    connect_task = asyncio.create_task(startup_timeline.track("connect", ctx.connect()))
+
+    models_were_prewarmed = bool(ctx.proc.userdata.get("prewarmed"))
+    if not models_were_prewarmed:
+        logger.warning("Worker process was not prewarmed. Loading VAD, turn detector and BVC inside the job.")
+        load_plugins(configured_plugin_modules())
+        await startup_timeline.track("model_load", asyncio.get_running_loop().run_in_executor(None, prewarm, ctx.proc))
+
+    provider_router = ProviderRouter(
+        PROVIDER_CHAINS,
+        {"stt": STT_FINAL_DELAY_SLO_MS / 1000, "llm": LLM_TTFT_SLO_MS / 1000, "tts": TTS_TTFB_SLO_MS / 1000},
+        create_configured_provider,
+        breaches_before_failover=PROVIDER_SLO_BREACHES_BEFORE_FAILOVER,
+        cooldown_seconds=PROVIDER_FAILOVER_COOLDOWN_SECONDS,
+        stats_store=ProviderStatsStore(PROVIDER_STATS_STATE_PATH),
+    )
+    await provider_router.load_stats()
+    # Before the Assistant exists, a failover (e.g. during the greeting) only changes what the session starts with.
+    provider_router.on_failover(lambda kind, instance: assistant.update_options(**{kind: instance}) if assistant else None)
+    session_llm = provider_router.current("llm")
+    session_tts = provider_router.current("tts")
+    session_llm.prewarm()
+    session_tts.prewarm()
+    speculative_greeting = SpeculativeGreeting(session_llm, session_tts, startup_timeline, audio_cache=tts_audio_cache, phrases=SCRIPTED_PHRASES)
+
+    async def prepare_interview_prompt():
+        jd_text_for_llm, compacted_jd = await jd_fetch_task
+        logger.info(f"Job Description for LLM (Candidate ID: {base_candidate_id_for_jd}, Length: {len(jd_text_for_llm)}): '{jd_text_for_llm[:300]}...'")
+        # The compacted JD and its token counts come from the JD cache. The static parts are counted
+        # in prewarm; on the executor in case this process wasn't prewarmed.
+        prompt = await asyncio.get_running_loop().run_in_executor(None, build_interview_instructions, compacted_jd, OPENAI_MODEL_NAME)
+        logger.info(
+            f"Interview prompt tokens (Room: {requested_room_name_for_jd_parsing}): total {prompt.total_tokens}, "
+            f"static prefix {prompt.static_prefix_tokens}, JD {prompt.jd_tokens} "
+            f"(raw {prompt.jd_raw_tokens}, budget {JD_TOKEN_BUDGET}{', truncated' if prompt.jd_truncated else ''})."
+        )
+        speculative_greeting.start(prompt.instructions, GREETING_TURN_INSTRUCTIONS)
+        return prompt
+
+    interview_prompt_task = asyncio.create_task(prepare_interview_prompt())
+
+    await connect_task
+    logger.info("Agent successfully connected to LiveKit room.")
+    if not livekit_sid_for_airtable_update:
         try:
-            # ***** CORRECTED SID RETRIEVAL *****
             # livekit.rtc.Room.sid is an async property, access it with await.
-            livekit_sid_for_airtable_update = await ctx.room.sid 
-            # ***********************************
-            logger.info(f"Successfully retrieved LiveKit Room SID: {livekit_sid_for_airtable_update}")
+            livekit_sid_for_airtable_update = await startup_timeline.track("room_sid", ctx.room.sid)
+            turn_latency_recorder.livekit_room_sid = livekit_sid_for_airtable_update
         except Exception as e:
             logger.error(f"Failed to retrieve room.sid: {e}", exc_info=True)
-            livekit_sid_for_airtable_update = None 
-            
-        requested_room_name_for_jd_parsing = ctx.room.name.strip() if ctx.room.name else "unknown_room_name_from_livekit_ctx"
-        logger.info(f"Agent Session Details - Room Name (for JD): '{requested_room_name_for_jd_parsing}', LiveKit SID (for Airtable): '{livekit_sid_for_airtable_update}'")
-    else:
-        logger.error("CRITICAL: ctx.room is None after connect. Cannot get SID or Name.")
-
-    base_candidate_id_for_jd, _ = parse_candidate_id_from_room_name(requested_room_name_for_jd_parsing)
-    jd_text_for_llm = await fetch_jd_from_airtable(base_candidate_id_for_jd)
-    logger.info(f"Job Description for LLM (Candidate ID: {base_candidate_id_for_jd}, Length: {len(jd_text_for_llm)}): '{jd_text_for_llm[:300]}...'")
-
-    dynamic_llm_instructions = f"""You are 'Alex', an expert AI interviewer.
-Your PRIMARY OBJECTIVE is to evaluate a candidate against the SPECIFIC requirements in the Job Description below.
-You will ask questions ONE AT A TIME and wait for a response.
-
---- START OF CRITICAL JOB DESCRIPTION FOR THIS INTERVIEW ---
-{jd_text_for_llm}
---- END OF CRITICAL JOB DESCRIPTION FOR THIS INTERVIEW ---
-
-YOUR IMMEDIATE TASK:
-You will ask questions ONE AT A TIME and wait for a response.
-1.  Analyze the 'CRITICAL JOB DESCRIPTION' to identify the likely position title.
-2.  Formulate your GREETING.
-3.  Identify ONE foundational, concept-based question based on a core "Primary Skill" or "must-have" technical skill from the Job Description.
-4.  SPEAK ONLY your greeting, state the role, check readiness, and then ask ONLY THIS ONE first foundational question. Do NOT list other questions or future steps.
-
-Example of how to start (adapt the role based on the JD):
-"Hello, I'm Alex, your interviewer today. I'll interview for a role related to [identified position title/summary from JD]. This technical session will focus on the skills in that job description. Are you ready to begin?"
-(Wait for "yes")
-You will ask questions ONE AT A TIME and wait for a response.
-"Great. Let's start with a foundational question. Based on the job description's emphasis on [Primary Skill from JD], could you explain [concept related to that primary skill]?"
-
-DO NOT reveal the rest of the interview structure or your other planned questions in this first turn.
-You will ask questions ONE AT A TIME and wait for a response.
-Wait for the candidate's response to this single question.
-Future questions will cover medium and challenging topics, also derived from the JD, and you will ask follow-ups if needed. For now, just ask the first foundational question after your greeting.
-Avoid any special formatting characters in your spoken output.
-
-IF A CANDIDATE'S ANSWER IS INCOMPLETE, UNCLEAR, OR NOT SUFFICIENTLY DETAILED:
-You MUST ask ONE or TWO targeted follow-up questions to probe deeper into their understanding of THAT specific concept or skill from the JD.
-Your follow-up should aim to elicit more detail, clarify their reasoning, or test the practical application of their stated knowledge.
-Example of a follow-up: "Could you elaborate on that?" or "Can you give me a specific example of how you've applied that concept mentioned in the JD?" or "What challenges might you anticipate with that approach in the context of [relevant aspect from JD]?"
-Only after you are satisfied with their response (or have exhausted follow-ups for that point) should you move to the next distinct question.
-
-HANDLING CANDIDATE QUESTIONS ABOUT THE JOB DESCRIPTION:
-If the candidate asks you to "tell me more about the job description," or similar questions requesting details from the JD, you SHOULD provide a concise summary or answer their specific query using the information from the 'CRITICAL JOB DESCRIPTION FOR THIS INTERVIEW' section. Do NOT say you don't have access. You DO have access. After answering, gently guide the conversation back to your interview questions.
-
-INTERVIEW STAGES (IN INCREASING ORDER OF DIFFICULTY):
-
-1.  Greeting and Readiness:
-    Analyze the 'CRITICAL JOB DESCRIPTION' to identify the position title or main role.
-    You will ask questions ONE AT A TIME and wait for a response.
-    Start with: "Hello, I'm Alex, your interviewer today. It looks like we're discussing a role related to [mention the identified position title/summary from JD, e.g., 'a Senior PHP Developer position']. This technical session will focus on the technical skills and concepts outlined in that job description. Are you ready to begin?"
-    Wait for an affirmative response. Speak naturally, without special characters or formatting. If no clear title is present, say "a software development role focusing on the skills in this description." You will ask questions ONE AT A TIME and wait for a response.
-    After they confirm readiness, say: "Great. We'll start with some foundational questions based on the job description, then gradually move to more complex topics."
-
-2.  Stage 1: Foundational Concept-Based Questions (from JD's "Primary" or "Must-Have" Skills):
-    You will ask questions ONE AT A TIME and wait for a response.
-    Goal: Assess basic understanding of core concepts.
-    Identify 2-3 core "Primary Skills" or "must-have" technical skills explicitly listed in the 'CRITICAL JOB DESCRIPTION FOR THIS INTERVIEW'.
-    For each of these identified skills, formulate ONE foundational, concept-based question. This question should be designed to assess the candidate's basic understanding of a core concept related to that specific skill as it's described or implied in the JD.
-    Apply the follow-up question strategy if answers are insufficient.
-
-3.  Stage 2: Medium-Level Concept-Based Questions (from JD's "Secondary Skills" or "Key Responsibilities"):
-    You will ask questions ONE AT A TIME and wait for a response.
-    Goal: Assess deeper understanding and ability to compare or relate concepts.
-    After completing Stage 1, announce: "Okay, let's move on to some more detailed questions."
-    Transition to questions based on "Secondary Skills" or technical skills implied by the "Key Responsibilities" section in the Job Description.
-    Formulate 2-3 concept-based questions that require a deeper understanding or ask for comparisons of approaches relevant to those skills from the JD.
-    Apply the follow-up question strategy if answers are insufficient.
-
-4.  Stage 3: Challenging Scenario/Concept Questions (from complex aspects of JD):
-    You will ask questions ONE AT A TIME and wait for a response.
-    Goal: Assess problem-solving, design thinking, and handling of complexity.
-    After completing Stage 2, announce: "Now for a couple of more challenging questions that might involve scenarios or deeper technical design."
-    Identify 1-2 challenging aspects, a combination of multiple skills mentioned, or a senior-level responsibility from the Job Description.
-    Formulate 1-2 concept-based questions or brief hypothetical mini-scenarios that would test problem-solving or design thinking related to these complex elements from the JD. These questions should require the candidate to apply their knowledge of concepts mentioned or implied in the JD.
-    Apply the follow-up question strategy if answers are insufficient.
-
-5.  Concluding the Interview:
-    You will ask questions ONE AT A TIME and wait for a response.
-    Thank the candidate. Your summary MUST directly assess their conceptual understanding of the skills and responsibilities MENTIONED IN THE 'CRITICAL JOB DESCRIPTION', considering their performance across all stages.
-    Specifically mention:
-    - Grasp of core concepts related to "Primary Skills" from the JD.
-    - Understanding of concepts from "Secondary Skills" or "Key Responsibilities" in the JD.
-    - Ability to handle more complex scenario-based questions related to the JD.
-    - Strengths in conceptual understanding relevant to the JD.
-    - Areas where conceptual understanding related to the JD seemed lacking, noting if follow-ups helped clarify.
-    Maintain a professional tone. Avoid special formatting characters.
-"""
+            livekit_sid_for_airtable_update = None
+    logger.info(f"Successfully retrieved LiveKit Room SID: {livekit_sid_for_airtable_update}")
+    register_interview_session_record_from_metadata(livekit_sid_for_airtable_update, ctx.room.metadata)
+    ctx.room.on("room_metadata_changed", lambda old_metadata, new_metadata: register_interview_session_record_from_metadata(
+        livekit_sid_for_airtable_update, new_metadata
+    ))
+    logger.info(f"Agent Session Details - Room Name (for JD): '{requested_room_name_for_jd_parsing}', LiveKit SID (for Airtable): '{livekit_sid_for_airtable_update}'")
 
     agent_session_instance = AgentSession(
-        stt=deepgram.STT(model="nova-3", language="multi"),
-        llm=openai.LLM(model=OPENAI_MODEL_NAME),
-        tts=cartesia.TTS(),
-        vad=silero.VAD.load(),
-        turn_detection=MultilingualModel(),
+        stt=provider_router.current("stt"),
+        llm=provider_router.current("llm"),
+        tts=provider_router.current("tts"),
+        vad=ctx.proc.userdata["vad"],
+        turn_detection=ctx.proc.userdata["turn_detection"],
     )
-    await agent_session_instance.start(
-        room=ctx.room, agent=Assistant(),
-        room_input_options=RoomInputOptions(noise_cancellation=noise_cancellation.BVC())
+    agent_session_instance.on("metrics_collected", turn_latency_recorder.on_metrics_collected)
+    agent_session_instance.on("metrics_collected", provider_router.on_session_metrics_collected)
+    logger.info(f"Session providers: STT '{provider_router.current_key('stt')}', LLM '{provider_router.current_key('llm')}', TTS '{provider_router.current_key('tts')}'.")
+
+    if livekit_sid_for_airtable_update:
+        sid_for_checkpoints = str(livekit_sid_for_airtable_update)
+        journal_path = os.path.join(
+            TRANSCRIPT_BACKUP_DIR,
+            f"journal_{transcript_filename_base(sid_for_checkpoints, requested_room_name_for_jd_parsing)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson"
+        )
+        try:
+            os.makedirs(TRANSCRIPT_BACKUP_DIR, exist_ok=True)
+            transcript_journal = TranscriptJournal(
+                journal_path,
+                format_item=format_transcript_line,
+                flush_delta=lambda delta, continues: update_interview_session_on_shutdown(
+                    sid_for_checkpoints, delta, None, continues_previous_segment=continues
+                ),
+                flush_interval_seconds=TRANSCRIPT_CHECKPOINT_INTERVAL_SECONDS,
+                flush_batch_items=TRANSCRIPT_CHECKPOINT_BATCH_ITEMS,
+            )
+            agent_session_instance.on("conversation_item_added", transcript_journal.on_conversation_item_added)
+            transcript_journal.start()
+            logger.info(f"Streaming transcript journal to: {journal_path}")
+        except OSError as e:
+            logger.error(f"Could not open transcript journal '{journal_path}': {e}. Transcript will be written at shutdown only.", exc_info=True)
+            transcript_journal = None
+
+    # Don't hold the session back for the JD: start with the static prefix and swap in the
+    # full instructions when they are ready. The greeting itself always waits for the JD.
+    if interview_prompt_task.done():
+        interview_prompt = interview_prompt_task.result()
+    assistant = Assistant(instructions=interview_prompt.instructions if interview_prompt else STATIC_INSTRUCTIONS_PREFIX)
+    await startup_timeline.track("session_start", agent_session_instance.start(
+        room=ctx.room, agent=assistant,
+        room_input_options=RoomInputOptions(noise_cancellation=ctx.proc.userdata["noise_cancellation"])
+    ))
+    logger.info(
+        f"Agent session started {(time.perf_counter() - job_started_at) * 1000:.0f} ms after job start "
+        f"({'warm' if models_were_prewarmed else 'cold'} start)."
     )
-    logger.info("Agent session started. Starting generate_reply.")
-    await agent_session_instance.generate_reply(instructions=dynamic_llm_instructions)
-    logger.info("Initial generate_reply call completed.")
+    if interview_prompt is None:
+        interview_prompt = await interview_prompt_task
+        await assistant.update_instructions(interview_prompt.instructions)
+
+    try:
+        candidate_identity = await startup_timeline.track(
+            "candidate_audio_track", asyncio.wait_for(wait_for_candidate_audio_track(ctx.room), GREETING_AUDIO_TRACK_WAIT_SECONDS)
+        )
+        logger.info(f"Candidate audio track subscribed (participant: {candidate_identity}).")
+    except asyncio.TimeoutError:
+        logger.warning(f"No candidate audio track after {GREETING_AUDIO_TRACK_WAIT_SECONDS:.0f} s. Greeting anyway.")
+
+    try:
+        greeting_text = await speculative_greeting.text()
+    except Exception as e:
+        logger.warning(f"Pre-generated greeting unavailable ({e}). Falling back to generate_reply.")
+        greeting_text = None
+    greeting_audio_ready = False
+    if greeting_text:
+        try:
+            await speculative_greeting.audio_frames()
+            greeting_audio_ready = True
+        except Exception as e:
+            logger.warning(f"Pre-generated greeting audio unavailable ({e}). The session's TTS will speak the greeting.")
+    startup_timeline.begin("greeting_say")
+    if greeting_audio_ready:
+        agent_session_instance.say(greeting_text, audio=speculative_greeting.audio())
+    elif greeting_text:
+        agent_session_instance.say(greeting_text)
+    else:
+        await agent_session_instance.generate_reply(instructions=GREETING_TURN_INSTRUCTIONS)
+    startup_timeline.end("greeting_say")
+    startup_timeline.log_summary(livekit_sid_for_airtable_update)
+    logger.info(f"Greeting scheduled {(time.perf_counter() - job_started_at) * 1000:.0f} ms after job start ({'warm' if models_were_prewarmed else 'cold'} start).")
 
 if __name__ == "__main__":
-    critical_env_vars = {
-        "AIRTABLE_PAT": AIRTABLE_PAT, "OPENAI_API_KEY": OPENAI_API_KEY,
-        "DEEPGRAM_API_KEY": DEEPGRAM_API_KEY, "CARTESIA_API_KEY": CARTESIA_API_KEY,
-        "LIVEKIT_URL": LIVEKIT_URL
-    }
+    critical_env_vars = {"AIRTABLE_PAT": AIRTABLE_PAT, "LIVEKIT_URL": LIVEKIT_URL}
+    critical_env_vars.update({
+        k: os.getenv(k) for k in required_api_key_env_vars(choice.spec for chain in PROVIDER_CHAINS.values() for choice in chain)
+    })
     missing = [k for k, v in critical_env_vars.items() if not v]
     if missing:
         logger.error(f"CRITICAL: Missing .env variables: {', '.join(missing)}. Agent cannot start.")
@@ -387,12 +918,48 @@ if __name__ == "__main__":
        AIRTABLE_BASE_ID == "app_placeholder_base_id": 
         logger.error("CRITICAL: Airtable ID constants in agent.py are placeholders. Update with actual IDs.")
         exit(1)
+
+    if TRANSCRIPT_STORAGE not in ("segments", "field"):
+        logger.error(f"CRITICAL: TRANSCRIPT_STORAGE must be 'segments' or 'field', got '{TRANSCRIPT_STORAGE}'. Agent cannot start.")
+        exit(1)
+    if TRANSCRIPT_STORAGE == "segments":
+        segments_table_problem = asyncio.run(check_transcript_segments_table())
+        if segments_table_problem:
+            logger.error(f"CRITICAL: TRANSCRIPT_STORAGE=segments but the {segments_table_problem}. Create it or set TRANSCRIPT_STORAGE=field. Agent cannot start.")
+            exit(1)
         
-    tmp_dir = "/tmp/ai_interviewer_transcripts"
+    tmp_dir = TRANSCRIPT_BACKUP_DIR
     try:
         if not os.path.exists(tmp_dir): os.makedirs(tmp_dir, exist_ok=True)
         logger.info(f"Ensured local transcript directory: {tmp_dir}")
     except OSError as e: logger.error(f"Could not create '{tmp_dir}': {e}", exc_info=True)
 
+    # For the worker process only (e.g. the turn detector's inference runner). Job processes are
+    # started with forkserver and re-import everything, so prewarm loads the plugins again there.
+    load_plugins(configured_plugin_modules())
+    start_jd_prefetch_thread()
+    SpoolDrainer(
+        persistence_spool, write_interview_session_updates,
+        batch_max_entries=PERSISTENCE_BATCH_MAX_ENTRIES,
+        interval_seconds=PERSISTENCE_DRAIN_INTERVAL_SECONDS,
+        max_attempts=PERSISTENCE_MAX_ATTEMPTS,
+    ).start_thread()
+    worker_load_monitor = WorkerLoadMonitor(
+        WORKER_LOAD_STATE_DIR,
+        max_concurrent_jobs=WORKER_MAX_CONCURRENT_INTERVIEWS,
+        load_threshold=WORKER_LOAD_THRESHOLD,
+        cpu_threshold=WORKER_CPU_THRESHOLD,
+        loop_lag_threshold_ms=WORKER_LOOP_LAG_THRESHOLD_MS,
+    )
     logger.info("All critical configurations appear OK. Starting LiveKit Agent worker...")
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
+    # The worker serves every process's metrics on METRICS_PORT and empties METRICS_MULTIPROC_DIR
+    # when it starts.
+    worker = agents.AgentServer.from_server_options(agents.WorkerOptions(
+        entrypoint_fnc=entrypoint, prewarm_fnc=prewarm,
+        load_fnc=worker_load_monitor.load_fnc, request_fnc=worker_load_monitor.request_fnc,
+        load_threshold=WORKER_LOAD_THRESHOLD,
+        prometheus_port=METRICS_PORT if METRICS_PORT > 0 else agents.NOT_GIVEN,
+        prometheus_multiproc_dir=METRICS_MULTIPROC_DIR,
+    ))
+    worker.on("worker_started", reopen_metrics_files)
+    agents.cli.run_app(worker)
@@ -0,0 +1,196 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Optional, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from latency_metrics import record_airtable_request
+
+if TYPE_CHECKING:
+    from pyairtable import Api, Table
+
+logger = logging.getLogger(__name__)
+
+# --- Airtable Client Configuration ---
+# Airtable allows 5 requests/second per base. The limit below is shared by every process on
+# the host (the main worker and each job process) through AIRTABLE_RATE_LIMIT_STATE_PATH; if
+# several hosts write to one base, divide it between them.
+AIRTABLE_ENDPOINT_URL = os.getenv("AIRTABLE_ENDPOINT_URL", "https://api.airtable.com")
+AIRTABLE_RATE_LIMIT_PER_SEC = float(os.getenv("AIRTABLE_RATE_LIMIT_PER_SEC", "5"))
+AIRTABLE_RATE_LIMIT_BURST = int(os.getenv("AIRTABLE_RATE_LIMIT_BURST", "5"))
+AIRTABLE_RATE_LIMIT_STATE_PATH = os.getenv("AIRTABLE_RATE_LIMIT_STATE_PATH", "/tmp/ai_interviewer_airtable_rate_limit.json")
+AIRTABLE_MAX_CONCURRENCY = int(os.getenv("AIRTABLE_MAX_CONCURRENCY", "8"))
+AIRTABLE_MAX_RETRIES = int(os.getenv("AIRTABLE_MAX_RETRIES", "4"))
+AIRTABLE_BACKOFF_BASE_SECONDS = float(os.getenv("AIRTABLE_BACKOFF_BASE_SECONDS", "0.5"))
+AIRTABLE_BACKOFF_MAX_SECONDS = float(os.getenv("AIRTABLE_BACKOFF_MAX_SECONDS", "8"))
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Airtable's limit for batch create/update requests.
+AIRTABLE_MAX_RECORDS_PER_REQUEST = 10
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by every process on the host.
+
+    Each job runs in its own process, so the bucket's state lives in `state_path` and is read
+    and updated under an exclusive flock; a process-local lock keeps threads of one process
+    from contending for the file lock. If the state file can't be used, the bucket falls
+    back to limiting this process alone.
+    """
+
+    def __init__(self, rate_per_sec: float, burst: int, state_path: Optional[str] = None) -> None:
+        self.rate_per_sec = rate_per_sec
+        self.capacity = max(1, burst)
+        self.state_path = state_path
+        self._tokens = float(self.capacity)
+        self._last_refill = time.time()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes one token and returns how long the caller must wait before using it."""
+        with self._lock:
+            if self.state_path:
+                try:
+                    return self._reserve_shared()
+                except OSError as e:
+                    logger.warning(f"Airtable rate limit state '{self.state_path}' unavailable ({e}); limiting this process only.")
+                    self.state_path = None
+            self._tokens, self._last_refill, wait_seconds = self._take(self._tokens, self._last_refill)
+            return wait_seconds
+
+    def _reserve_shared(self) -> float:
+        fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, "r+") as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state = json.loads(state_file.read() or "{}")
+                tokens, last_refill = float(state["tokens"]), float(state["last_refill"])
+            except (ValueError, KeyError, TypeError):
+                tokens, last_refill = float(self.capacity), time.time()
+            tokens, last_refill, wait_seconds = self._take(tokens, last_refill)
+            state_file.seek(0)
+            state_file.truncate()
+            json.dump({"tokens": tokens, "last_refill": last_refill}, state_file)
+            state_file.flush()
+            return wait_seconds
+
+    def _take(self, tokens: float, last_refill: float):
+        """Refills up to now and takes one token; returns (tokens, last_refill, wait seconds)."""
+        now = time.time()
+        # Wall-clock time is shared across processes; ignore it stepping backwards.
+        tokens = min(self.capacity, tokens + max(0.0, now - last_refill) * self.rate_per_sec)
+        last_refill = max(now, last_refill)
+        tokens -= 1
+        return tokens, last_refill, 0.0 if tokens >= 0 else -tokens / self.rate_per_sec
+
+    async def acquire(self) -> None:
+        if self.rate_per_sec <= 0:
+            return
+        # reserve() takes a flock and rewrites the state file; keep that off the event loop.
+        wait_seconds = await asyncio.get_running_loop().run_in_executor(None, self.reserve)
+        if wait_seconds > 0:
+            await asyncio.sleep(wait_seconds)
+
+
+_api: Optional["Api"] = None
+_api_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_rate_limiter = TokenBucket(AIRTABLE_RATE_LIMIT_PER_SEC, AIRTABLE_RATE_LIMIT_BURST, AIRTABLE_RATE_LIMIT_STATE_PATH)
+
+
+def get_airtable_api(api_key: str, timeout: float) -> "Api":
+    """Returns this process's Api, whose requests.Session keeps connections alive across calls.
+
+    Every job process has its own Api and connection pool; only the rate limit is host-wide.
+
+    pyairtable is imported on first use; it is slow to import and not needed to start the worker.
+    """
+    from pyairtable import Api # Ensure: pip install pyairtable
+
+    global _api
+    with _api_lock:
+        if _api is None or _api.api_key != api_key:
+            # Retries are handled in airtable_request so they go through the rate limiter.
+            api = Api(api_key, timeout=(timeout, timeout), retry_strategy=False, endpoint_url=AIRTABLE_ENDPOINT_URL)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=AIRTABLE_MAX_CONCURRENCY)
+            api.session.mount("https://", adapter)
+            api.session.mount("http://", adapter)
+            _api = api
+            logger.info(f"Created Airtable client (endpoint: {AIRTABLE_ENDPOINT_URL}, pool size: {AIRTABLE_MAX_CONCURRENCY}, rate limit: {AIRTABLE_RATE_LIMIT_PER_SEC}/s).")
+        return _api
+
+
+def get_airtable_table(api_key: str, timeout: float, base_id: str, table_id: str) -> "Table":
+    return get_airtable_api(api_key, timeout).table(base_id, table_id)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _api_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=AIRTABLE_MAX_CONCURRENCY, thread_name_prefix="airtable")
+        return _executor
+
+
+def _retry_delay(attempt: int, error: Exception, idempotent: bool = True) -> Optional[float]:
+    """Returns the backoff before the next attempt, or None if the error is not retryable.
+
+    A connection error, timeout or 5xx may arrive after Airtable applied the request, so those
+    are only retried for idempotent requests; a 429 is always safe to retry.
+    """
+    if isinstance(error, requests.HTTPError):
+        status_code = error.response.status_code if error.response is not None else None
+        if status_code not in RETRYABLE_STATUS_CODES:
+            return None
+        if status_code != 429 and not idempotent:
+            return None
+    elif not idempotent or not isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return None
+    # Full jitter: spreads retries from many rooms ending at once instead of retrying in lockstep.
+    backoff_cap = min(AIRTABLE_BACKOFF_MAX_SECONDS, AIRTABLE_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, backoff_cap)
+
+
+def is_permanent_airtable_error(error: Exception) -> bool:
+    """True if retrying can't fix `error`: Airtable answered with a 4xx other than 429."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status_code = error.response.status_code
+        return 400 <= status_code < 500 and status_code not in RETRYABLE_STATUS_CODES
+    return False
+
+
+async def airtable_request(request_fn: Callable[[], T], description: str, idempotent: bool = True) -> T:
+    """Runs a blocking pyairtable call on the Airtable executor with rate limiting and retries.
+
+    Reads, updates and upserts with key fields are idempotent. Plain creates are not: pass
+    `idempotent=False` so a create that may have been applied is not sent again.
+
+    Raises the last error once retries are exhausted or the error is not retryable.
+    """
+    loop = asyncio.get_running_loop()
+    started_at = time.perf_counter()
+    attempt = 0
+    while True:
+        await _rate_limiter.acquire()
+        try:
+            result = await loop.run_in_executor(_get_executor(), request_fn)
+            record_airtable_request(description, time.perf_counter() - started_at, ok=True)
+            return result
+        except Exception as e:
+            delay = _retry_delay(attempt, e, idempotent) if attempt < AIRTABLE_MAX_RETRIES else None
+            if delay is None:
+                record_airtable_request(description, time.perf_counter() - started_at, ok=False)
+                raise
+            attempt += 1
+            logger.warning(f"Airtable request '{description}' failed ({e}). Retry {attempt}/{AIRTABLE_MAX_RETRIES} in {delay:.2f}s.")
+            await asyncio.sleep(delay)
+
@@ -0,0 +1,269 @@
+"""Backfills 'Interview Session' records from local transcript backups.
+
+Reads the transcript_SID_<sid>_<timestamp> backups the agent writes at shutdown (NDJSON,
+optionally .gz/.zst, or the older indented .json) and, with --include-journals, the
+journal_*.ndjson files of sessions that never got one. Each backup is compared with what
+Airtable already holds for its session (the Transcript field, or the Transcript Segments
+records with TRANSCRIPT_STORAGE=segments), and only sessions missing transcript lines or
+their end time are backfilled: just the missing lines are appended, as a Transcript field
+append or as one new segment, so parts stored by other jobs for the same SID are kept.
+Sessions that still have updates in the persistence spool are left to the drainer. The
+updates are delivered in batches through the same SpoolDrainer the worker uses. A backup
+gets a `.backfilled` marker once Airtable has everything in it (already, or after this run
+delivered its updates), so reruns skip it; with --spool-only, or when the worker's drainer
+delivers, the next run finds the session complete and marks it then.
+
+    python backfill_transcripts.py                       # everything in the backup directory
+    python backfill_transcripts.py /path/to/backups --dry-run
+    python backfill_transcripts.py --spool-only          # let the running worker deliver them
+
+If a worker on this host is already draining the spool, the updates are only spooled.
+"""
+import argparse
+import asyncio
+import collections
+import glob
+import logging
+import os
+import re
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import agent
+from airtable_client import airtable_request, get_airtable_table
+from persistence_spool import SpoolDrainer
+from transcript_backup import read_transcript_backup
+
+logger = logging.getLogger("backfill_transcripts")
+
+BACKUP_FILENAME_PATTERN = re.compile(r"^(?P<kind>transcript|journal)_SID_(?P<sid>.+)_(?P<timestamp>\d{8}_\d{6})\.(?:json|ndjson(?:\.gz|\.zst)?)$")
+BACKFILLED_MARKER_SUFFIX = ".backfilled"
+
+
+def find_backup_files(paths: List[str], include_journals: bool) -> List[Tuple[str, str, str]]:
+    """(path, livekit_room_sid, end_time_iso) per session, preferring the shutdown transcript over the journal."""
+    candidates = []
+    for path in paths:
+        if os.path.isdir(path):
+            candidates.extend(glob.glob(os.path.join(path, "transcript_SID_*.json")))
+            candidates.extend(glob.glob(os.path.join(path, "transcript_SID_*.ndjson*")))
+            if include_journals:
+                candidates.extend(glob.glob(os.path.join(path, "journal_SID_*.ndjson")))
+        else:
+            candidates.append(path)
+
+    by_sid: Dict[str, Tuple[str, str, str]] = {}
+    for path in sorted(candidates):
+        if path.endswith(BACKFILLED_MARKER_SUFFIX):
+            continue
+        match = BACKUP_FILENAME_PATTERN.match(os.path.basename(path))
+        if not match:
+            logger.warning(f"Skipping '{path}': not a transcript backup with a LiveKit SID in its name.")
+            continue
+        if match.group("kind") == "journal" and not include_journals:
+            continue
+        end_time_iso = datetime.strptime(match.group("timestamp"), "%Y%m%d_%H%M%S").isoformat()
+        existing = by_sid.get(match.group("sid"))
+        if existing and os.path.basename(existing[0]).startswith("transcript_") and match.group("kind") == "journal":
+            continue
+        by_sid[match.group("sid")] = (path, match.group("sid"), end_time_iso)
+    return list(by_sid.values())
+
+
+def load_transcript(path: str) -> Optional[str]:
+    try:
+        history_dict = read_transcript_backup(path)
+    except (OSError, ValueError, RuntimeError) as e:
+        logger.error(f"Could not read '{path}': {e}")
+        return None
+    return agent.format_transcript_from_history(history_dict)
+
+
+@dataclass
+class StoredSession:
+    """What Airtable holds for one session: its record, end time and transcript text so far."""
+    record_id: str
+    end_time: Optional[str] = None
+    transcript: str = ""
+
+
+def transcript_lines(text: str) -> List[str]:
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def missing_transcript_lines(backup_text: str, stored_text: str) -> List[str]:
+    """Lines of the backup that the stored transcript doesn't have (segment headers are ignored)."""
+    stored_counts = collections.Counter(transcript_lines(stored_text))
+    missing = []
+    for line in transcript_lines(backup_text):
+        if stored_counts[line] > 0:
+            stored_counts[line] -= 1
+        else:
+            missing.append(line)
+    return missing
+
+
+def sids_with_spooled_updates() -> Set[str]:
+    return {entry.payload.get("livekit_room_sid") for entry in agent.persistence_spool.pending(sys.maxsize)}
+
+
+async def fetch_stored_sessions(livekit_room_sids: Iterable[str]) -> Dict[str, StoredSession]:
+    """Reads the session record (and, with segment storage, the transcript segments) of each SID."""
+    sids = sorted(set(livekit_room_sids))
+    stored: Dict[str, StoredSession] = {}
+    sessions_table = get_airtable_table(agent.AIRTABLE_PAT, agent.AIRTABLE_API_TIMEOUT, agent.AIRTABLE_BASE_ID, agent.INTERVIEW_SESSIONS_TABLE_ID)
+    session_fields = [agent.FIELD_IS_LIVEKIT_ROOM_SID_NAME, agent.FIELD_IS_INTERVIEW_END_TIME_NAME, agent.FIELD_IS_TRANSCRIPT_NAME]
+    for sid_chunk in agent._chunks(sids, agent.AIRTABLE_LOOKUP_FORMULA_MAX_TERMS):
+        session_filter_formula = "OR(" + ", ".join(f"{{{agent.FIELD_IS_LIVEKIT_ROOM_SID_NAME}}} = '{sid}'" for sid in sid_chunk) + ")"
+        session_records = await airtable_request(
+            lambda: sessions_table.all(formula=session_filter_formula, fields=session_fields), "read Interview Sessions for backfill"
+        )
+        for session_record in session_records:
+            fields = session_record.get('fields', {})
+            record_sid = fields.get(agent.FIELD_IS_LIVEKIT_ROOM_SID_NAME)
+            if record_sid and record_sid not in stored:
+                stored[record_sid] = StoredSession(
+                    session_record['id'], fields.get(agent.FIELD_IS_INTERVIEW_END_TIME_NAME), fields.get(agent.FIELD_IS_TRANSCRIPT_NAME, ""),
+                )
+                agent.register_interview_session_record(record_sid, session_record['id'])
+    if agent.TRANSCRIPT_STORAGE != "segments":
+        return stored
+
+    segments_table = get_airtable_table(agent.AIRTABLE_PAT, agent.AIRTABLE_API_TIMEOUT, agent.AIRTABLE_BASE_ID, agent.TRANSCRIPT_SEGMENTS_TABLE_ID)
+    segment_fields = [agent.FIELD_TS_LIVEKIT_ROOM_SID_NAME, agent.FIELD_TS_SEGMENT_INDEX_NAME, agent.FIELD_TS_SEGMENT_TEXT_NAME]
+    segments_by_sid: Dict[str, List[Tuple[str, str]]] = collections.defaultdict(list)
+    for sid_chunk in agent._chunks(sorted(stored), agent.AIRTABLE_LOOKUP_FORMULA_MAX_TERMS):
+        segment_filter_formula = "OR(" + ", ".join(f"{{{agent.FIELD_TS_LIVEKIT_ROOM_SID_NAME}}} = '{sid}'" for sid in sid_chunk) + ")"
+        segment_records = await airtable_request(
+            lambda: segments_table.all(formula=segment_filter_formula, fields=segment_fields), "read transcript segments for backfill"
+        )
+        for segment_record in segment_records:
+            fields = segment_record.get('fields', {})
+            segments_by_sid[fields.get(agent.FIELD_TS_LIVEKIT_ROOM_SID_NAME)].append(
+                (str(fields.get(agent.FIELD_TS_SEGMENT_INDEX_NAME) or ""), fields.get(agent.FIELD_TS_SEGMENT_TEXT_NAME, ""))
+            )
+    for sid, segments in segments_by_sid.items():
+        if sid in stored:
+            segments.sort()
+            stored[sid].transcript = "\n".join(text for _, text in segments)
+    return stored
+
+
+def build_backfill_updates(livekit_room_sid: str, transcript_text: str, end_time_iso: str, stored_session: StoredSession) -> List[dict]:
+    """Spool payloads that bring the stored session up to the backup, or [] if it already has everything."""
+    missing_lines = missing_transcript_lines(transcript_text, stored_session.transcript)
+    base_payload = {"livekit_room_sid": livekit_room_sid, "session_record_id": stored_session.record_id, "enqueued_at": datetime.now().isoformat()}
+    payloads = []
+    fields = {}
+    if missing_lines and agent.TRANSCRIPT_STORAGE == "segments":
+        # Keyed on the backup's end time, so rerunning the backfill upserts the same segment.
+        segment_index = agent.transcript_segment_key(f"{datetime.fromisoformat(end_time_iso):%Y%m%dT%H%M%S}-backfill", 1)
+        payloads.append({**base_payload, "kind": "segment", "segment_index": segment_index, "text": "\n".join(missing_lines)})
+    elif missing_lines:
+        # Only what's missing: the stored field may hold parts this backup doesn't (other jobs for the SID).
+        payloads.append({**base_payload, "kind": "transcript_append", "text": "\n".join(missing_lines), "continues_previous_segment": False})
+    if not stored_session.end_time:
+        fields[agent.FIELD_IS_INTERVIEW_END_TIME_NAME] = end_time_iso
+    if fields:
+        payloads.append({**base_payload, "kind": "session_fields", "fields": fields})
+    return payloads
+
+
+def is_delivered(entry_name: str) -> bool:
+    """The drainer removes delivered entries from the spool; rejected ones move to the dead-letter directory."""
+    spool = agent.persistence_spool
+    return not any(os.path.exists(os.path.join(directory, entry_name)) for directory in (spool.spool_dir, spool.dead_letter_dir))
+
+
+def write_marker(marker_path: str) -> None:
+    with open(marker_path, "w") as f:
+        f.write(datetime.now().isoformat())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Backfill Airtable 'Interview Session' records from local transcript backups.")
+    parser.add_argument("paths", nargs="*", default=[agent.TRANSCRIPT_BACKUP_DIR], help="Backup files or directories.")
+    parser.add_argument("--include-journals", action="store_true", help="Also use journal_*.ndjson files of sessions without a shutdown transcript.")
+    parser.add_argument("--force", action="store_true", help="Backfill files that already have a .backfilled marker.")
+    parser.add_argument("--dry-run", action="store_true", help="Only list what would be backfilled.")
+    parser.add_argument("--spool-only", action="store_true", help="Spool the updates and leave delivery to the worker's drainer.")
+    parser.add_argument("--drain-timeout-seconds", type=float, default=600)
+    args = parser.parse_args()
+
+    if not agent.AIRTABLE_PAT:
+        logger.error("AIRTABLE_PAT not set. Cannot compare the backups with the stored transcripts.")
+        return 1
+    backups = [
+        backup for backup in find_backup_files(args.paths, args.include_journals)
+        if args.force or not os.path.exists(backup[0] + BACKFILLED_MARKER_SUFFIX)
+    ]
+    spooled_sids = sids_with_spooled_updates()
+    try:
+        stored_sessions = asyncio.run(fetch_stored_sessions(sid for _, sid, _ in backups if sid not in spooled_sids))
+    except Exception as e:
+        logger.error(f"Could not read the stored transcripts to compare the backups with: {e}", exc_info=True)
+        return 1
+    entry_names_by_marker_path: Dict[str, List[str]] = {}
+    for path, livekit_room_sid, end_time_iso in backups:
+        marker_path = path + BACKFILLED_MARKER_SUFFIX
+        if livekit_room_sid in spooled_sids:
+            logger.info(f"'{livekit_room_sid}' still has spooled updates. Skipping '{path}'; rerun once the drainer has delivered them.")
+            continue
+        stored_session = stored_sessions.get(livekit_room_sid)
+        if stored_session is None:
+            logger.warning(f"No 'Interview Session' record found for LiveKitRoomSID '{livekit_room_sid}'. Skipping '{path}'.")
+            continue
+        transcript_text = load_transcript(path)
+        if transcript_text is None:
+            continue
+        if not agent.is_valid_transcript_segment(transcript_text):
+            transcript_text = ""
+        payloads = build_backfill_updates(livekit_room_sid, transcript_text, end_time_iso, stored_session)
+        if args.dry_run:
+            missing_line_count = len(missing_transcript_lines(transcript_text, stored_session.transcript))
+            print(f"{livekit_room_sid}\t{end_time_iso}\t{missing_line_count} missing line(s)\t{'backfill' if payloads else 'delivered'}\t{path}")
+            continue
+        if payloads:
+            entry_names_by_marker_path[marker_path] = agent.persistence_spool.enqueue_sync(payloads)
+        else:
+            logger.info(f"'{livekit_room_sid}' already has everything in '{path}'. Nothing to backfill.")
+            write_marker(marker_path)
+    logger.info(f"Spooled updates from {len(entry_names_by_marker_path)} of {len(backups)} backup file(s).")
+    if args.dry_run or not entry_names_by_marker_path:
+        return 0
+    if args.spool_only:
+        logger.info("Updates spooled for the worker's drainer. Rerun once they are delivered to mark the backups as backfilled.")
+        return 0
+
+    lock_file = agent.persistence_spool.acquire_drainer_lock(blocking=False)
+    if lock_file is None:
+        logger.info("A worker on this host is draining the spool and will deliver the backfilled updates. Rerun afterwards to mark the backups.")
+        return 0
+    with lock_file:
+        drainer = SpoolDrainer(
+            agent.persistence_spool, agent.write_interview_session_updates,
+            batch_max_entries=agent.PERSISTENCE_BATCH_MAX_ENTRIES,
+            interval_seconds=agent.PERSISTENCE_DRAIN_INTERVAL_SECONDS,
+            max_attempts=agent.PERSISTENCE_MAX_ATTEMPTS,
+        )
+        asyncio.run(drainer.drain(args.drain_timeout_seconds))
+    undelivered_paths = []
+    for marker_path, entry_names in entry_names_by_marker_path.items():
+        if all(is_delivered(entry_name) for entry_name in entry_names):
+            write_marker(marker_path)
+        else:
+            undelivered_paths.append(marker_path[:-len(BACKFILLED_MARKER_SUFFIX)])
+    if undelivered_paths:
+        logger.error(
+            f"Updates from {len(undelivered_paths)} backup file(s) were not delivered (still spooled in '{agent.PERSISTENCE_SPOOL_DIR}' "
+            f"or dead-lettered); they stay unmarked for the next run: {', '.join(undelivered_paths[:10])}"
+        )
+        return 1
+    logger.info("All backfilled updates delivered.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
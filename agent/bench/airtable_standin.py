@@ -0,0 +1,177 @@
+"""Local stand-in for the Airtable REST endpoints the agent uses.
+
+Serves list (GET and POST listRecords), get, create, update, batch update and batch upsert
+(performUpsert) for any table under /v0/<base>/<table>, backed by in-memory dicts. Formula filtering only
+understands the forms the agent sends: `{Field} = 'value'`, `RECORD_ID() = 'rec...'`
+and OR(...) of those.
+"""
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+FORMULA_TERM_PATTERN = re.compile(r"(?:\{(?P<field>[^}]+)\}|(?P<record_id>RECORD_ID\(\)))\s*=\s*'(?P<value>[^']*)'")
+PAGE_SIZE = 100
+
+
+class AirtableStandIn:
+    def __init__(self, latency_seconds: float = 0.05, error_rate: float = 0.0, seed: int = 0) -> None:
+        self.latency_seconds = latency_seconds
+        self.error_rate = error_rate
+        self.tables: Dict[str, Dict[str, dict]] = {}
+        self.request_count = 0
+        self.throttled_count = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_record(self, table_id: str, fields: dict) -> str:
+        record_id = "rec" + uuid.uuid4().hex[:14]
+        with self._lock:
+            self.tables.setdefault(table_id, {})[record_id] = {"id": record_id, "createdTime": "2024-01-01T00:00:00.000Z", "fields": dict(fields)}
+        return record_id
+
+    def start(self) -> "AirtableStandIn":
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_GET(self) -> None:
+                standin._handle(self, "GET")
+
+            def do_POST(self) -> None:
+                standin._handle(self, "POST")
+
+            def do_PATCH(self) -> None:
+                standin._handle(self, "PATCH")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="airtable-standin", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str) -> None:
+        with self._lock:
+            self.request_count += 1
+            throttle = self._random.random() < self.error_rate
+        if self.latency_seconds > 0:
+            time.sleep(self.latency_seconds)
+        if throttle:
+            with self._lock:
+                self.throttled_count += 1
+            return self._respond(handler, 429, {"errors": [{"error": "RATE_LIMIT_REACHED"}]})
+
+        parsed = urlparse(handler.path)
+        parts = [p for p in parsed.path.split("/") if p]
+        if len(parts) < 3 or parts[0] != "v0":
+            return self._respond(handler, 404, {"error": "NOT_FOUND"})
+        table_id = unquote(parts[2])
+        record_id = parts[3] if len(parts) > 3 else None
+        body = {}
+        content_length = int(handler.headers.get("Content-Length") or 0)
+        if content_length:
+            body = json.loads(handler.rfile.read(content_length) or b"{}")
+
+        if method == "GET" and record_id is None:
+            return self._respond(handler, 200, self._list(table_id, parse_qs(parsed.query)))
+        if method == "POST" and record_id == "listRecords":
+            return self._respond(handler, 200, self._list(table_id, {k: v if isinstance(v, list) else [v] for k, v in body.items()}))
+        if method == "GET":
+            record = self.tables.get(table_id, {}).get(record_id)
+            return self._respond(handler, 200 if record else 404, record or {"error": "NOT_FOUND"})
+        if method == "POST":
+            if "records" in body:
+                created = [self._get(table_id, self.add_record(table_id, r.get("fields", {}))) for r in body["records"]]
+                return self._respond(handler, 200, {"records": created})
+            return self._respond(handler, 200, self._get(table_id, self.add_record(table_id, body.get("fields", {}))))
+        if method == "PATCH":
+            if record_id is None and "performUpsert" in body:
+                return self._respond(handler, 200, self._upsert(table_id, body["performUpsert"]["fieldsToMergeOn"], body.get("records", [])))
+            if record_id is None:
+                updated = [self._update(table_id, r["id"], r.get("fields", {})) for r in body.get("records", [])]
+                if any(u is None for u in updated):
+                    return self._respond(handler, 404, {"error": "NOT_FOUND"})
+                return self._respond(handler, 200, {"records": updated})
+            updated_record = self._update(table_id, record_id, body.get("fields", {}))
+            return self._respond(handler, 200 if updated_record else 404, updated_record or {"error": "NOT_FOUND"})
+        return self._respond(handler, 405, {"error": "METHOD_NOT_ALLOWED"})
+
+    def _list(self, table_id: str, params: Dict[str, List[str]]) -> dict:
+        with self._lock:
+            records = list(self.tables.get(table_id, {}).values())
+        formula = (params.get("filterByFormula") or [""])[0]
+        terms = list(FORMULA_TERM_PATTERN.finditer(formula))
+        if terms:
+            records = [r for r in records if any(
+                (r["id"] if term.group("record_id") else str(r["fields"].get(term.group("field")))) == term.group("value")
+                for term in terms
+            )]
+        max_records = int((params.get("maxRecords") or [0])[0] or 0)
+        if max_records:
+            records = records[:max_records]
+        offset = int((params.get("offset") or [0])[0] or 0)
+        page = records[offset:offset + PAGE_SIZE]
+        wanted_fields = params.get("fields[]") or params.get("fields")
+        if wanted_fields:
+            page = [{**r, "fields": {k: v for k, v in r["fields"].items() if k in wanted_fields}} for r in page]
+        response = {"records": page}
+        if offset + PAGE_SIZE < len(records):
+            response["offset"] = str(offset + PAGE_SIZE)
+        return response
+
+    def _upsert(self, table_id: str, key_fields: List[str], records: List[dict]) -> dict:
+        response = {"records": [], "createdRecords": [], "updatedRecords": []}
+        for record in records:
+            fields = record.get("fields", {})
+            key = tuple(str(fields.get(field)) for field in key_fields)
+            with self._lock:
+                existing = next((r for r in self.tables.get(table_id, {}).values()
+                                 if tuple(str(r["fields"].get(field)) for field in key_fields) == key), None)
+            if existing is None:
+                record_id = self.add_record(table_id, fields)
+                response["createdRecords"].append(record_id)
+            else:
+                record_id = existing["id"]
+                self._update(table_id, record_id, fields)
+                response["updatedRecords"].append(record_id)
+            response["records"].append(self._get(table_id, record_id))
+        return response
+
+    def _get(self, table_id: str, record_id: str) -> Optional[dict]:
+        with self._lock:
+            return self.tables.get(table_id, {}).get(record_id)
+
+    def _update(self, table_id: str, record_id: str, fields: dict) -> Optional[dict]:
+        with self._lock:
+            record = self.tables.get(table_id, {}).get(record_id)
+            if record is None:
+                return None
+            record["fields"].update(fields)
+            return record
+
+    @staticmethod
+    def _respond(handler: BaseHTTPRequestHandler, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
@@ -0,0 +1,76 @@
+"""Import-time budget check for agent.py.
+
+Imports `agent` in fresh interpreters under `python -X importtime` and fails (exit 1) if the
+fastest run's cumulative import time exceeds the budget, or if any module that should only
+load once the worker starts (LiveKit plugins, pyairtable, ONNX runtime, tokenizers) was
+imported along the way. bench/test_import_time.py runs the same check under pytest.
+
+    python bench/check_import_time.py
+    python bench/check_import_time.py --budget-ms 2500 --runs 5 --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFERRED_MODULE_PREFIXES = ("livekit.plugins", "pyairtable", "onnxruntime", "tokenizers", "transformers")
+DEFAULT_BUDGET_MS = float(os.getenv("AGENT_IMPORT_BUDGET_MS", "2500"))
+
+
+def profile_agent_import() -> Dict[str, Tuple[int, int]]:
+    """{module: (self µs, cumulative µs)} from one cold `import agent`."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import agent"],
+        cwd=AGENT_DIR, capture_output=True, text=True, check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"'import agent' failed:\n{completed.stderr[-2000:]}")
+    modules = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def fastest_agent_import(runs: int) -> Dict[str, Tuple[int, int]]:
+    """The profile of the fastest of `runs` cold imports, which is the least disturbed by other load."""
+    return min((profile_agent_import() for _ in range(max(1, runs))), key=lambda modules: modules["agent"][1])
+
+
+def import_time_failures(modules: Dict[str, Tuple[int, int]], budget_ms: float) -> List[str]:
+    failures: List[str] = []
+    total_ms = modules["agent"][1] / 1000
+    if total_ms > budget_ms:
+        failures.append(f"import time {total_ms:.0f} ms exceeds the {budget_ms:.0f} ms budget")
+    deferred = sorted(name for name in modules if name.startswith(DEFERRED_MODULE_PREFIXES))
+    if deferred:
+        failures.append(f"modules that should load only when the worker starts were imported: {', '.join(deferred[:10])}")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fail if importing agent.py gets slower than the budget.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3, help="Cold imports to profile; the fastest is compared against the budget.")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules (by self time) to list.")
+    args = parser.parse_args()
+
+    fastest = fastest_agent_import(args.runs)
+    total_ms = fastest["agent"][1] / 1000
+
+    print(f"import agent: {total_ms:.0f} ms cumulative (fastest of {max(1, args.runs)}, budget {args.budget_ms:.0f} ms)")
+    for name, (self_us, cumulative_us) in sorted(fastest.items(), key=lambda item: item[1][0], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms self  {cumulative_us / 1000:8.1f} ms cumulative  {name}")
+
+    failures = import_time_failures(fastest, args.budget_ms)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""Deterministic STT, LLM and TTS providers with configurable latencies, built on the LiveKit plugin base classes.
+
+FakeSTT, FakeLLM and FakeTTS subclass livekit.agents stt.STT, llm.LLM and tts.TTS, so an
+AgentSession drives them exactly like the real plugins (streams, retries, metrics events,
+the provider router's SLO checks). provider_specs() registers them as the "fake" provider
+of each kind. Latencies are drawn from a seeded RNG so two runs with the same seed produce
+the same schedule; only real contention (event loop, Airtable, disk) changes the measurements.
+"""
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions, llm, stt, tts, utils
+
+from providers import ProviderSpec
+
+SCRIPTED_REPLIES = [
+    "Hello, I'm Alex, your interviewer today. It looks like we're discussing a software development role. Are you ready to begin?",
+    "Great. Let's start with a foundational question. Could you explain how a hash map handles collisions?",
+    "Could you elaborate on that? What happens to lookup cost as the load factor grows?",
+    "Okay, let's move on to some more detailed questions. How would you compare optimistic and pessimistic locking?",
+    "Now for a couple of more challenging questions that might involve scenarios or deeper technical design.",
+    "Thank you for your time today. That concludes our interview.",
+]
+CANDIDATE_REPLIES = [
+    "Yes, I'm ready.",
+    "A hash map stores entries in buckets and resolves collisions with chaining or open addressing.",
+    "Lookups degrade as chains get longer, so the table is resized once the load factor passes a threshold.",
+    "Optimistic locking checks a version on write, pessimistic locking takes the lock up front.",
+    "I would shard the data by tenant and put a queue in front of the writers.",
+]
+FAKE_PROVIDER_NAME = "fake"
+
+
+@dataclass
+class LatencyProfile:
+    mean_seconds: float
+    jitter_seconds: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        return max(0.0, self.mean_seconds + rng.uniform(-self.jitter_seconds, self.jitter_seconds))
+
+
+class FakeSTT(stt.STT):
+    """Streaming STT whose candidate turns are scripted by the caller through speak()."""
+
+    def __init__(self, finalize_latency: LatencyProfile, seed: int = 0) -> None:
+        super().__init__(capabilities=stt.STTCapabilities(streaming=True, interim_results=False))
+        self.finalize_latency = finalize_latency
+        self.speech_ended_at: Optional[float] = None
+        self._rng = random.Random(seed)
+        self._utterances: Optional[asyncio.Queue] = None
+
+    @property
+    def model(self) -> str:
+        return "fake-stt"
+
+    @property
+    def provider(self) -> str:
+        return "bench"
+
+    def speak(self, text: str, speech_seconds: float) -> None:
+        """Queues a candidate utterance; the open stream reports it as the candidate finishes speaking."""
+        self._queue().put_nowait((text, speech_seconds))
+
+    def _queue(self) -> asyncio.Queue:
+        if self._utterances is None:
+            self._utterances = asyncio.Queue()
+        return self._utterances
+
+    async def _recognize_impl(self, buffer: Any, *, language: Any = None, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> stt.SpeechEvent:
+        await asyncio.sleep(self.finalize_latency.sample(self._rng))
+        return stt.SpeechEvent(type=stt.SpeechEventType.FINAL_TRANSCRIPT, alternatives=[stt.SpeechData(language="en", text="")])
+
+    def stream(self, *, language: Any = None, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> "FakeRecognizeStream":
+        return FakeRecognizeStream(stt=self, conn_options=conn_options)
+
+
+class FakeRecognizeStream(stt.RecognizeStream):
+    async def _run(self) -> None:
+        fake_stt: FakeSTT = self._stt
+        drain_task = asyncio.create_task(self._drain_input())
+        try:
+            while True:
+                text, speech_seconds = await fake_stt._queue().get()
+                self._event_ch.send_nowait(stt.SpeechEvent(type=stt.SpeechEventType.START_OF_SPEECH))
+                await asyncio.sleep(speech_seconds)
+                fake_stt.speech_ended_at = time.perf_counter()
+                await asyncio.sleep(fake_stt.finalize_latency.sample(fake_stt._rng))
+                self._event_ch.send_nowait(stt.SpeechEvent(
+                    type=stt.SpeechEventType.FINAL_TRANSCRIPT, alternatives=[stt.SpeechData(language="en", text=text, confidence=1.0)],
+                ))
+                self._event_ch.send_nowait(stt.SpeechEvent(type=stt.SpeechEventType.END_OF_SPEECH))
+        finally:
+            await utils.aio.cancel_and_wait(drain_task)
+
+    async def _drain_input(self) -> None:
+        async for _frame in self._input_ch:
+            pass
+
+
+class FakeLLM(llm.LLM):
+    """Streams the scripted reply for the current turn (counted by assistant messages in the context)."""
+
+    def __init__(self, ttft: LatencyProfile, inter_token_seconds: float = 0.01, seed: int = 0) -> None:
+        super().__init__()
+        self.ttft = ttft
+        self.inter_token_seconds = inter_token_seconds
+        self._rng = random.Random(seed)
+
+    @property
+    def model(self) -> str:
+        return "fake-llm"
+
+    @property
+    def provider(self) -> str:
+        return "bench"
+
+    def chat(self, *, chat_ctx: llm.ChatContext, tools: Optional[list] = None,
+             conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS, **kwargs: Any) -> "FakeLLMStream":
+        turn_index = sum(1 for item in chat_ctx.items if getattr(item, "type", None) == "message" and item.role == "assistant")
+        return FakeLLMStream(
+            self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options,
+            reply=SCRIPTED_REPLIES[turn_index % len(SCRIPTED_REPLIES)], ttft_seconds=self.ttft.sample(self._rng),
+        )
+
+
+class FakeLLMStream(llm.LLMStream):
+    def __init__(self, fake_llm: FakeLLM, *, reply: str, ttft_seconds: float, **kwargs: Any) -> None:
+        self._reply = reply
+        self._ttft_seconds = ttft_seconds
+        super().__init__(fake_llm, **kwargs)
+
+    async def _run(self) -> None:
+        request_id = utils.shortuuid()
+        await asyncio.sleep(self._ttft_seconds)
+        for i, word in enumerate(self._reply.split(" ")):
+            if i:
+                await asyncio.sleep(self._llm.inter_token_seconds)
+            self._event_ch.send_nowait(llm.ChatChunk(id=request_id, delta=llm.ChoiceDelta(role="assistant", content=word if i == 0 else " " + word)))
+
+
+class FakeTTS(tts.TTS):
+    """Non-streaming TTS (the session adds its sentence StreamAdapter): about 60 ms of PCM silence per word."""
+
+    frame_ms = 20
+
+    def __init__(self, ttfb: LatencyProfile, realtime_factor: float = 0.05, seed: int = 0) -> None:
+        super().__init__(capabilities=tts.TTSCapabilities(streaming=False), sample_rate=24000, num_channels=1)
+        self.ttfb = ttfb
+        self.realtime_factor = realtime_factor
+        self._rng = random.Random(seed)
+
+    @property
+    def model(self) -> str:
+        return "fake-tts"
+
+    @property
+    def provider(self) -> str:
+        return "bench"
+
+    def synthesize(self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS) -> "FakeChunkedStream":
+        return FakeChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+
+class FakeChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        fake_tts: FakeTTS = self._tts
+        output_emitter.initialize(
+            request_id=utils.shortuuid(), sample_rate=fake_tts.sample_rate, num_channels=fake_tts.num_channels,
+            mime_type="audio/pcm", frame_size_ms=fake_tts.frame_ms,
+        )
+        await asyncio.sleep(fake_tts.ttfb.sample(fake_tts._rng))
+        frame = bytes(2 * fake_tts.sample_rate * fake_tts.frame_ms // 1000)
+        for i in range(max(1, len(self._input_text.split())) * 3):
+            if i:
+                await asyncio.sleep(fake_tts.frame_ms / 1000 * fake_tts.realtime_factor)
+            output_emitter.push(frame)
+        output_emitter.flush()
+
+
+def provider_specs(stt_latency: LatencyProfile, llm_ttft: LatencyProfile, tts_ttfb: LatencyProfile, seed: int = 0) -> List[ProviderSpec]:
+    """The fakes as "fake" providers.PROVIDERS entries, selectable with STT_PROVIDERS/LLM_PROVIDERS/TTS_PROVIDERS=fake."""
+    return [
+        ProviderSpec("stt", FAKE_PROVIDER_NAME, __name__, "", lambda plugin, options: plugin.FakeSTT(stt_latency, seed=seed)),
+        ProviderSpec("llm", FAKE_PROVIDER_NAME, __name__, "", lambda plugin, options: plugin.FakeLLM(llm_ttft, seed=seed)),
+        ProviderSpec("tts", FAKE_PROVIDER_NAME, __name__, "", lambda plugin, options: plugin.FakeTTS(tts_ttfb, seed=seed)),
+    ]
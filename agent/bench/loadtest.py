@@ -0,0 +1,450 @@
+"""Offline load test: N concurrent interviews, each in its own process, no network access needed.
+
+Every simulated interview is a separate Python process that runs agent.entrypoint, as a
+LiveKit job process would: room-name parsing, the JD fetch, prompt building, provider
+routing, the speculative greeting, the TTS phrase cache, the transcript journal and the
+shutdown callback are all the real code. Only the edges are replaced: STT, LLM and TTS are
+the LiveKit plugin subclasses in fake_plugins.py (selected as the "fake" providers), the
+room's audio goes through in-process AudioInput/AudioOutput instead of WebRTC, and Airtable
+is a local stand-in. This process plays the worker's main process: it serves the Airtable
+stand-in and drains the shared persistence spool with a SpoolDrainer.
+
+    python bench/loadtest.py --interviews 10 --turns 6
+    python bench/loadtest.py --interviews 10 --max-p95-greeting-ms 1500 --json results.json
+
+Exits with status 1 when an interview fails or any --max-* threshold is exceeded.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from airtable_standin import AirtableStandIn
+
+RESULT_PREFIX = "RESULT "
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is the peak, in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def register_fake_providers(config: dict) -> None:
+    """Makes the fakes the only STT/LLM/TTS providers; must run before `agent` is imported."""
+    import providers
+    from fake_plugins import FAKE_PROVIDER_NAME, LatencyProfile, provider_specs
+
+    jitter_seconds = config["jitter_ms"] / 1000
+    for spec in provider_specs(
+        LatencyProfile(config["stt_ms"] / 1000, jitter_seconds),
+        LatencyProfile(config["llm_ttft_ms"] / 1000, jitter_seconds),
+        LatencyProfile(config["tts_ttfb_ms"] / 1000, jitter_seconds),
+        seed=config["seed"],
+    ):
+        providers.PROVIDERS[(spec.kind, spec.name)] = spec
+    for env_var in ("STT_PROVIDERS", "LLM_PROVIDERS", "TTS_PROVIDERS"):
+        os.environ[env_var] = FAKE_PROVIDER_NAME
+
+
+class EventLoopLagMonitor:
+    def __init__(self, interval_seconds: float = 0.05) -> None:
+        self.interval_seconds = interval_seconds
+        self.lag_samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected_at = loop.time() + self.interval_seconds
+            await asyncio.sleep(self.interval_seconds)
+            self.lag_samples.append(max(0.0, loop.time() - expected_at))
+
+
+# --- Interview process ---
+
+def define_session_io():
+    """The room transport stand-ins; defined lazily so the parent process doesn't need LiveKit's voice I/O."""
+    from livekit import rtc
+    from livekit.agents import AgentSession
+    from livekit.agents.voice import io
+
+    class SilenceAudioInput(io.AudioInput):
+        """20 ms frames of microphone silence in real time, like an idle remote audio track."""
+
+        sample_rate = 16000
+
+        def __init__(self) -> None:
+            super().__init__(label="bench-microphone")
+
+        async def __anext__(self) -> rtc.AudioFrame:
+            await asyncio.sleep(0.02)
+            samples = self.sample_rate // 50
+            return rtc.AudioFrame(data=bytes(2 * samples), sample_rate=self.sample_rate, num_channels=1, samples_per_channel=samples)
+
+    class RecordingAudioOutput(io.AudioOutput):
+        """Plays each segment in `realtime_factor` of its duration and records when its first frame arrived."""
+
+        def __init__(self, realtime_factor: float) -> None:
+            super().__init__(label="bench-speaker", capabilities=io.AudioOutputCapabilities(pause=False))
+            self.realtime_factor = realtime_factor
+            self.segment_first_frame_at: List[float] = []
+            self.segments_finished = 0
+            self._segment_seconds = 0.0
+            self._capturing = False
+            self._pending_playouts: List[asyncio.TimerHandle] = []
+            self._changed = asyncio.Event()
+
+        async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+            await super().capture_frame(frame)
+            if not self._capturing:
+                self._capturing = True
+                self._segment_seconds = 0.0
+                self.segment_first_frame_at.append(time.perf_counter())
+                self.on_playback_started(created_at=time.time())
+            self._segment_seconds += frame.duration
+
+        def flush(self) -> None:
+            super().flush()
+            if not self._capturing:
+                return
+            self._capturing = False
+            segment_seconds = self._segment_seconds
+            self._pending_playouts.append(asyncio.get_running_loop().call_later(
+                segment_seconds * self.realtime_factor, self._finish_playout, segment_seconds, False
+            ))
+
+        def clear_buffer(self) -> None:
+            for handle in self._pending_playouts:
+                handle.cancel()
+                self._finish_playout(0.0, True)
+            if self._capturing:
+                self._capturing = False
+                self._finish_playout(self._segment_seconds, True)
+
+        def _finish_playout(self, playback_position: float, interrupted: bool) -> None:
+            self._pending_playouts = [handle for handle in self._pending_playouts if not handle.cancelled() and handle.when() > asyncio.get_running_loop().time()]
+            self.on_playback_finished(playback_position=playback_position, interrupted=interrupted)
+            self.segments_finished += 1
+            self._changed.set()
+
+        async def wait_for_segments(self, count: int) -> None:
+            while self.segments_finished < count:
+                self._changed.clear()
+                await self._changed.wait()
+
+    class BenchAgentSession(AgentSession):
+        """AgentSession whose audio goes through the in-process I/O above instead of the LiveKit room."""
+
+        playback_realtime_factor = 0.05
+        instance: Optional["BenchAgentSession"] = None
+
+        async def start(self, agent, *, room=None, room_input_options=None, **kwargs):
+            self.input.audio = SilenceAudioInput()
+            self.output.audio = self.playback = RecordingAudioOutput(self.playback_realtime_factor)
+            BenchAgentSession.instance = self
+            return await super().start(agent, **kwargs)
+
+    class BenchRoom(rtc.EventEmitter):
+        """What entrypoint reads from ctx.room: metadata, events and a candidate with a subscribed audio track."""
+
+        def __init__(self, metadata: str) -> None:
+            super().__init__()
+            self.metadata = metadata
+            audio_publication = SimpleNamespace(kind=rtc.TrackKind.KIND_AUDIO, subscribed=True)
+            self.remote_participants = {"candidate": SimpleNamespace(identity="candidate", track_publications={"TR_bench": audio_publication})}
+
+    return BenchAgentSession, BenchRoom
+
+
+class BenchJobContext:
+    """The parts of JobContext that entrypoint uses."""
+
+    def __init__(self, room_name: str, room_sid: str, room, connect_seconds: float) -> None:
+        self.job = SimpleNamespace(room=SimpleNamespace(name=room_name, sid=room_sid))
+        # Prewarmed, as in a worker's idle process; turns are ended by the fake STT's end-of-speech events.
+        self.proc = SimpleNamespace(userdata={"prewarmed": True, "vad": None, "turn_detection": "stt", "noise_cancellation": None})
+        self.room = room
+        self.connect_seconds = connect_seconds
+        self._shutdown_callbacks = []
+
+    def add_shutdown_callback(self, callback) -> None:
+        self._shutdown_callbacks.append(callback)
+
+    async def connect(self) -> None:
+        await asyncio.sleep(self.connect_seconds)
+
+    async def run_shutdown_callbacks(self) -> None:
+        for callback in self._shutdown_callbacks:
+            await callback()
+
+
+async def run_interview(agent_module, config: dict) -> dict:
+    from fake_plugins import CANDIDATE_REPLIES
+
+    BenchAgentSession, BenchRoom = define_session_io()
+    BenchAgentSession.playback_realtime_factor = config["playback_realtime_factor"]
+    agent_module.AgentSession = BenchAgentSession
+    agent_module.TRANSCRIPT_BACKUP_DIR = config["transcript_dir"]
+
+    interview_index = config["interview_index"]
+    ctx = BenchJobContext(
+        room_name=f"cand{interview_index % config['candidates']}_{1700000000 + interview_index}",
+        room_sid=f"RM_bench_{interview_index}",
+        room=BenchRoom(json.dumps({agent_module.ROOM_METADATA_SESSION_RECORD_ID_KEY: config["session_record_id"]})),
+        connect_seconds=config["connect_ms"] / 1000,
+    )
+    result: Dict[str, object] = {"turn_latency_ms": []}
+    lag_monitor = EventLoopLagMonitor()
+    lag_monitor.start()
+    session = None
+    try:
+        job_started_at = time.perf_counter()
+        await agent_module.entrypoint(ctx)
+        session = BenchAgentSession.instance
+        playback, fake_stt = session.playback, session.stt
+        await asyncio.wait_for(playback.wait_for_segments(1), config["turn_timeout_seconds"])
+        result["time_to_greeting_ms"] = (playback.segment_first_frame_at[0] - job_started_at) * 1000
+
+        for turn_index in range(1, config["turns"] + 1):
+            fake_stt.speak(CANDIDATE_REPLIES[(turn_index - 1) % len(CANDIDATE_REPLIES)], config["speech_ms"] / 1000)
+            await asyncio.wait_for(playback.wait_for_segments(turn_index + 1), config["turn_timeout_seconds"])
+            result["turn_latency_ms"].append((playback.segment_first_frame_at[turn_index] - fake_stt.speech_ended_at) * 1000)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        shutdown_started_at = time.perf_counter()
+        await ctx.run_shutdown_callbacks()
+        result["shutdown_persistence_ms"] = (time.perf_counter() - shutdown_started_at) * 1000
+        if session is not None:
+            await session.aclose()
+        await lag_monitor.stop()
+    result["event_loop_lag_ms"] = [lag * 1000 for lag in lag_monitor.lag_samples]
+    result["rss_mb"] = current_rss_mb()
+    return result
+
+
+def interview_process_main(config: dict) -> int:
+    """One interview, run like a LiveKit job process: import and prewarm, wait for dispatch, run entrypoint."""
+    register_fake_providers(config)
+    import agent as agent_module
+    logging.getLogger().setLevel(logging.WARNING)
+    # What prewarm does besides loading the local models, which the stand-in session doesn't use.
+    agent_module.warm_token_encoding(agent_module.OPENAI_MODEL_NAME)
+
+    print("READY", flush=True)
+    sys.stdin.readline()
+    result = asyncio.run(run_interview(agent_module, config))
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+    return 0
+
+
+# --- Worker (main) process ---
+
+async def start_interview_process(config: dict, log_path: str) -> asyncio.subprocess.Process:
+    with open(log_path, "w") as log_file:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "--interview-process", json.dumps(config),
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=log_file,
+        )
+    ready_line = await process.stdout.readline()
+    if ready_line.strip() != b"READY":
+        await process.wait()
+        raise RuntimeError(f"Interview process {config['interview_index']} failed to start; see {log_path}")
+    return process
+
+
+async def collect_interview_result(process: asyncio.subprocess.Process, log_path: str) -> dict:
+    stdout, _ = await process.communicate()
+    for line in reversed(stdout.decode().splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    return {"error": f"exited with status {process.returncode} without a result; see {log_path}"}
+
+
+async def run_load_test(args) -> dict:
+    work_dir = tempfile.TemporaryDirectory(prefix="ai_interviewer_loadtest_")
+    standin = AirtableStandIn(latency_seconds=args.airtable_ms / 1000, error_rate=args.airtable_error_rate, seed=args.seed).start()
+    # Shared by this process and every interview process, as on a worker host.
+    os.environ.update({
+        "AIRTABLE_PAT": "bench-token",
+        "AIRTABLE_ENDPOINT_URL": standin.endpoint_url,
+        "AIRTABLE_RATE_LIMIT_PER_SEC": str(args.airtable_rate_limit),
+        "AIRTABLE_RATE_LIMIT_BURST": str(max(1, int(args.airtable_rate_limit))),
+        "AIRTABLE_RATE_LIMIT_STATE_PATH": os.path.join(work_dir.name, "airtable_rate_limit.json"),
+        "PERSISTENCE_SPOOL_DIR": os.path.join(work_dir.name, "spool"),
+        "JD_CACHE_DIR": os.path.join(work_dir.name, "jd_cache"),
+        "TTS_CACHE_DIR": os.path.join(work_dir.name, "tts_cache"),
+        "WORKER_LOAD_STATE_DIR": os.path.join(work_dir.name, "load"),
+        "PROVIDER_STATS_STATE_PATH": os.path.join(work_dir.name, "provider_stats.json"),
+        "TRANSCRIPT_CHECKPOINT_INTERVAL_SECONDS": str(args.checkpoint_seconds),
+        "TRANSCRIPT_CHECKPOINT_BATCH_ITEMS": str(args.checkpoint_items),
+    })
+    base_config = {
+        "seed": args.seed, "jitter_ms": args.jitter_ms, "stt_ms": args.stt_ms, "llm_ttft_ms": args.llm_ttft_ms, "tts_ttfb_ms": args.tts_ttfb_ms,
+        "candidates": args.candidates, "turns": args.turns, "connect_ms": args.connect_ms, "speech_ms": args.speech_ms,
+        "playback_realtime_factor": args.playback_realtime_factor, "turn_timeout_seconds": args.turn_timeout_seconds,
+        "transcript_dir": os.path.join(work_dir.name, "transcripts"),
+    }
+    register_fake_providers(base_config)
+    import agent as agent_module
+    from persistence_spool import SpoolDrainer
+    logging.getLogger().setLevel(logging.WARNING)
+    drainer = SpoolDrainer(
+        agent_module.persistence_spool, agent_module.write_interview_session_updates,
+        batch_max_entries=agent_module.PERSISTENCE_BATCH_MAX_ENTRIES, interval_seconds=0.2, max_attempts=agent_module.PERSISTENCE_MAX_ATTEMPTS,
+    )
+
+    for candidate_index in range(args.candidates):
+        standin.add_record(agent_module.SUCCESSFUL_CANDIDATES_TABLE_ID, {
+            agent_module.FIELD_SC_UNIQUE_ID_NAME: f"cand{candidate_index}",
+            agent_module.FIELD_SC_JD_LOOKUP_NAME: [f"Senior Python Developer #{candidate_index}. Primary skills: asyncio, PostgreSQL, AWS."],
+        })
+    interview_configs = []
+    for interview_index in range(args.interviews):
+        session_record_id = standin.add_record(agent_module.INTERVIEW_SESSIONS_TABLE_ID, {
+            agent_module.FIELD_IS_LIVEKIT_ROOM_SID_NAME: f"RM_bench_{interview_index}",
+            agent_module.FIELD_IS_TRANSCRIPT_NAME: "",
+        })
+        interview_configs.append({**base_config, "interview_index": interview_index, "session_record_id": session_record_id})
+
+    log_paths = [os.path.join(work_dir.name, f"interview_{config['interview_index']}.log") for config in interview_configs]
+    processes = await asyncio.gather(*(start_interview_process(config, log_path) for config, log_path in zip(interview_configs, log_paths)))
+    drainer_task = asyncio.create_task(drainer.run_forever())
+    started_at = time.perf_counter()
+    # Dispatch every interview at once, as when a burst of candidates joins.
+    for process in processes:
+        process.stdin.write(b"go\n")
+    results = await asyncio.gather(*(collect_interview_result(process, log_path) for process, log_path in zip(processes, log_paths)))
+    interviews_done_at = time.perf_counter()
+    drainer_task.cancel()
+    await drainer.drain(args.drain_timeout_seconds)
+    spool_drain_seconds = time.perf_counter() - interviews_done_at
+    wall_seconds = time.perf_counter() - started_at
+    standin.stop()
+    undelivered_updates = len(agent_module.persistence_spool)
+    failed_interviews = [f"interview {i}: {result['error']}" for i, result in enumerate(results) if result.get("error")]
+    if failed_interviews:
+        # Keep the interview logs for inspection.
+        print(f"Interview process logs kept in {work_dir.name}", file=sys.stderr)
+    else:
+        work_dir.cleanup()
+
+    metrics: Dict[str, List[float]] = {"time_to_greeting_ms": [], "turn_latency_ms": [], "shutdown_persistence_ms": [], "event_loop_lag_ms": []}
+    for result in results:
+        for name in ("time_to_greeting_ms", "shutdown_persistence_ms"):
+            if name in result:
+                metrics[name].append(result[name])
+        metrics["turn_latency_ms"].extend(result.get("turn_latency_ms", []))
+        metrics["event_loop_lag_ms"].extend(result.get("event_loop_lag_ms", []))
+    interview_rss_mb = [result["rss_mb"] for result in results if "rss_mb" in result]
+    summary = {
+        "interviews": args.interviews,
+        "turns_per_interview": args.turns,
+        "failed_interviews": failed_interviews,
+        "wall_seconds": round(wall_seconds, 3),
+        "airtable_requests": standin.request_count,
+        "airtable_throttled": standin.throttled_count,
+        "spool_drain_seconds": round(spool_drain_seconds, 3),
+        "undelivered_updates": undelivered_updates,
+        "worker_rss_mb": round(current_rss_mb(), 1),
+        "interview_rss_mb": {"p50": round(percentile(interview_rss_mb, 50), 1), "max": round(max(interview_rss_mb), 1)} if interview_rss_mb else None,
+    }
+    for name, values in metrics.items():
+        summary[name] = {f"p{pct}": round(percentile(values, pct), 1) if values else None for pct in (50, 95, 99)}
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline load test for the AI interviewer agent.")
+    parser.add_argument("--interviews", type=int, default=10, help="Concurrent simulated interviews, one process each.")
+    parser.add_argument("--turns", type=int, default=6, help="Candidate turns per interview.")
+    parser.add_argument("--candidates", type=int, default=10, help="Distinct candidate IDs (fewer than --interviews simulates reconnects).")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--connect-ms", type=float, default=50)
+    parser.add_argument("--speech-ms", type=float, default=200, help="Simulated candidate speaking time per turn.")
+    parser.add_argument("--stt-ms", type=float, default=150, help="STT finalization latency.")
+    parser.add_argument("--llm-ttft-ms", type=float, default=300)
+    parser.add_argument("--tts-ttfb-ms", type=float, default=150)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--playback-realtime-factor", type=float, default=0.05, help="Fraction of real time the simulated speaker takes to play audio.")
+    parser.add_argument("--airtable-ms", type=float, default=80, help="Latency of every stand-in Airtable request.")
+    parser.add_argument("--airtable-error-rate", type=float, default=0.0, help="Fraction of stand-in requests answered with 429.")
+    parser.add_argument("--airtable-rate-limit", type=float, default=5.0)
+    parser.add_argument("--checkpoint-seconds", type=float, default=1.0)
+    parser.add_argument("--checkpoint-items", type=int, default=4)
+    parser.add_argument("--turn-timeout-seconds", type=float, default=30, help="Fail an interview whose greeting or reply doesn't finish playing in time.")
+    parser.add_argument("--drain-timeout-seconds", type=float, default=60, help="How long to wait for spooled updates after the last interview.")
+    parser.add_argument("--json", dest="json_path", help="Also write the summary to this file.")
+    parser.add_argument("--max-p95-greeting-ms", type=float)
+    parser.add_argument("--max-p95-turn-ms", type=float)
+    parser.add_argument("--max-p95-shutdown-ms", type=float)
+    parser.add_argument("--max-p99-loop-lag-ms", type=float)
+    parser.add_argument("--interview-process", metavar="CONFIG_JSON", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.interview_process:
+        return interview_process_main(json.loads(args.interview_process))
+
+    summary = asyncio.run(run_load_test(args))
+    print(json.dumps(summary, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+    thresholds = [
+        ("time_to_greeting_ms", "p95", args.max_p95_greeting_ms),
+        ("turn_latency_ms", "p95", args.max_p95_turn_ms),
+        ("shutdown_persistence_ms", "p95", args.max_p95_shutdown_ms),
+        ("event_loop_lag_ms", "p99", args.max_p99_loop_lag_ms),
+    ]
+    failed = bool(summary["failed_interviews"])
+    for failure in summary["failed_interviews"]:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if summary["undelivered_updates"] > 0:
+        print(f"FAIL: {summary['undelivered_updates']} session update(s) still spooled after the drain timeout", file=sys.stderr)
+        failed = True
+    for metric_name, pct, limit in thresholds:
+        measured = summary[metric_name][pct]
+        if limit is not None and measured is not None and measured > limit:
+            print(f"FAIL: {metric_name} {pct} = {measured} ms exceeds {limit} ms", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""pytest wrapper for check_import_time.py, so an import-time regression fails the test run.
+
+    python -m pytest bench/test_import_time.py
+    AGENT_IMPORT_BUDGET_MS=2000 python -m pytest bench/test_import_time.py
+"""
+from check_import_time import DEFAULT_BUDGET_MS, fastest_agent_import, import_time_failures
+
+
+def test_agent_import_stays_within_budget():
+    failures = import_time_failures(fastest_agent_import(runs=3), DEFAULT_BUDGET_MS)
+    assert not failures, "; ".join(failures)
@@ -0,0 +1,113 @@
+"""Micro-benchmark: shutdown transcript backup, old indented JSON vs streaming NDJSON.
+
+For synthetic histories of each size, measures the longest event-loop stall while the backup
+is written and the transcript text formatted, the total time, and the file size.
+
+    python bench/transcript_backup_bench.py
+    python bench/transcript_backup_bench.py --sizes 1000 10000 --codecs none gzip zstd
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Awaitable, Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents import llm
+
+from fake_plugins import CANDIDATE_REPLIES, SCRIPTED_REPLIES
+from transcript_backup import backup_file_suffix, iter_history_items, resolve_backup_compression, write_transcript_backup_async
+
+
+def synthetic_history(item_count: int, seed: int) -> llm.ChatContext:
+    rng = random.Random(seed)
+    history = llm.ChatContext.empty()
+    for i in range(item_count):
+        replies = SCRIPTED_REPLIES if i % 2 == 0 else CANDIDATE_REPLIES
+        text = " ".join(rng.choice(replies) for _ in range(rng.randint(1, 3)))
+        history.add_message(role="assistant" if i % 2 == 0 else "user", content=text, interrupted=rng.random() < 0.05)
+    return history
+
+
+async def max_loop_stall_ms(operation: Callable[[], Awaitable[None]]) -> float:
+    """Runs `operation` while a 1 ms ticker measures the longest gap between ticks."""
+    loop = asyncio.get_running_loop()
+    longest_gap = 0.0
+    done = False
+
+    async def ticker() -> None:
+        nonlocal longest_gap
+        last_tick = loop.time()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = loop.time()
+            longest_gap = max(longest_gap, now - last_tick)
+            last_tick = now
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.005)
+    await operation()
+    done = True
+    await ticker_task
+    return longest_gap * 1000
+
+
+async def run_benchmark(sizes: List[int], codecs: List[str], seed: int) -> List[dict]:
+    import agent
+    results = []
+    with tempfile.TemporaryDirectory(prefix="ai_interviewer_backup_bench_") as out_dir:
+        for size in sizes:
+            history = synthetic_history(size, seed)
+
+            legacy_path = os.path.join(out_dir, f"legacy_{size}.json")
+
+            async def legacy_backup() -> None:
+                history_dict = history.to_dict()
+                with open(legacy_path, "w") as f:
+                    json.dump(history_dict, f, indent=2)
+                agent.format_transcript_from_history(history_dict)
+
+            started_at = time.perf_counter()
+            stall_ms = await max_loop_stall_ms(legacy_backup)
+            results.append({"items": size, "format": "json indent=2 (on loop)", "max_stall_ms": round(stall_ms, 1),
+                            "total_ms": round((time.perf_counter() - started_at) * 1000, 1), "bytes": os.path.getsize(legacy_path)})
+
+            for compression in dict.fromkeys(resolve_backup_compression(codec) for codec in codecs):
+                path = os.path.join(out_dir, f"stream_{size}{backup_file_suffix(compression)}")
+
+                async def streaming_backup() -> None:
+                    snapshot = history.copy()
+                    formatted_lines, item_count = await write_transcript_backup_async(
+                        path, lambda: iter_history_items(snapshot), {"livekit_room_sid": "RM_bench"},
+                        agent.format_transcript_line, compression,
+                    )
+                    agent.join_transcript_lines(formatted_lines, item_count)
+
+                started_at = time.perf_counter()
+                stall_ms = await max_loop_stall_ms(streaming_backup)
+                results.append({"items": size, "format": f"ndjson {compression} (worker thread)", "max_stall_ms": round(stall_ms, 1),
+                                "total_ms": round((time.perf_counter() - started_at) * 1000, 1), "bytes": os.path.getsize(path)})
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark shutdown transcript backup formats.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--codecs", nargs="+", default=["none", "gzip", "zstd"])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.sizes, args.codecs, args.seed))
+    print(f"{'items':>6}  {'format':<34} {'max stall ms':>12} {'total ms':>9} {'bytes':>10}")
+    for row in results:
+        print(f"{row['items']:>6}  {row['format']:<34} {row['max_stall_ms']:>12} {row['total_ms']:>9} {row['bytes']:>10}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
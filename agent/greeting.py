@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from typing import AsyncIterable, AsyncIterator, List, Optional, Sequence
+
+from livekit import rtc
+from livekit.agents import llm, tts
+
+from latency_metrics import StartupTimeline
+from tts_cache import TTSAudioCache, cached_phrase_audio
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeGreeting:
+    """Generates the opening reply's text and audio before the session is ready to speak.
+
+    The text is produced with the same system prompt and greeting instructions that
+    generate_reply would use. Its audio goes through the TTS phrase cache like every other
+    reply, and is only offered once it has been synthesized completely, so a synthesis
+    error can never leave the candidate with a truncated greeting.
+    """
+
+    def __init__(
+        self,
+        llm_engine: llm.LLM,
+        tts_engine: tts.TTS,
+        startup_timeline: Optional[StartupTimeline] = None,
+        audio_cache: Optional[TTSAudioCache] = None,
+        phrases: Sequence[str] = (),
+    ) -> None:
+        self.llm_engine = llm_engine
+        self.tts_engine = tts_engine
+        self.startup_timeline = startup_timeline
+        self.audio_cache = audio_cache
+        self.phrases = phrases
+        self.frames: List[rtc.AudioFrame] = []
+        self._text: "asyncio.Future[str]" = asyncio.get_running_loop().create_future()
+        self._audio_done = asyncio.Event()
+        self._audio_error: Optional[BaseException] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, instructions: str, greeting_instructions: str) -> None:
+        self._task = asyncio.create_task(self._run(instructions, greeting_instructions))
+
+    async def text(self) -> str:
+        """Greeting text. Raises if generation failed."""
+        return await asyncio.shield(self._text)
+
+    async def audio_frames(self) -> List[rtc.AudioFrame]:
+        """Every frame of the greeting, once synthesis has finished. Raises if it failed."""
+        await self._audio_done.wait()
+        if self._audio_error is not None:
+            raise RuntimeError(f"Greeting synthesis failed: {self._audio_error}")
+        if not self.frames:
+            raise RuntimeError("Greeting synthesis produced no audio.")
+        return self.frames
+
+    async def audio(self) -> AsyncIterator[rtc.AudioFrame]:
+        """The complete greeting audio, for AgentSession.say(audio=...)."""
+        for frame in await self.audio_frames():
+            yield frame
+
+    async def aclose(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self, instructions: str, greeting_instructions: str) -> None:
+        self._mark("begin", "greeting_text")
+        try:
+            chat_ctx = llm.ChatContext.empty()
+            chat_ctx.add_message(role="system", content=instructions)
+            chat_ctx.add_message(role="system", content=greeting_instructions)
+            text_parts = []
+            async with self.llm_engine.chat(chat_ctx=chat_ctx) as stream:
+                async for chunk in stream:
+                    if chunk.delta and chunk.delta.content:
+                        text_parts.append(chunk.delta.content)
+            greeting_text = "".join(text_parts).strip()
+            if not greeting_text:
+                raise RuntimeError("LLM returned an empty greeting.")
+            self._text.set_result(greeting_text)
+            self._mark("end", "greeting_text")
+
+            self._mark("begin", "greeting_audio")
+            if self.audio_cache is not None:
+                async for frame in cached_phrase_audio(self.tts_engine, _single_chunk(greeting_text), self.audio_cache, self.phrases, self._synthesize):
+                    self.frames.append(frame)
+            else:
+                async for frame in self._synthesize(_single_chunk(greeting_text)):
+                    self.frames.append(frame)
+            self._mark("end", "greeting_audio")
+            logger.info(f"Pre-generated greeting ({len(greeting_text)} chars, {len(self.frames)} audio frames).")
+        except asyncio.CancelledError:
+            self._audio_error = RuntimeError("greeting pre-generation was cancelled")
+            if not self._text.done():
+                self._text.cancel()
+            raise
+        except Exception as e:
+            self._audio_error = e
+            logger.error(f"Greeting pre-generation failed after {len(self.frames)} audio frames: {e}", exc_info=True)
+            if not self._text.done():
+                self._text.set_exception(e)
+        finally:
+            self._audio_done.set()
+
+    async def _synthesize(self, text: AsyncIterable[str]) -> AsyncIterator[rtc.AudioFrame]:
+        remaining_text = "".join([chunk async for chunk in text]).strip()
+        if not remaining_text:
+            return
+        async with self.tts_engine.synthesize(remaining_text) as stream:
+            async for event in stream:
+                yield event.frame
+
+    def _mark(self, edge: str, step: str) -> None:
+        if self.startup_timeline is not None:
+            getattr(self.startup_timeline, edge)(step)
+
+
+async def _single_chunk(text: str) -> AsyncIterator[str]:
+    yield text
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class JDCache:
+    """Bounded on-disk cache of Job Description text keyed by candidate ID.
+
+    Every job runs in its own short-lived process, so the cache lives in `cache_dir` where all
+    job processes on the host (and the worker's prefetch) can share it. Each entry is a small
+    JSON file holding the text and a wall-clock expiry: positive entries live for `ttl_seconds`,
+    misses ("no record" / empty JD lookups) are stored as `null` for the shorter
+    `negative_ttl_seconds` so repeated joins for an unknown candidate don't re-query Airtable.
+    A positive entry also holds the JD's prompt-ready compacted forms (see
+    prompts.compact_job_description), keyed by model and token budget, so no interview has to
+    tokenize the JD again. Writes go through a temp file and rename; beyond `max_entries` the least recently used
+    files (mtime is bumped on every hit) are removed.
+    """
+
+    def __init__(self, cache_dir: str, max_entries: int = 5000, ttl_seconds: float = 3600.0, negative_ttl_seconds: float = 60.0) -> None:
+        self.cache_dir = cache_dir
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        os.makedirs(cache_dir, exist_ok=True)
+        self._evict_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, candidate_id: str) -> Tuple[bool, Optional[str], Dict[str, dict]]:
+        """Returns (found, jd_text, compacted forms by key). jd_text is None when a cached miss was found."""
+        path = self._path(candidate_id)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            expired = entry["expires_at"] <= time.time() or entry.get("candidate_id") != candidate_id
+        except FileNotFoundError:
+            self.misses += 1
+            return False, None, {}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Discarding unreadable JD cache entry '{path}': {e}")
+            expired = True
+        if expired:
+            self._remove(path)
+            self.misses += 1
+            return False, None, {}
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        compacted = entry.get("compacted")
+        return True, entry.get("jd_text"), compacted if isinstance(compacted, dict) else {}
+
+    def put(self, candidate_id: str, jd_text: str, compacted: Optional[Dict[str, dict]] = None) -> None:
+        if self._store(candidate_id, jd_text, self.ttl_seconds, compacted):
+            self._evict()
+
+    def put_miss(self, candidate_id: str) -> None:
+        if self.negative_ttl_seconds > 0 and self._store(candidate_id, None, self.negative_ttl_seconds):
+            self._evict()
+
+    def put_many(self, entries_by_candidate_id: Dict[str, Tuple[str, Dict[str, dict]]]) -> None:
+        """Stores (jd_text, compacted forms by key) per candidate ID."""
+        for candidate_id, (jd_text, compacted) in entries_by_candidate_id.items():
+            self._store(candidate_id, jd_text, self.ttl_seconds, compacted)
+        self._evict()
+
+    def invalidate(self, candidate_id: str) -> None:
+        self._remove(self._path(candidate_id))
+
+    def clear(self) -> None:
+        for filename in self._entry_filenames():
+            self._remove(os.path.join(self.cache_dir, filename))
+
+    def __len__(self) -> int:
+        return len(self._entry_filenames())
+
+    def _path(self, candidate_id: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(candidate_id.encode("utf-8")).hexdigest() + ".json")
+
+    def _entry_filenames(self) -> list:
+        try:
+            return [name for name in os.listdir(self.cache_dir) if name.endswith(".json")]
+        except OSError:
+            return []
+
+    def _store(self, candidate_id: str, jd_text: Optional[str], ttl_seconds: float, compacted: Optional[Dict[str, dict]] = None) -> bool:
+        if ttl_seconds <= 0:
+            return False
+        entry = {"candidate_id": candidate_id, "jd_text": jd_text, "compacted": compacted or {}, "expires_at": time.time() + ttl_seconds}
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        except OSError as e:
+            logger.error(f"Failed to write JD cache entry for Candidate ID '{candidate_id}': {e}")
+            return False
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(candidate_id))
+        except OSError as e:
+            logger.error(f"Failed to write JD cache entry for Candidate ID '{candidate_id}': {e}")
+            self._remove(tmp_path)
+            return False
+        return True
+
+    def _evict(self) -> None:
+        with self._evict_lock:
+            filenames = self._entry_filenames()
+            if len(filenames) <= self.max_entries:
+                return
+            entries = []
+            for filename in filenames:
+                path = os.path.join(self.cache_dir, filename)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+            entries.sort()
+            for _, path in entries[:len(entries) - self.max_entries]:
+                self._remove(path)
+            logger.debug(f"JD cache full ({self.max_entries} entries). Evicted {max(0, len(entries) - self.max_entries)} LRU entries.")
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,163 @@
+import contextvars
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Dict, List, Optional
+
+# Every process records into mmap files under this directory and the worker's Prometheus
+# endpoint serves the aggregate. prometheus_client picks multiprocess mode when it is first
+# imported, so import this module before livekit (which imports prometheus_client).
+METRICS_MULTIPROC_DIR = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/ai_interviewer_metrics")
+os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+
+from prometheus_client import Histogram, values # Ensure: pip install prometheus-client
+
+logger = logging.getLogger(__name__)
+
+# Served by the LiveKit worker (WorkerOptions.prometheus_port); 0 disables the endpoint.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+_metrics_files_generation = 0
+
+
+def _metrics_process_identifier() -> str:
+    pid = str(os.getpid())
+    return f"{pid}g{_metrics_files_generation}" if _metrics_files_generation else pid
+
+
+# Same as the default (one set of files per process), but lets reopen_metrics_files() start new files.
+values.ValueClass = values.MultiProcessValue(_metrics_process_identifier)
+LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0)
+
+EOU_DELAY_SECONDS = Histogram("interviewer_eou_delay_seconds", "End of candidate speech to end-of-turn decision.", buckets=LATENCY_BUCKETS)
+STT_FINAL_DELAY_SECONDS = Histogram("interviewer_stt_final_delay_seconds", "End of candidate speech to final STT transcript.", buckets=LATENCY_BUCKETS)
+LLM_TTFT_SECONDS = Histogram("interviewer_llm_ttft_seconds", "LLM time to first token.", buckets=LATENCY_BUCKETS)
+LLM_DURATION_SECONDS = Histogram("interviewer_llm_duration_seconds", "LLM total completion time.", buckets=LATENCY_BUCKETS)
+TTS_TTFB_SECONDS = Histogram("interviewer_tts_ttfb_seconds", "TTS time to first audio byte.", buckets=LATENCY_BUCKETS)
+AIRTABLE_REQUEST_SECONDS = Histogram(
+    "interviewer_airtable_request_seconds", "Airtable request time including rate limiting and retries.",
+    labelnames=("operation", "outcome"), buckets=LATENCY_BUCKETS
+)
+
+_current_recorder: "contextvars.ContextVar[Optional[TurnLatencyRecorder]]" = contextvars.ContextVar("turn_latency_recorder", default=None)
+
+
+class TurnLatencyRecorder:
+    """Collects per-turn pipeline timings for one room from AgentSession metrics events.
+
+    Timings are grouped by speech_id; a structured log line is emitted once the turn's TTS
+    metrics arrive, and the full list is available via to_dict() for the transcript backup.
+
+    `airtable_requests` only holds the Airtable calls made inside this job, i.e. the JD fetch
+    when it misses the JD cache. Writes are spooled; the main process's SpoolDrainer looks up
+    their session records and delivers them in batches across rooms, so those timings appear
+    only in the interviewer_airtable_request_seconds histogram.
+    """
+
+    def __init__(self, livekit_room_sid: Optional[str]) -> None:
+        self.livekit_room_sid = livekit_room_sid
+        self.turns: Dict[str, Dict[str, Any]] = {}
+        self.airtable_requests: List[Dict[str, Any]] = []
+
+    def activate(self) -> None:
+        """Makes this recorder receive the Airtable timings of the current task and its children."""
+        _current_recorder.set(self)
+
+    def on_metrics_collected(self, event: Any) -> None:
+        metrics = event.metrics
+        metrics_type = getattr(metrics, "type", None)
+        speech_id = getattr(metrics, "speech_id", None)
+        if metrics_type == "eou_metrics":
+            EOU_DELAY_SECONDS.observe(metrics.end_of_utterance_delay)
+            STT_FINAL_DELAY_SECONDS.observe(metrics.transcription_delay)
+            self._turn(speech_id).update(eou_delay=metrics.end_of_utterance_delay, stt_final_delay=metrics.transcription_delay)
+        elif metrics_type == "llm_metrics":
+            LLM_TTFT_SECONDS.observe(metrics.ttft)
+            LLM_DURATION_SECONDS.observe(metrics.duration)
+            self._turn(speech_id).update(
+                llm_ttft=metrics.ttft, llm_duration=metrics.duration,
+                prompt_tokens=metrics.prompt_tokens, prompt_cached_tokens=getattr(metrics, "prompt_cached_tokens", 0),
+                completion_tokens=metrics.completion_tokens,
+            )
+        elif metrics_type == "tts_metrics":
+            TTS_TTFB_SECONDS.observe(metrics.ttfb)
+            turn = self._turn(speech_id)
+            turn.update(tts_ttfb=metrics.ttfb, tts_audio_duration=metrics.audio_duration)
+            logger.info(f"Turn latency: {json.dumps(turn, default=str)}")
+
+    def record_airtable_request(self, operation: str, seconds: float, ok: bool) -> None:
+        self.airtable_requests.append({"operation": operation, "seconds": round(seconds, 4), "ok": ok, "at": time.time()})
+
+    def to_dict(self) -> dict:
+        return {
+            "livekit_room_sid": self.livekit_room_sid,
+            "turns": list(self.turns.values()),
+            "airtable_requests": self.airtable_requests,
+        }
+
+    def _turn(self, speech_id: Optional[str]) -> Dict[str, Any]:
+        key = speech_id or f"unassigned_{len(self.turns)}"
+        if key not in self.turns:
+            self.turns[key] = {"livekit_room_sid": self.livekit_room_sid, "speech_id": speech_id, "started_at": time.time()}
+        return self.turns[key]
+
+
+class StartupTimeline:
+    """Start and end offsets of the job's startup steps, in ms since the job started.
+
+    Steps run concurrently, so the summary line shows where they overlap rather than a sum.
+    """
+
+    def __init__(self, job_started_at: float) -> None:
+        self.job_started_at = job_started_at
+        self.steps: Dict[str, Dict[str, Optional[float]]] = {}
+
+    def begin(self, step: str) -> None:
+        self.steps[step] = {"start_ms": self._offset_ms(), "end_ms": None}
+
+    def end(self, step: str) -> None:
+        if step not in self.steps:
+            self.begin(step)
+        self.steps[step]["end_ms"] = self._offset_ms()
+
+    async def track(self, step: str, awaitable: Awaitable[Any]) -> Any:
+        self.begin(step)
+        try:
+            return await awaitable
+        finally:
+            self.end(step)
+
+    def to_dict(self) -> Dict[str, Dict[str, Optional[float]]]:
+        return dict(self.steps)
+
+    def log_summary(self, livekit_room_sid: Optional[str]) -> None:
+        ordered_steps = sorted(self.steps.items(), key=lambda item: item[1]["start_ms"])
+        parts = [
+            f"{step} {times['start_ms']:.0f}-{times['end_ms']:.0f} ms" if times["end_ms"] is not None else f"{step} {times['start_ms']:.0f}- ms"
+            for step, times in ordered_steps
+        ]
+        logger.info(f"Startup timeline (LiveKit SID: {livekit_room_sid}): {' | '.join(parts)}")
+
+    def _offset_ms(self) -> float:
+        return round((time.perf_counter() - self.job_started_at) * 1000, 1)
+
+
+def record_airtable_request(operation: str, seconds: float, ok: bool) -> None:
+    AIRTABLE_REQUEST_SECONDS.labels(operation=operation, outcome="ok" if ok else "error").observe(seconds)
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        recorder.record_airtable_request(operation, seconds, ok)
+
+
+def reopen_metrics_files() -> None:
+    """Moves this process's metrics to new files. Call from the main worker process on "worker_started".
+
+    The worker empties METRICS_MULTIPROC_DIR when it starts, after the main process has already
+    opened its files at import; without this, its samples (e.g. the spool drainer's Airtable
+    timings) would go to deleted files and never reach the endpoint.
+    """
+    global _metrics_files_generation
+    _metrics_files_generation += 1
+    # Picked up by every metric on its next update (prometheus_client treats it like a fork).
+    logger.info(f"Prometheus multiprocess files reopened in {METRICS_MULTIPROC_DIR} after the worker's cleanup.")
@@ -0,0 +1,233 @@
+import asyncio
+import fcntl
+import itertools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import IO, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILENAME = ".drainer.lock"
+DEAD_LETTER_DIRNAME = "dead"
+
+
+@dataclass
+class SpoolEntry:
+    name: str
+    payload: dict
+
+
+@dataclass
+class SpoolBatchResult:
+    """What a SpoolDrainer `write_batch` callback did with a batch.
+
+    `delivered` entries are removed from the spool. `rejected` entries failed in a way retrying
+    can't fix (e.g. Airtable answered 4xx other than 429, or the record they target doesn't
+    exist) and count towards `max_attempts`. Every other entry was not delivered for a
+    transient reason and is retried without counting an attempt.
+    """
+    delivered: Set[str] = field(default_factory=set)
+    rejected: Set[str] = field(default_factory=set)
+
+
+class PersistenceSpool:
+    """Durable FIFO of pending Airtable writes: one fsync'd JSON file per entry.
+
+    File names start with a nanosecond timestamp, so sorting them gives enqueue order. Job
+    processes only append here; a single SpoolDrainer per host delivers and removes entries.
+    """
+
+    def __init__(self, spool_dir: str) -> None:
+        self.spool_dir = spool_dir
+        self.dead_letter_dir = os.path.join(spool_dir, DEAD_LETTER_DIRNAME)
+        os.makedirs(self.dead_letter_dir, exist_ok=True)
+        self._sequence = itertools.count()
+
+    def enqueue_sync(self, payloads: List[dict]) -> List[str]:
+        names = []
+        for payload in payloads:
+            name = f"{time.time_ns():020d}-{os.getpid()}-{next(self._sequence):06d}.json"
+            fd, tmp_path = tempfile.mkstemp(dir=self.spool_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(payload, f, separators=(",", ":"))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, os.path.join(self.spool_dir, name))
+            except OSError:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            names.append(name)
+        if names:
+            self._fsync_dir()
+        return names
+
+    async def enqueue(self, payloads: List[dict]) -> bool:
+        """Spools `payloads` off the event loop. Returns False if they could not be made durable."""
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.enqueue_sync, payloads)
+            return True
+        except OSError as e:
+            logger.error(f"Failed to spool {len(payloads)} Airtable update(s) to '{self.spool_dir}': {e}", exc_info=True)
+            return False
+
+    def pending(self, limit: int) -> List[SpoolEntry]:
+        try:
+            names = sorted(name for name in os.listdir(self.spool_dir) if name.endswith(".json"))
+        except OSError as e:
+            logger.error(f"Could not list spool directory '{self.spool_dir}': {e}")
+            return []
+        entries = []
+        for name in names[:limit]:
+            try:
+                with open(os.path.join(self.spool_dir, name)) as f:
+                    entries.append(SpoolEntry(name, json.load(f)))
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                logger.error(f"Unreadable spool entry '{name}': {e}. Moving it to the dead-letter directory.")
+                self.move_to_dead_letter(name)
+        return entries
+
+    def remove(self, name: str) -> None:
+        try:
+            os.remove(os.path.join(self.spool_dir, name))
+        except FileNotFoundError:
+            pass
+
+    def move_to_dead_letter(self, name: str) -> None:
+        try:
+            os.replace(os.path.join(self.spool_dir, name), os.path.join(self.dead_letter_dir, name))
+        except OSError as e:
+            logger.error(f"Could not move spool entry '{name}' to '{self.dead_letter_dir}': {e}")
+
+    def acquire_drainer_lock(self, blocking: bool) -> Optional[IO]:
+        """Takes the host-wide drainer lock. Returns the open lock file (keep it open to hold the
+        lock), or None if `blocking` is False and another process holds it."""
+        lock_file = open(os.path.join(self.spool_dir, LOCK_FILENAME), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return lock_file
+
+    def __len__(self) -> int:
+        try:
+            return sum(1 for name in os.listdir(self.spool_dir) if name.endswith(".json"))
+        except OSError:
+            return 0
+
+    def _fsync_dir(self) -> None:
+        dir_fd = os.open(self.spool_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class SpoolDrainer:
+    """Delivers spooled entries in batches and removes them once written.
+
+    `write_batch` receives entries in enqueue order and returns a SpoolBatchResult; entries it
+    did not deliver stay spooled and are retried with backoff. Only rejected entries count
+    attempts and move to the dead-letter directory after `max_attempts`, so an Airtable outage
+    (connection errors, 5xx, 429, or `write_batch` raising) delays delivery but never
+    dead-letters anything. Entries left over from a previous run are replayed on start.
+    """
+
+    def __init__(
+        self,
+        spool: PersistenceSpool,
+        write_batch: Callable[[List[SpoolEntry]], Awaitable[SpoolBatchResult]],
+        batch_max_entries: int,
+        interval_seconds: float,
+        max_attempts: int,
+        max_backoff_seconds: float = 60.0,
+    ) -> None:
+        self.spool = spool
+        self.write_batch = write_batch
+        self.batch_max_entries = batch_max_entries
+        self.interval_seconds = interval_seconds
+        self.max_attempts = max_attempts
+        self.max_backoff_seconds = max_backoff_seconds
+        self._attempts: Dict[str, int] = {}
+
+    async def drain_once(self) -> Optional[bool]:
+        """One batch. Returns None when the spool is empty, else whether every entry was delivered."""
+        entries = self.spool.pending(self.batch_max_entries)
+        if not entries:
+            return None
+        try:
+            result = await self.write_batch(entries)
+        except Exception as e:
+            logger.error(f"Spool batch of {len(entries)} entries failed: {e}. Retrying it later.", exc_info=True)
+            result = SpoolBatchResult()
+        delivered = result.delivered
+        for entry in entries:
+            if entry.name in delivered:
+                self.spool.remove(entry.name)
+                self._attempts.pop(entry.name, None)
+                continue
+            if entry.name not in result.rejected:
+                continue
+            attempts = self._attempts.get(entry.name, 0) + 1
+            self._attempts[entry.name] = attempts
+            if attempts >= self.max_attempts:
+                logger.error(f"Spool entry '{entry.name}' was rejected {attempts} times. Moving it to the dead-letter directory.")
+                self.spool.move_to_dead_letter(entry.name)
+                self._attempts.pop(entry.name, None)
+        logger.info(f"Delivered {len(delivered)}/{len(entries)} spooled Airtable update(s).")
+        return len(delivered) == len(entries)
+
+    async def drain(self, timeout_seconds: float) -> bool:
+        """Drains until the spool is empty or `timeout_seconds` pass. Returns True if it emptied."""
+        deadline = time.monotonic() + timeout_seconds
+        backoff_seconds = self.interval_seconds
+        while time.monotonic() < deadline:
+            result = await self.drain_once()
+            if result is None:
+                return True
+            if result:
+                backoff_seconds = self.interval_seconds
+            else:
+                await asyncio.sleep(min(backoff_seconds, max(0.0, deadline - time.monotonic())))
+                backoff_seconds = min(backoff_seconds * 2, self.max_backoff_seconds)
+        return len(self.spool) == 0
+
+    async def run_forever(self) -> None:
+        backoff_seconds = self.interval_seconds
+        while True:
+            result = await self.drain_once()
+            if result is False:
+                backoff_seconds = min(backoff_seconds * 2, self.max_backoff_seconds)
+            else:
+                backoff_seconds = self.interval_seconds
+            if result is None or result is False:
+                await asyncio.sleep(backoff_seconds)
+
+    def start_thread(self) -> threading.Thread:
+        """Drains on a daemon thread once this process holds the host-wide drainer lock."""
+        drainer_thread = threading.Thread(target=self._run_with_lock, name="airtable-spool-drainer", daemon=True)
+        drainer_thread.start()
+        return drainer_thread
+
+    def _run_with_lock(self) -> None:
+        # Only one drainer per spool directory; another worker's drainer hands over when it exits.
+        lock_file = self.spool.acquire_drainer_lock(blocking=False)
+        if lock_file is None:
+            logger.info(f"Another worker is draining '{self.spool.spool_dir}'. Waiting to take over.")
+            lock_file = self.spool.acquire_drainer_lock(blocking=True)
+        with lock_file:
+            pending = len(self.spool)
+            if pending:
+                logger.info(f"Replaying {pending} spooled Airtable update(s) left from a previous run.")
+            asyncio.run(self.run_forever())
@@ -0,0 +1,225 @@
+import functools
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken # Ensure: pip install tiktoken
+except ImportError:
+    tiktoken = None
+
+JD_SECTION_START = "--- START OF CRITICAL JOB DESCRIPTION FOR THIS INTERVIEW ---"
+JD_SECTION_END = "--- END OF CRITICAL JOB DESCRIPTION FOR THIS INTERVIEW ---"
+
+# Byte-identical across sessions so provider-side prompt caching can reuse it. Anything
+# session-specific (the JD) goes after it in build_interview_instructions.
+STATIC_INSTRUCTIONS_PREFIX = """You are 'Alex', an expert AI interviewer.
+Your PRIMARY OBJECTIVE is to evaluate a candidate against the SPECIFIC requirements in the 'CRITICAL JOB DESCRIPTION' at the end of these instructions.
+RULE FOR EVERY TURN: You will ask questions ONE AT A TIME and wait for a response. Never list several questions, and never reveal the rest of the interview structure or your other planned questions.
+Avoid any special formatting characters in your spoken output. Speak naturally.
+
+IF A CANDIDATE'S ANSWER IS INCOMPLETE, UNCLEAR, OR NOT SUFFICIENTLY DETAILED:
+You MUST ask ONE or TWO targeted follow-up questions to probe deeper into their understanding of THAT specific concept or skill from the JD.
+Your follow-up should aim to elicit more detail, clarify their reasoning, or test the practical application of their stated knowledge.
+Example of a follow-up: "Could you elaborate on that?" or "Can you give me a specific example of how you've applied that concept mentioned in the JD?" or "What challenges might you anticipate with that approach in the context of [relevant aspect from JD]?"
+Only after you are satisfied with their response (or have exhausted follow-ups for that point) should you move to the next distinct question.
+
+HANDLING CANDIDATE QUESTIONS ABOUT THE JOB DESCRIPTION:
+If the candidate asks you to "tell me more about the job description," or similar questions requesting details from the JD, you SHOULD provide a concise summary or answer their specific query using the information from the 'CRITICAL JOB DESCRIPTION' section. Do NOT say you don't have access. You DO have access. After answering, gently guide the conversation back to your interview questions.
+
+INTERVIEW STAGES (IN INCREASING ORDER OF DIFFICULTY):
+
+1.  Greeting and Readiness:
+    Analyze the 'CRITICAL JOB DESCRIPTION' to identify the position title or main role.
+    Start with: "Hello, I'm Alex, your interviewer today. It looks like we're discussing a role related to [mention the identified position title/summary from JD, e.g., 'a Senior PHP Developer position']. This technical session will focus on the technical skills and concepts outlined in that job description. Are you ready to begin?"
+    If no clear title is present, say "a software development role focusing on the skills in this description."
+    Wait for an affirmative response. After they confirm readiness, say: "Great. We'll start with some foundational questions based on the job description, then gradually move to more complex topics."
+
+2.  Stage 1: Foundational Concept-Based Questions (from JD's "Primary" or "Must-Have" Skills):
+    Goal: Assess basic understanding of core concepts.
+    Identify 2-3 core "Primary Skills" or "must-have" technical skills explicitly listed in the 'CRITICAL JOB DESCRIPTION'.
+    For each of these identified skills, formulate ONE foundational, concept-based question. This question should be designed to assess the candidate's basic understanding of a core concept related to that specific skill as it's described or implied in the JD.
+    Apply the follow-up question strategy if answers are insufficient.
+
+3.  Stage 2: Medium-Level Concept-Based Questions (from JD's "Secondary Skills" or "Key Responsibilities"):
+    Goal: Assess deeper understanding and ability to compare or relate concepts.
+    After completing Stage 1, announce: "Okay, let's move on to some more detailed questions."
+    Transition to questions based on "Secondary Skills" or technical skills implied by the "Key Responsibilities" section in the Job Description.
+    Formulate 2-3 concept-based questions that require a deeper understanding or ask for comparisons of approaches relevant to those skills from the JD.
+    Apply the follow-up question strategy if answers are insufficient.
+
+4.  Stage 3: Challenging Scenario/Concept Questions (from complex aspects of JD):
+    Goal: Assess problem-solving, design thinking, and handling of complexity.
+    After completing Stage 2, announce: "Now for a couple of more challenging questions that might involve scenarios or deeper technical design."
+    Identify 1-2 challenging aspects, a combination of multiple skills mentioned, or a senior-level responsibility from the Job Description.
+    Formulate 1-2 concept-based questions or brief hypothetical mini-scenarios that would test problem-solving or design thinking related to these complex elements from the JD. These questions should require the candidate to apply their knowledge of concepts mentioned or implied in the JD.
+    Apply the follow-up question strategy if answers are insufficient.
+
+5.  Concluding the Interview:
+    Thank the candidate. Your summary MUST directly assess their conceptual understanding of the skills and responsibilities MENTIONED IN THE 'CRITICAL JOB DESCRIPTION', considering their performance across all stages.
+    Specifically mention:
+    - Grasp of core concepts related to "Primary Skills" from the JD.
+    - Understanding of concepts from "Secondary Skills" or "Key Responsibilities" in the JD.
+    - Ability to handle more complex scenario-based questions related to the JD.
+    - Strengths in conceptual understanding relevant to the JD.
+    - Areas where conceptual understanding related to the JD seemed lacking, noting if follow-ups helped clarify.
+    Maintain a professional tone.
+"""
+
+# Per-turn instructions for the opening reply. Also static, so it is cache-friendly too.
+GREETING_TURN_INSTRUCTIONS = """YOUR IMMEDIATE TASK:
+1.  Analyze the 'CRITICAL JOB DESCRIPTION' to identify the likely position title.
+2.  Formulate your GREETING.
+3.  Identify ONE foundational, concept-based question based on a core "Primary Skill" or "must-have" technical skill from the Job Description.
+4.  SPEAK ONLY your greeting, state the role, check readiness, and then ask ONLY THIS ONE first foundational question. Do NOT list other questions or future steps.
+
+Example of how to start (adapt the role based on the JD):
+"Hello, I'm Alex, your interviewer today. I'll interview for a role related to [identified position title/summary from JD]. This technical session will focus on the skills in that job description. Are you ready to begin?"
+(Wait for "yes")
+"Great. Let's start with a foundational question. Based on the job description's emphasis on [Primary Skill from JD], could you explain [concept related to that primary skill]?"
+
+Wait for the candidate's response to this single question."""
+
+# Fixed sentences the interviewer is told to say verbatim. Their audio is served from the
+# TTS cache when a reply starts with them.
+SCRIPTED_PHRASES = (
+    "Hello, I'm Alex, your interviewer today.",
+    "Great. Let's start with a foundational question.",
+    "Great. We'll start with some foundational questions based on the job description, then gradually move to more complex topics.",
+    "Okay, let's move on to some more detailed questions.",
+    "Now for a couple of more challenging questions that might involve scenarios or deeper technical design.",
+)
+
+BULLET_PATTERN = re.compile(r"^\s*(?:[-*•●▪–]+|\d+[.)])\s*")
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?])\s+")
+APPROX_CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class CompactedJD:
+    """A JD's prompt-ready form for one model and token budget, stored with the JD in the JD cache."""
+    text: str
+    raw_tokens: int
+    tokens: int
+    truncated: bool
+
+    def to_dict(self) -> dict:
+        return {"text": self.text, "raw_tokens": self.raw_tokens, "tokens": self.tokens, "truncated": self.truncated}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CompactedJD":
+        return cls(str(data["text"]), int(data["raw_tokens"]), int(data["tokens"]), bool(data["truncated"]))
+
+
+@dataclass
+class InterviewPrompt:
+    instructions: str
+    static_prefix_tokens: int
+    jd_raw_tokens: int
+    jd_tokens: int
+    total_tokens: int
+    jd_truncated: bool
+
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding(model_name: str):
+    if tiktoken is None:
+        logger.warning("tiktoken not installed. Token counts are approximated from character length.")
+        return None
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"Could not load tiktoken encoding for '{model_name}': {e}. Token counts are approximated from character length.")
+        return None
+
+
+def warm_token_encoding(model_name: str) -> None:
+    """Loads the tiktoken encoding (downloading it on first use) so token counting never has to,
+    and counts the static parts of the prompt."""
+    _get_encoding(model_name)
+    _static_prompt_tokens(model_name)
+
+
+@functools.lru_cache(maxsize=None)
+def _static_prompt_tokens(model_name: str) -> Tuple[int, int]:
+    """(static prefix tokens, JD section marker tokens); the same for every interview."""
+    return count_tokens(STATIC_INSTRUCTIONS_PREFIX, model_name), count_tokens(f"\n{JD_SECTION_START}\n\n{JD_SECTION_END}\n", model_name)
+
+
+def count_tokens(text: str, model_name: str) -> int:
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return (len(text) + APPROX_CHARS_PER_TOKEN - 1) // APPROX_CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def normalize_jd_lines(jd_text: str) -> List[str]:
+    """Normalizes whitespace and bullet markers, and drops repeated lines and sentences."""
+    jd_text = unicodedata.normalize("NFKC", jd_text).replace("\r\n", "\n").replace("\r", "\n")
+    seen_sentences = set()
+    normalized_lines = []
+    for raw_line in jd_text.split("\n"):
+        is_bullet = bool(BULLET_PATTERN.match(raw_line))
+        line = " ".join(BULLET_PATTERN.sub("", raw_line).split())
+        if not line:
+            continue
+        kept_sentences = []
+        for sentence in SENTENCE_SPLIT_PATTERN.split(line):
+            sentence_key = sentence.lower().strip(" .;:")
+            if not sentence_key or sentence_key in seen_sentences:
+                continue
+            seen_sentences.add(sentence_key)
+            kept_sentences.append(sentence)
+        if kept_sentences:
+            normalized_lines.append(("- " if is_bullet else "") + " ".join(kept_sentences))
+    return normalized_lines
+
+
+def compacted_jd_key(token_budget: int, model_name: str) -> str:
+    return f"{model_name}:{token_budget}"
+
+
+def compact_job_description(jd_text: str, token_budget: int, model_name: str) -> CompactedJD:
+    """Normalized, deduplicated JD cut at a line boundary to fit token_budget, with its token counts.
+
+    Computed when the JD is fetched or prefetched and stored in the JD cache under
+    compacted_jd_key(), so interviews don't tokenize the JD themselves.
+    """
+    normalized_lines = normalize_jd_lines(jd_text)
+    compacted_lines = []
+    used_tokens = 0
+    for line in normalized_lines:
+        line_tokens = count_tokens(line + "\n", model_name)
+        if used_tokens + line_tokens > token_budget:
+            break
+        compacted_lines.append(line)
+        used_tokens += line_tokens
+    if not compacted_lines and jd_text.strip():
+        # A single line longer than the budget: keep its head rather than nothing.
+        compacted_lines.append(jd_text.strip()[:token_budget * APPROX_CHARS_PER_TOKEN])
+    compact_jd = "\n".join(compacted_lines)
+    return CompactedJD(
+        text=compact_jd,
+        raw_tokens=count_tokens(jd_text, model_name),
+        tokens=count_tokens(compact_jd, model_name),
+        truncated=compact_jd != "\n".join(normalized_lines),
+    )
+
+
+def build_interview_instructions(compacted_jd: CompactedJD, model_name: str) -> InterviewPrompt:
+    """Wraps a compacted JD in the static instructions. total_tokens is the sum of the parts."""
+    static_prefix_tokens, jd_section_marker_tokens = _static_prompt_tokens(model_name)
+    return InterviewPrompt(
+        instructions=f"{STATIC_INSTRUCTIONS_PREFIX}\n{JD_SECTION_START}\n{compacted_jd.text}\n{JD_SECTION_END}\n",
+        static_prefix_tokens=static_prefix_tokens,
+        jd_raw_tokens=compacted_jd.raw_tokens,
+        jd_tokens=compacted_jd.tokens,
+        total_tokens=static_prefix_tokens + jd_section_marker_tokens + compacted_jd.tokens,
+        jd_truncated=compacted_jd.truncated,
+    )
@@ -0,0 +1,326 @@
+import asyncio
+import collections
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from providers import ProviderChoice
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """Rolling first-chunk latency and error rate of one provider, over its last `window` requests."""
+
+    def __init__(self, window: int) -> None:
+        self.latencies: Deque[float] = collections.deque(maxlen=window)
+        self.outcomes: Deque[bool] = collections.deque(maxlen=window)
+        self.unhealthy_until = 0.0
+
+    def record_latency(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+        self.outcomes.append(True)
+
+    def record_error(self) -> None:
+        self.outcomes.append(False)
+
+    def is_healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+    def to_state(self) -> dict:
+        return {"latencies": list(self.latencies), "outcomes": list(self.outcomes), "unhealthy_until": self.unhealthy_until}
+
+    @classmethod
+    def from_state(cls, state: dict, window: int) -> "ProviderStats":
+        stats = cls(window)
+        stats.latencies.extend(float(seconds) for seconds in state.get("latencies", []))
+        stats.outcomes.extend(bool(ok) for ok in state.get("outcomes", []))
+        stats.unhealthy_until = float(state.get("unhealthy_until", 0.0))
+        return stats
+
+    def to_dict(self) -> dict:
+        ordered = sorted(self.latencies)
+        percentile_ms = lambda q: round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 1) if ordered else None
+        return {
+            "requests": len(self.outcomes),
+            "latency_p50_ms": percentile_ms(0.5),
+            "latency_p95_ms": percentile_ms(0.95),
+            "error_rate": round(self.outcomes.count(False) / len(self.outcomes), 3) if self.outcomes else None,
+            "unhealthy_until": self.unhealthy_until or None,
+        }
+
+
+# This process's view of the stats, keyed "<kind>/<provider>". With a ProviderStatsStore it
+# mirrors the host-wide state file as of its last sync, plus observations not yet written to it.
+_provider_stats: Dict[str, ProviderStats] = {}
+
+
+class ProviderStatsStore:
+    """Provider stats shared by every job process on the host.
+
+    Each job runs in its own process, so a failover's cooldown and the rolling latency and
+    error windows only reach later interviews through `state_path`, a JSON file read and
+    updated under an exclusive flock. Observations are applied to this process's ProviderStats
+    right away and queued; a background thread applies the queue to the file every
+    `flush_interval_seconds` and refreshes the tracked keys from it, so metrics events never
+    wait on the file lock. If the file can't be used, the stats fall back to this process alone.
+    """
+
+    def __init__(self, state_path: Optional[str], flush_interval_seconds: float = 1.0) -> None:
+        self.state_path = state_path
+        self.flush_interval_seconds = flush_interval_seconds
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._pending: List[Tuple[str, int, Callable[[ProviderStats], None]]] = []
+        self._tracked: Dict[str, int] = {}
+        self._flush_thread: Optional[threading.Thread] = None
+
+    async def load(self, keys: Iterable[str], window: int) -> None:
+        """Tracks `keys` and loads their host-wide stats into this process, off the event loop."""
+        with self._lock:
+            self._tracked.update((key, window) for key in keys)
+        await asyncio.get_running_loop().run_in_executor(None, self.sync)
+        self._start_flush_thread()
+
+    async def flush(self) -> None:
+        """Writes queued observations to the state file, off the event loop."""
+        await asyncio.get_running_loop().run_in_executor(None, self.sync)
+
+    def update(self, key: str, window: int, apply: Callable[[ProviderStats], None]) -> None:
+        """Applies `apply` to this process's stats of `key` now and queues it for the state file."""
+        with self._lock:
+            apply(_provider_stats.setdefault(key, ProviderStats(window)))
+            self._tracked.setdefault(key, window)
+            if self.state_path:
+                self._pending.append((key, window, apply))
+        self._start_flush_thread()
+
+    def sync(self) -> None:
+        """Applies queued observations to the state file and refreshes tracked keys from it. Blocking."""
+        with self._sync_lock:
+            with self._lock:
+                if not self.state_path:
+                    return
+                pending, self._pending = self._pending, []
+                tracked = dict(self._tracked)
+            try:
+                fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+                with os.fdopen(fd, "r+") as state_file:
+                    fcntl.flock(state_file, fcntl.LOCK_EX)
+                    try:
+                        states = json.loads(state_file.read() or "{}")
+                    except ValueError:
+                        states = {}
+                    if not isinstance(states, dict):
+                        states = {}
+                    for key, window, apply in pending:
+                        try:
+                            stats = ProviderStats.from_state(states[key], window)
+                        except (KeyError, TypeError, ValueError, AttributeError):
+                            stats = ProviderStats(window)
+                        apply(stats)
+                        states[key] = stats.to_state()
+                    if pending:
+                        state_file.seek(0)
+                        state_file.truncate()
+                        json.dump(states, state_file)
+                        state_file.flush()
+            except OSError as e:
+                logger.warning(f"Provider stats state '{self.state_path}' unavailable ({e}); keeping stats for this process only.")
+                with self._lock:
+                    self.state_path = None
+                    self._pending = []
+                return
+            with self._lock:
+                for key, window in tracked.items():
+                    if key not in states:
+                        continue
+                    try:
+                        stats = ProviderStats.from_state(states[key], window)
+                    except (TypeError, ValueError, AttributeError) as e:
+                        logger.warning(f"Ignoring unreadable stats for provider '{key}' in '{self.state_path}': {e}")
+                        continue
+                    # Observations queued while the file was being updated aren't in it yet.
+                    for queued_key, _, apply in self._pending:
+                        if queued_key == key:
+                            apply(stats)
+                    _provider_stats[key] = stats
+
+    def _start_flush_thread(self) -> None:
+        with self._lock:
+            if not self.state_path or self._flush_thread is not None:
+                return
+            self._flush_thread = threading.Thread(target=self._flush_forever, name="provider-stats-flush", daemon=True)
+            self._flush_thread.start()
+
+    def _flush_forever(self) -> None:
+        while self.state_path:
+            time.sleep(self.flush_interval_seconds)
+            self.sync()
+
+
+def _stats_key(choice: ProviderChoice) -> str:
+    return f"{choice.spec.kind}/{choice.key}"
+
+
+class ProviderRouter:
+    """Picks the STT, LLM and TTS provider for one session and fails over along each fallback chain.
+
+    Every instance the router creates reports its own metrics and errors, so the greeting and
+    the session pipeline both count. Time to first token/audio (and, for STT, the final
+    transcript delay) is compared against the kind's SLO; after `breaches_before_failover`
+    consecutive breaches or errors, or one unrecoverable error, the session moves to the next
+    healthy provider in the chain and the old one sits out `cooldown_seconds` for new sessions.
+    With a `stats_store`, those cooldowns and the rolling stats are shared by every job process
+    on the host, so a provider that just failed one interview isn't the first choice of the next.
+    """
+
+    def __init__(
+        self,
+        chains: Dict[str, List[ProviderChoice]],
+        slo_seconds: Dict[str, float],
+        create_instance: Callable[[ProviderChoice], Any],
+        breaches_before_failover: int = 2,
+        cooldown_seconds: float = 300.0,
+        stats_window: int = 20,
+        stats_store: Optional[ProviderStatsStore] = None,
+    ) -> None:
+        self.chains = chains
+        self.slo_seconds = slo_seconds
+        self.create_instance = create_instance
+        self.breaches_before_failover = max(1, breaches_before_failover)
+        self.cooldown_seconds = cooldown_seconds
+        self.stats_window = stats_window
+        self.stats_store = stats_store or ProviderStatsStore(None)
+        self.failovers: List[dict] = []
+        self._on_failover: List[Callable[[str, Any], None]] = []
+        self._instances: Dict[str, Any] = {}
+        self._choices_by_instance: Dict[int, ProviderChoice] = {}
+        self._active: Dict[str, int] = {}
+        self._initial: Dict[str, str] = {}
+        self._consecutive_breaches: Dict[str, int] = collections.defaultdict(int)
+
+    async def load_stats(self) -> None:
+        """Loads the host-wide stats of every configured provider; await it before `current()`."""
+        keys = [_stats_key(choice) for chain in self.chains.values() for choice in chain]
+        await self.stats_store.load(keys, self.stats_window)
+
+    def on_failover(self, callback: Callable[[str, Any], None]) -> None:
+        """Registers `callback(kind, new_instance)`, called after each failover."""
+        self._on_failover.append(callback)
+
+    def current(self, kind: str) -> Any:
+        if kind not in self._active:
+            chain = self.chains[kind]
+            now = time.time()
+            index = next((i for i, choice in enumerate(chain) if self._stats(choice).is_healthy(now)), 0)
+            self._active[kind] = index
+            self._initial[kind] = chain[index].key
+            if index:
+                logger.warning(f"{kind.upper()} provider '{chain[0].key}' is cooling down after a failover. Starting with '{chain[index].key}'.")
+        return self._instance(self.chains[kind][self._active[kind]])
+
+    def current_key(self, kind: str) -> str:
+        self.current(kind)
+        return self.chains[kind][self._active[kind]].key
+
+    def observe_latency(self, kind: str, instance: Any, seconds: float) -> None:
+        choice = self._choices_by_instance.get(id(instance))
+        if choice is None or seconds < 0:
+            return
+        self._update_stats(choice, lambda stats: stats.record_latency(seconds))
+        if choice.key != self.current_key(kind):
+            return
+        if seconds > self.slo_seconds[kind]:
+            self._breach(kind, f"{seconds * 1000:.0f} ms exceeded the {self.slo_seconds[kind] * 1000:.0f} ms SLO")
+        else:
+            self._consecutive_breaches[kind] = 0
+
+    def observe_error(self, kind: str, instance: Any, error: Any) -> None:
+        choice = self._choices_by_instance.get(id(instance))
+        if choice is None:
+            return
+        self._update_stats(choice, lambda stats: stats.record_error())
+        if choice.key != self.current_key(kind):
+            return
+        recoverable = getattr(error, "recoverable", True)
+        self._breach(kind, f"{'recoverable' if recoverable else 'unrecoverable'} error: {getattr(error, 'error', error)}", immediate=not recoverable)
+
+    def on_session_metrics_collected(self, event: Any) -> None:
+        """AgentSession "metrics_collected" handler; STT is timed by the final transcript delay of each turn."""
+        metrics = event.metrics
+        if getattr(metrics, "type", None) == "eou_metrics":
+            self.observe_latency("stt", self.current("stt"), metrics.transcription_delay)
+
+    def to_dict(self) -> dict:
+        return {
+            "initial": dict(self._initial),
+            "current": {kind: self.chains[kind][index].key for kind, index in self._active.items()},
+            "chains": {kind: [choice.key for choice in chain] for kind, chain in self.chains.items()},
+            "slo_ms": {kind: round(seconds * 1000) for kind, seconds in self.slo_seconds.items()},
+            "failovers": self.failovers,
+            "stats": {
+                _stats_key(choice): _provider_stats[_stats_key(choice)].to_dict()
+                for chain in self.chains.values() for choice in chain if _stats_key(choice) in _provider_stats
+            },
+        }
+
+    def _breach(self, kind: str, reason: str, immediate: bool = False) -> None:
+        self._consecutive_breaches[kind] += 1
+        if immediate or self._consecutive_breaches[kind] >= self.breaches_before_failover:
+            self._fail_over(kind, reason)
+
+    def _fail_over(self, kind: str, reason: str) -> None:
+        self._consecutive_breaches[kind] = 0
+        chain = self.chains[kind]
+        from_index = self._active[kind]
+        now = time.time()
+        candidates = [(from_index + offset) % len(chain) for offset in range(1, len(chain))]
+        to_index = next((i for i in candidates if self._stats(chain[i]).is_healthy(now)), candidates[0] if candidates else None)
+        if to_index is None:
+            logger.warning(f"{kind.upper()} provider '{chain[from_index].key}' is degraded ({reason}) but no fallback is configured.")
+            return
+
+        try:
+            new_instance = self._instance(chain[to_index])
+        except Exception as e:
+            logger.error(f"Could not create fallback {kind.upper()} provider '{chain[to_index].key}': {e}", exc_info=True)
+            return
+        self._update_stats(chain[from_index], lambda stats: setattr(stats, "unhealthy_until", max(stats.unhealthy_until, now + self.cooldown_seconds)))
+        self._active[kind] = to_index
+        self.failovers.append({"kind": kind, "from": chain[from_index].key, "to": chain[to_index].key, "reason": reason, "at": now})
+        logger.warning(f"{kind.upper()} failover: '{chain[from_index].key}' -> '{chain[to_index].key}' ({reason}).")
+        for callback in self._on_failover:
+            try:
+                callback(kind, new_instance)
+            except Exception as e:
+                logger.error(f"Failed to switch the session to {kind.upper()} provider '{chain[to_index].key}': {e}", exc_info=True)
+
+    def _instance(self, choice: ProviderChoice) -> Any:
+        instance = self._instances.get(_stats_key(choice))
+        if instance is None:
+            instance = self.create_instance(choice)
+            self._instances[_stats_key(choice)] = instance
+            self._choices_by_instance[id(instance)] = choice
+            self._stats(choice)
+            kind = choice.spec.kind
+            instance.on("error", lambda error: self.observe_error(kind, instance, error))
+            if kind == "llm":
+                instance.on("metrics_collected", lambda metrics: self.observe_latency(kind, instance, metrics.ttft))
+            elif kind == "tts":
+                instance.on("metrics_collected", lambda metrics: None if metrics.cancelled else self.observe_latency(kind, instance, metrics.ttfb))
+            # STT latency arrives through the session's end-of-utterance metrics; see observe_latency.
+        return instance
+
+    def _update_stats(self, choice: ProviderChoice, apply: Callable[[ProviderStats], None]) -> None:
+        self.stats_store.update(_stats_key(choice), self.stats_window, apply)
+
+    def _stats(self, choice: ProviderChoice) -> ProviderStats:
+        key = _stats_key(choice)
+        if key not in _provider_stats:
+            _provider_stats[key] = ProviderStats(self.stats_window)
+        return _provider_stats[key]
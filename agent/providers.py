@@ -0,0 +1,95 @@
+import importlib
+import logging
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# VAD, turn detection and noise cancellation run in every job regardless of the configured providers.
+LOCAL_MODEL_PLUGINS = ("livekit.plugins.silero", "livekit.plugins.turn_detector", "livekit.plugins.noise_cancellation")
+
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    kind: str # "stt", "llm" or "tts"
+    name: str
+    plugin_module: str
+    api_key_env: str
+    build: Callable[[Any, dict], Any] # (imported plugin module, options) -> STT/LLM/TTS instance
+
+
+PROVIDERS: Dict[Tuple[str, str], ProviderSpec] = {
+    (spec.kind, spec.name): spec
+    for spec in (
+        ProviderSpec("stt", "deepgram", "livekit.plugins.deepgram", "DEEPGRAM_API_KEY",
+                     lambda plugin, options: plugin.STT(**{"model": "nova-3", "language": "multi", **options})),
+        ProviderSpec("stt", "openai", "livekit.plugins.openai", "OPENAI_API_KEY",
+                     lambda plugin, options: plugin.STT(**options)),
+        ProviderSpec("llm", "openai", "livekit.plugins.openai", "OPENAI_API_KEY",
+                     lambda plugin, options: plugin.LLM(**options)),
+        ProviderSpec("tts", "cartesia", "livekit.plugins.cartesia", "CARTESIA_API_KEY",
+                     lambda plugin, options: plugin.TTS(**options)),
+        ProviderSpec("tts", "openai", "livekit.plugins.openai", "OPENAI_API_KEY",
+                     lambda plugin, options: plugin.TTS(**options)),
+    )
+}
+
+
+def get_provider_spec(kind: str, name: str) -> ProviderSpec:
+    spec = PROVIDERS.get((kind, name.strip().lower()))
+    if spec is None:
+        known = ", ".join(sorted(n for k, n in PROVIDERS if k == kind))
+        raise ValueError(f"Unknown {kind.upper()} provider '{name}'. Known providers: {known}.")
+    return spec
+
+
+@dataclass(frozen=True)
+class ProviderChoice:
+    """One entry of a fallback chain: a provider, optionally pinned to a model ("openai:gpt-4o-mini")."""
+    spec: ProviderSpec
+    model: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return f"{self.spec.name}:{self.model}" if self.model else self.spec.name
+
+
+def parse_provider_chain(kind: str, value: str) -> List[ProviderChoice]:
+    """Parses a comma-separated fallback chain such as "deepgram,openai" or "openai:gpt-4o,openai:gpt-4o-mini"."""
+    chain = []
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        name, _, model = entry.strip().partition(":")
+        chain.append(ProviderChoice(get_provider_spec(kind, name), model.strip() or None))
+    if not chain:
+        raise ValueError(f"No {kind.upper()} provider configured.")
+    return chain
+
+
+def required_api_key_env_vars(specs: Iterable[ProviderSpec]) -> List[str]:
+    return list(dict.fromkeys(spec.api_key_env for spec in specs))
+
+
+def load_plugins(module_names: Iterable[str]) -> None:
+    """Imports LiveKit plugin modules that aren't loaded yet.
+
+    LiveKit plugins register themselves on import and refuse to do so off the main thread,
+    so call this from the main thread. Job processes are started with forkserver and import
+    this module afresh, so they inherit nothing from `__main__`: prewarm must load the plugins
+    again in every job process, and `__main__` loads them only for the worker process itself.
+    """
+    missing = [name for name in dict.fromkeys(module_names) if name not in sys.modules]
+    if not missing:
+        return
+    if threading.current_thread() is not threading.main_thread():
+        raise RuntimeError(f"LiveKit plugins must be imported on the main thread, but {', '.join(missing)} are not loaded.")
+    for module_name in missing:
+        importlib.import_module(module_name)
+
+
+def create_provider(spec: ProviderSpec, options: Optional[dict] = None) -> Any:
+    plugin = importlib.import_module(spec.plugin_module)
+    return spec.build(plugin, dict(options or {}))
@@ -0,0 +1,137 @@
+import asyncio
+import contextlib
+import gzip
+import io
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard # Optional: pip install zstandard
+except ImportError:
+    zstandard = None
+
+METADATA_RECORD_TYPE = "transcript_metadata"
+HISTORY_CONVERSION_CHUNK_ITEMS = 100
+BACKUP_SUFFIXES = {"none": ".ndjson", "gzip": ".ndjson.gz", "zstd": ".ndjson.zst"}
+GZIP_COMPRESS_LEVEL = 5
+ZSTD_COMPRESS_LEVEL = 3
+
+
+def resolve_backup_compression(requested: str) -> str:
+    """Maps TRANSCRIPT_BACKUP_COMPRESSION to a supported codec, falling back to gzip without zstandard."""
+    compression = (requested or "none").lower()
+    if compression not in BACKUP_SUFFIXES:
+        logger.warning(f"Unknown transcript backup compression '{requested}'. Writing uncompressed NDJSON.")
+        return "none"
+    if compression == "zstd" and zstandard is None:
+        logger.warning("zstandard not installed. Compressing transcript backups with gzip instead.")
+        return "gzip"
+    return compression
+
+
+def backup_file_suffix(compression: str) -> str:
+    return BACKUP_SUFFIXES[compression]
+
+
+def iter_history_items(history: Any, chunk_size: int = HISTORY_CONVERSION_CHUNK_ITEMS) -> Iterator[dict]:
+    """Items of `history.to_dict()`, converted a chunk at a time.
+
+    Building the whole dict list at once promotes every item into the oldest GC generation,
+    and the resulting full collections stall the event loop even when this runs on a thread.
+    """
+    items = history.items
+    for start in range(0, len(items), chunk_size):
+        yield from type(history)(items[start:start + chunk_size]).to_dict()["items"]
+
+
+def iter_transcript_records(items: Iterable[dict], format_item: Callable[[dict], Optional[str]]) -> Iterator[Tuple[bytes, Optional[str]]]:
+    """Yields (compact NDJSON line, formatted transcript line or None) for each history item."""
+    for item in items:
+        yield json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n", format_item(item)
+
+
+def write_transcript_backup(
+    path: str,
+    items: Iterable[dict],
+    metadata: dict,
+    format_item: Callable[[dict], Optional[str]],
+    compression: str,
+) -> Tuple[List[str], int]:
+    """Streams a metadata line plus one line per item to `path` and formats the transcript in the same pass.
+
+    Returns (formatted transcript lines, item count). The file is written to a temp file,
+    fsync'd and renamed, so a crash never leaves a truncated backup behind.
+    """
+    formatted_lines: List[str] = []
+    item_count = 0
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw_file:
+            with contextlib.ExitStack() as stack:
+                if compression == "zstd":
+                    out = stack.enter_context(zstandard.ZstdCompressor(level=ZSTD_COMPRESS_LEVEL).stream_writer(raw_file, closefd=False))
+                elif compression == "gzip":
+                    out = stack.enter_context(gzip.GzipFile(fileobj=raw_file, mode="wb", compresslevel=GZIP_COMPRESS_LEVEL))
+                else:
+                    out = raw_file
+                out.write(json.dumps({"type": METADATA_RECORD_TYPE, **metadata}, default=str, separators=(",", ":")).encode("utf-8") + b"\n")
+                for ndjson_line, formatted_line in iter_transcript_records(items, format_item):
+                    out.write(ndjson_line)
+                    item_count += 1
+                    if formatted_line:
+                        formatted_lines.append(formatted_line)
+            raw_file.flush()
+            os.fsync(raw_file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+    return formatted_lines, item_count
+
+
+async def write_transcript_backup_async(
+    path: str,
+    load_items: Callable[[], Iterable[dict]],
+    metadata: dict,
+    format_item: Callable[[dict], Optional[str]],
+    compression: str,
+) -> Tuple[List[str], int]:
+    """write_transcript_backup on a worker thread. `load_items` runs there too, so converting the
+    history to dicts doesn't stall the event loop either."""
+    return await asyncio.get_running_loop().run_in_executor(
+        None, lambda: write_transcript_backup(path, load_items(), metadata, format_item, compression)
+    )
+
+
+def read_transcript_backup(path: str) -> dict:
+    """Loads any transcript backup (legacy indented JSON, NDJSON, .gz, .zst) as {"items": [...], **metadata}."""
+    if path.endswith(".json"):
+        with open(path) as f:
+            return json.load(f)
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read '{path}'.")
+        raw_file = open(path, "rb")
+        text_file = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw_file, closefd=True), encoding="utf-8")
+    elif path.endswith(".gz"):
+        text_file = gzip.open(path, "rt", encoding="utf-8")
+    else:
+        text_file = open(path, encoding="utf-8")
+
+    history_dict: dict = {"items": []}
+    with text_file:
+        for line in text_file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("type") == METADATA_RECORD_TYPE:
+                history_dict.update({k: v for k, v in record.items() if k != "type"})
+            else:
+                history_dict["items"].append(record)
+    return history_dict
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def conversation_item_to_dict(item: Any) -> dict:
+    """Converts a ChatMessage into the same shape `history.to_dict()` uses for its items."""
+    content = getattr(item, "content", None) or []
+    return {
+        "id": getattr(item, "id", None),
+        "type": getattr(item, "type", "message"),
+        "role": getattr(item, "role", None),
+        "content": [c_part for c_part in content if isinstance(c_part, (str, int, float))],
+        "interrupted": getattr(item, "interrupted", False),
+        "created_at": getattr(item, "created_at", None),
+    }
+
+
+class TranscriptJournal:
+    """Append-only NDJSON journal of conversation items with periodic Airtable delta flushes.
+
+    Every item is written to `journal_path` as soon as the session reports it, so a worker
+    crash loses at most the in-flight line. Formatted transcript lines are queued and handed
+    to `flush_delta(delta_text, continues_previous_segment)` every `flush_interval_seconds`,
+    or sooner once `flush_batch_items` lines are pending.
+    """
+
+    def __init__(
+        self,
+        journal_path: str,
+        format_item: Callable[[dict], Optional[str]],
+        flush_delta: Callable[[str, bool], Awaitable[bool]],
+        flush_interval_seconds: float = 30.0,
+        flush_batch_items: int = 20,
+    ) -> None:
+        self.journal_path = journal_path
+        self._format_item = format_item
+        self._flush_delta = flush_delta
+        self.flush_interval_seconds = flush_interval_seconds
+        self.flush_batch_items = max(1, flush_batch_items)
+        self._journal_file = open(journal_path, "a", encoding="utf-8")
+        self._pending_lines: List[str] = []
+        self._has_flushed = False
+        self._flush_lock = asyncio.Lock()
+        self._periodic_task: Optional[asyncio.Task] = None
+        self._flush_tasks: "set[asyncio.Task]" = set()
+        self.items_written = 0
+
+    def start(self) -> None:
+        if self._periodic_task is None:
+            self._periodic_task = asyncio.create_task(self._periodic_flush())
+
+    def on_conversation_item_added(self, event: Any) -> None:
+        self.append_item(conversation_item_to_dict(event.item))
+
+    def append_item(self, item_dict: dict) -> None:
+        if self._journal_file.closed:
+            logger.warning(f"Transcript journal '{self.journal_path}' already closed. Dropping item {item_dict.get('id')}.")
+            return
+        try:
+            self._journal_file.write(json.dumps(item_dict, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._journal_file.flush()
+            self.items_written += 1
+        except Exception as e:
+            logger.error(f"Failed to append item to transcript journal '{self.journal_path}': {e}", exc_info=True)
+        formatted_line = self._format_item(item_dict)
+        if formatted_line:
+            self._pending_lines.append(formatted_line)
+        if len(self._pending_lines) >= self.flush_batch_items and not self._flush_lock.locked():
+            flush_task = asyncio.create_task(self.flush())
+            self._flush_tasks.add(flush_task)
+            flush_task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self) -> bool:
+        async with self._flush_lock:
+            if not self._pending_lines:
+                return True
+            batch = self._pending_lines
+            self._pending_lines = []
+            await asyncio.get_running_loop().run_in_executor(None, self._fsync_journal)
+            ok = await self._flush_delta("\n".join(batch), self._has_flushed)
+            if ok:
+                self._has_flushed = True
+                logger.info(f"Checkpointed {len(batch)} transcript lines from '{self.journal_path}'.")
+            else:
+                # Keep the lines for the next checkpoint (or the final shutdown write).
+                self._pending_lines = batch + self._pending_lines
+                logger.warning(f"Transcript checkpoint failed. {len(self._pending_lines)} lines pending for '{self.journal_path}'.")
+            return ok
+
+    async def aclose(self) -> Tuple[str, bool]:
+        """Stops checkpointing and returns (remaining_delta_text, continues_previous_segment)."""
+        if self._periodic_task is not None:
+            self._periodic_task.cancel()
+            try:
+                await self._periodic_task
+            except asyncio.CancelledError:
+                pass
+            self._periodic_task = None
+        async with self._flush_lock:
+            remaining_delta = "\n".join(self._pending_lines)
+            self._pending_lines = []
+            if not self._journal_file.closed:
+                self._fsync_journal()
+                self._journal_file.close()
+        logger.info(f"Transcript journal '{self.journal_path}' closed after {self.items_written} items.")
+        return remaining_delta, self._has_flushed
+
+    async def _periodic_flush(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Periodic transcript checkpoint failed for '{self.journal_path}': {e}", exc_info=True)
+
+    def _fsync_journal(self) -> None:
+        if self._journal_file.closed:
+            return
+        try:
+            self._journal_file.flush()
+            os.fsync(self._journal_file.fileno())
+        except OSError as e:
+            logger.error(f"Failed to fsync transcript journal '{self.journal_path}': {e}", exc_info=True)
@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import AsyncIterable, AsyncIterator, Callable, List, Optional, Sequence, Tuple
+
+from livekit import rtc
+from livekit.agents import Agent, tts
+from livekit.agents.utils import is_given
+
+logger = logging.getLogger(__name__)
+
+HEADER_LENGTH_FORMAT = "<I"
+MEMORY_CACHE_ENTRIES = 64
+
+
+def normalize_phrase(text: str) -> str:
+    return " ".join(text.split())
+
+
+def tts_cache_identity(tts_engine: tts.TTS) -> Tuple[str, str, str]:
+    """(provider, model, voice) of a TTS plugin, used in the cache key."""
+    opts = getattr(tts_engine, "_opts", None)
+    voice = getattr(opts, "voice", "") if opts is not None else ""
+    if not isinstance(voice, str):
+        voice = json.dumps(voice, sort_keys=True, default=str)
+    model = getattr(tts_engine, "model", None) or getattr(opts, "model", "") or ""
+    return tts_engine.label, str(model), voice
+
+
+class TTSAudioCache:
+    """Content-addressed on-disk cache of synthesized audio frames.
+
+    Entries are keyed by sha256(provider, model, voice, sample rate, normalized text) and
+    stored as a small JSON header followed by raw int16 PCM. The directory is kept under
+    `max_bytes` by evicting the least recently used files (mtime is bumped on every hit).
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._memory: "OrderedDict[str, List[rtc.AudioFrame]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending_stores: "set[str]" = set()
+        self._populate_tasks: "set[asyncio.Task]" = set()
+
+    def cache_key(self, tts_engine: tts.TTS, text: str) -> str:
+        provider, model, voice = tts_cache_identity(tts_engine)
+        key_material = json.dumps([provider, model, voice, tts_engine.sample_rate, normalize_phrase(text)])
+        return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> Optional[List[rtc.AudioFrame]]:
+        with self._lock:
+            frames = self._memory.get(key)
+            if frames is not None:
+                self._memory.move_to_end(key)
+                return frames
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                (header_length,) = struct.unpack(HEADER_LENGTH_FORMAT, f.read(struct.calcsize(HEADER_LENGTH_FORMAT)))
+                header = json.loads(f.read(header_length))
+                pcm = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"Discarding unreadable TTS cache entry '{path}': {e}")
+            self._remove(path)
+            return None
+
+        frames = []
+        offset = 0
+        bytes_per_sample = 2 * header["num_channels"]
+        for samples_per_channel in header["samples_per_channel"]:
+            frame_bytes = samples_per_channel * bytes_per_sample
+            frames.append(rtc.AudioFrame(pcm[offset:offset + frame_bytes], header["sample_rate"], header["num_channels"], samples_per_channel))
+            offset += frame_bytes
+        self._remember(key, frames)
+        return frames
+
+    def store(self, key: str, frames: Sequence[rtc.AudioFrame]) -> None:
+        if not frames:
+            return
+        header = json.dumps({
+            "sample_rate": frames[0].sample_rate,
+            "num_channels": frames[0].num_channels,
+            "samples_per_channel": [frame.samples_per_channel for frame in frames],
+        }).encode("utf-8")
+        # Write to a temp file and rename so concurrent workers never read a partial entry.
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(struct.pack(HEADER_LENGTH_FORMAT, len(header)))
+                f.write(header)
+                for frame in frames:
+                    f.write(bytes(frame.data))
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.error(f"Failed to write TTS cache entry {key}: {e}", exc_info=True)
+            self._remove(tmp_path)
+            return
+        self._remember(key, list(frames))
+        self._evict()
+
+    def schedule_populate(self, key: str, tts_engine: tts.TTS, text: str) -> None:
+        """Synthesizes `text` once in the background and stores it under `key`."""
+        if key in self._pending_stores:
+            return
+        self._pending_stores.add(key)
+        populate_task = asyncio.create_task(self._populate(key, tts_engine, text))
+        self._populate_tasks.add(populate_task)
+        populate_task.add_done_callback(self._populate_tasks.discard)
+
+    async def _populate(self, key: str, tts_engine: tts.TTS, text: str) -> None:
+        try:
+            async with tts_engine.synthesize(text) as stream:
+                frames = [event.frame async for event in stream]
+            await asyncio.get_running_loop().run_in_executor(None, self.store, key, frames)
+            logger.info(f"Cached TTS audio for phrase '{text[:60]}' ({len(frames)} frames).")
+        except Exception as e:
+            logger.warning(f"Could not cache TTS audio for phrase '{text[:60]}': {e}")
+        finally:
+            self._pending_stores.discard(key)
+
+    def _remember(self, key: str, frames: List[rtc.AudioFrame]) -> None:
+        with self._lock:
+            self._memory[key] = frames
+            self._memory.move_to_end(key)
+            while len(self._memory) > MEMORY_CACHE_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def _evict(self) -> None:
+        try:
+            entries = []
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith(".pcm"):
+                    stat = os.stat(os.path.join(self.cache_dir, filename))
+                    entries.append((stat.st_mtime, stat.st_size, filename))
+        except OSError as e:
+            logger.warning(f"Could not scan TTS cache directory '{self.cache_dir}': {e}")
+            return
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, filename in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            self._remove(os.path.join(self.cache_dir, filename))
+            with self._lock:
+                self._memory.pop(filename[:-len(".pcm")], None)
+            total_bytes -= size
+            logger.info(f"Evicted TTS cache entry {filename} to stay under {self.max_bytes} bytes.")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pcm")
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+async def cached_phrase_tts_node(
+    agent: Agent,
+    text: AsyncIterable[str],
+    model_settings,
+    audio_cache: TTSAudioCache,
+    phrases: Sequence[str],
+) -> AsyncIterator[rtc.AudioFrame]:
+    """tts_node that plays cached audio for leading text matching one of `phrases` (see cached_phrase_audio).
+
+    The cache is keyed on the TTS that will actually speak: the agent's own TTS when it has one
+    (a provider failover sets it through update_options), else the session's, as in AgentActivity.tts.
+    """
+    async for frame in cached_phrase_audio(
+        agent.tts if is_given(agent.tts) else agent.session.tts, text, audio_cache, phrases,
+        lambda remaining_text: Agent.default.tts_node(agent, remaining_text, model_settings),
+    ):
+        yield frame
+
+
+async def cached_phrase_audio(
+    tts_engine: Optional[tts.TTS],
+    text: AsyncIterable[str],
+    audio_cache: TTSAudioCache,
+    phrases: Sequence[str],
+    synthesize: Callable[[AsyncIterable[str]], AsyncIterable[rtc.AudioFrame]],
+) -> AsyncIterator[rtc.AudioFrame]:
+    """Audio for `text`, with leading text matching one of `phrases` played from the cache.
+
+    Text is buffered only while it is still a prefix of some phrase. Each completed phrase
+    with a cache entry is played from the cache; as soon as the text diverges (or a phrase
+    isn't cached yet), the rest of the utterance goes to `synthesize` and missing phrases
+    are synthesized with `tts_engine` in the background for next time.
+    """
+    normalized_phrases = sorted({normalize_phrase(p) for p in phrases}, key=len, reverse=True)
+    text_iterator = text.__aiter__()
+    buffer = ""
+    text_ended = False
+
+    while tts_engine is not None:
+        candidate = normalize_phrase(buffer)
+        if not candidate:
+            if text_ended:
+                return
+        else:
+            completed_phrase = next((p for p in normalized_phrases if candidate == p or candidate.startswith(p + " ")), None)
+            longer_phrase_possible = any(p != candidate and p.startswith(candidate) for p in normalized_phrases)
+            if completed_phrase and (text_ended or not longer_phrase_possible):
+                key = audio_cache.cache_key(tts_engine, completed_phrase)
+                frames = audio_cache.load(key)
+                if frames is None:
+                    audio_cache.schedule_populate(key, tts_engine, completed_phrase)
+                    break
+                logger.info(f"TTS cache hit for phrase '{completed_phrase[:60]}'.")
+                for frame in frames:
+                    yield frame
+                buffer = candidate[len(completed_phrase):].lstrip() + (" " if buffer[-1:].isspace() else "")
+                continue
+            if text_ended or not (completed_phrase or longer_phrase_possible):
+                break
+        try:
+            buffer += await text_iterator.__anext__()
+        except StopAsyncIteration:
+            text_ended = True
+
+    async def remaining_text() -> AsyncIterator[str]:
+        if buffer:
+            yield buffer
+        if not text_ended:
+            async for chunk in text_iterator:
+                yield chunk
+
+    async for frame in synthesize(remaining_text()):
+        yield frame
@@ -0,0 +1,212 @@
+import asyncio
+import collections
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Set
+
+import psutil # Installed with livekit-agents
+
+logger = logging.getLogger(__name__)
+
+JOB_STATE_STALE_SECONDS = 10.0
+JOB_STATE_EXPIRED_SECONDS = 300.0
+HOST_CPU_SAMPLES = 5
+# An accepted job counts towards the cap until it shows up in worker.active_jobs. LiveKit gives
+# up on an assignment after 7.5 s; the rest covers launching the job process once assigned.
+ACCEPTED_JOB_TIMEOUT_SECONDS = 15.0
+
+
+class JobLoadReporter:
+    """Measures this job process's CPU use and event-loop lag and publishes them for the worker.
+
+    Job processes can't share memory with the worker's main process, so every interval the
+    numbers are written to `<state_dir>/<pid>.json`, where WorkerLoadMonitor picks them up.
+    """
+
+    def __init__(self, state_dir: str, room_name: str, interval_seconds: float = 1.0, window_samples: int = 30) -> None:
+        self.state_dir = state_dir
+        self.room_name = room_name
+        self.interval_seconds = interval_seconds
+        self.lag_samples_ms: Deque[float] = collections.deque(maxlen=window_samples)
+        self.state_path = os.path.join(state_dir, f"{os.getpid()}.json")
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        os.makedirs(self.state_dir, exist_ok=True)
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_cpu_seconds = time.process_time()
+        last_wall_seconds = time.monotonic()
+        while True:
+            expected_at = loop.time() + self.interval_seconds
+            await asyncio.sleep(self.interval_seconds)
+            self.lag_samples_ms.append(max(0.0, loop.time() - expected_at) * 1000)
+
+            cpu_seconds, wall_seconds = time.process_time(), time.monotonic()
+            cpu_cores = (cpu_seconds - last_cpu_seconds) / max(wall_seconds - last_wall_seconds, 1e-6)
+            last_cpu_seconds, last_wall_seconds = cpu_seconds, wall_seconds
+            ordered_lag = sorted(self.lag_samples_ms)
+            self._write_state({
+                "pid": os.getpid(),
+                "room_name": self.room_name,
+                "cpu_cores": round(cpu_cores, 3),
+                "loop_lag_ms_p95": round(ordered_lag[min(len(ordered_lag) - 1, int(len(ordered_lag) * 0.95))], 1),
+                "loop_lag_ms_max": round(ordered_lag[-1], 1),
+                "updated_at": time.time(),
+            })
+
+    def _write_state(self, state: dict) -> None:
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Could not publish job load state to '{self.state_path}': {e}")
+
+
+class WorkerLoadMonitor:
+    """load_fnc and request_fnc for the worker, driven by host CPU, job count and job event-loop lag.
+
+    Each signal is scaled so that reaching its limit reports exactly `load_threshold`, the
+    point at which LiveKit marks the worker full; the reported load is the highest of them.
+    request_fnc applies the same limits to each job request and hands rejected jobs back to
+    LiveKit so another worker can take them.
+    """
+
+    def __init__(
+        self,
+        state_dir: str,
+        max_concurrent_jobs: int,
+        load_threshold: float,
+        cpu_threshold: float,
+        loop_lag_threshold_ms: float,
+    ) -> None:
+        self.state_dir = state_dir
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.load_threshold = load_threshold
+        self.cpu_threshold = cpu_threshold
+        self.loop_lag_threshold_ms = loop_lag_threshold_ms
+        os.makedirs(state_dir, exist_ok=True)
+        self._host_cpu_samples: Deque[float] = collections.deque(maxlen=HOST_CPU_SAMPLES)
+        self._accepted_at_by_job_id: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._snapshot: Dict[str, Any] = {
+            "load": 0.0, "active_jobs": 0, "active_job_ids": set(), "host_cpu": 0.0, "max_job_loop_lag_ms": 0.0, "limited_by": None,
+        }
+        psutil.cpu_percent(interval=None)
+
+    def load_fnc(self, worker: Any) -> float:
+        """Called by the worker every few seconds on an executor thread."""
+        self._host_cpu_samples.append(psutil.cpu_percent(interval=None) / 100)
+        host_cpu = sum(self._host_cpu_samples) / len(self._host_cpu_samples)
+        job_states = self._read_job_states()
+        max_job_loop_lag_ms = max((state.get("loop_lag_ms_p95", 0.0) for state in job_states), default=0.0)
+        active_job_ids = {running_job.job.id for running_job in worker.active_jobs}
+        active_jobs = len(active_job_ids)
+        with self._lock:
+            starting_jobs = len(self._starting_job_ids(active_job_ids))
+
+        signals = {
+            "jobs": (active_jobs + starting_jobs) / self.max_concurrent_jobs,
+            "cpu": host_cpu / self.cpu_threshold,
+            "loop_lag": max_job_loop_lag_ms / self.loop_lag_threshold_ms,
+        }
+        limited_by = max(signals, key=signals.get)
+        load = min(1.0, self.load_threshold * signals[limited_by])
+
+        with self._lock:
+            previous = self._snapshot
+            self._snapshot = {
+                "load": load, "active_jobs": active_jobs, "active_job_ids": active_job_ids, "host_cpu": host_cpu,
+                "max_job_loop_lag_ms": max_job_loop_lag_ms, "limited_by": limited_by, "jobs": job_states,
+            }
+        was_full = previous["load"] >= self.load_threshold
+        if (load >= self.load_threshold) != was_full:
+            logger.warning(
+                f"Worker {'full, shedding new interviews' if not was_full else 'accepting interviews again'}: "
+                f"load {load:.2f} (threshold {self.load_threshold}), limited by {limited_by}; "
+                f"{active_jobs}/{self.max_concurrent_jobs} interviews, host CPU {host_cpu:.0%}, "
+                f"max job loop lag {max_job_loop_lag_ms:.0f} ms. Per job: "
+                + (", ".join(f"{s['room_name']} {s['cpu_cores']:.2f} cores/{s['loop_lag_ms_p95']:.0f} ms" for s in job_states) or "none")
+            )
+        return load
+
+    async def request_fnc(self, job_request: Any) -> None:
+        with self._lock:
+            snapshot = dict(self._snapshot)
+            # Accepted jobs only appear in active_jobs once assigned and launched; count them meanwhile.
+            committed_jobs = snapshot["active_jobs"] + len(self._starting_job_ids(snapshot["active_job_ids"]))
+
+        reason = None
+        if committed_jobs >= self.max_concurrent_jobs:
+            reason = f"at the cap of {self.max_concurrent_jobs} concurrent interviews ({committed_jobs} running or starting)"
+        elif snapshot["host_cpu"] >= self.cpu_threshold:
+            reason = f"host CPU {snapshot['host_cpu']:.0%} is at or above {self.cpu_threshold:.0%}"
+        elif snapshot["max_job_loop_lag_ms"] >= self.loop_lag_threshold_ms:
+            reason = f"job event-loop lag {snapshot['max_job_loop_lag_ms']:.0f} ms is at or above {self.loop_lag_threshold_ms:.0f} ms"
+
+        room_name = job_request.room.name
+        if reason:
+            logger.warning(f"Rejecting interview for room '{room_name}' so LiveKit can dispatch it elsewhere: {reason}.")
+            await job_request.reject(terminate=False)
+            return
+        with self._lock:
+            self._accepted_at_by_job_id[job_request.id] = time.time()
+        logger.info(
+            f"Accepting interview for room '{room_name}': {committed_jobs + 1}/{self.max_concurrent_jobs} interviews, "
+            f"host CPU {snapshot['host_cpu']:.0%}, max job loop lag {snapshot['max_job_loop_lag_ms']:.0f} ms, load {snapshot['load']:.2f}."
+        )
+        await job_request.accept()
+
+    def _starting_job_ids(self, active_job_ids: Set[str]) -> Set[str]:
+        """Accepted jobs not yet in active_jobs; forgets those that launched or whose assignment timed out. Call with the lock held."""
+        now = time.time()
+        for job_id, accepted_at in list(self._accepted_at_by_job_id.items()):
+            if job_id in active_job_ids or now - accepted_at > ACCEPTED_JOB_TIMEOUT_SECONDS:
+                del self._accepted_at_by_job_id[job_id]
+        return set(self._accepted_at_by_job_id)
+
+    def _read_job_states(self) -> List[dict]:
+        job_states = []
+        now = time.time()
+        try:
+            filenames = [name for name in os.listdir(self.state_dir) if name.endswith(".json")]
+        except OSError as e:
+            logger.warning(f"Could not list job load states in '{self.state_dir}': {e}")
+            return job_states
+        for filename in filenames:
+            path = os.path.join(self.state_dir, filename)
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            age_seconds = now - state.get("updated_at", 0)
+            if age_seconds > JOB_STATE_EXPIRED_SECONDS:
+                # Left behind by a job process that died without cleaning up.
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            elif age_seconds <= JOB_STATE_STALE_SECONDS:
+                job_states.append(state)
+        return job_states
@@ -97,6 +97,13 @@ async function createOrJoinRoomByRequestedName(requestedRoomName, adminIdentityF
             console.warn(`${airtableLogPrefix} Airtable interaction finished with warning/error: ${airtableResult.error}`);
         } else {
             console.log(`${airtableLogPrefix} Airtable session processed successfully. Created: ${airtableResult.created}, Airtable Record ID: ${airtableResult.airtableRecordId}`);
+            // The agent reads this to update the session record without a LiveKitRoomSID formula lookup.
+            try {
+                await roomService.updateRoomMetadata(actualLiveKitRoomName, JSON.stringify({ airtableSessionRecordId: airtableResult.airtableRecordId }));
+                console.log(`${airtableLogPrefix} Airtable Record ID published in room metadata.`);
+            } catch (metadataError) {
+                console.warn(`${airtableLogPrefix} Failed to publish Airtable Record ID in room metadata: ${metadataError.message}`);
+            }
         }
     } catch (e) { 
         console.error(`${airtableLogPrefix} Uncaught exception during Airtable service call: ${e.message}`, e.stack);